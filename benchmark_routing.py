@@ -0,0 +1,75 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from shortcircuit.model.connection_db import ConnectionData  # noqa: E402
+from shortcircuit.model.csgraph_backend import AVAILABLE, RoutingBackend  # noqa: E402
+from shortcircuit.model.evedb import EveDb, SpaceType  # noqa: E402
+from shortcircuit.model.solarmap import ConnectionType, SolarMap  # noqa: E402
+
+WORMHOLES = 300
+SOURCES = 200
+
+RESTRICTIONS = {
+    "avoidance_list": [],
+    "security_prio": {
+        SpaceType.HS: 1,
+        SpaceType.LS: 1,
+        SpaceType.NS: 1,
+        SpaceType.WH: 1,
+    },
+}
+
+
+def build_map():
+    eve_db = EveDb()
+    solar_map = SolarMap(eve_db)
+    rng = random.Random(0)
+    systems = list(eve_db.systems.ids)
+    for i in range(WORMHOLES):
+        source, dest = rng.sample(systems, 2)
+        solar_map.add_connection(
+            ConnectionData(
+                source_id="benchmark",
+                source_system=source,
+                dest_system=dest,
+                con_type=ConnectionType.WORMHOLE,
+                sig_source="AAA-{:03}".format(i),
+                sig_dest="BBB-{:03}".format(i),
+            )
+        )
+    return solar_map, systems
+
+
+def run(solar_map, backend, sources, destinations):
+    solar_map.backend = backend
+    # Warm up the graph and compiled restrictions
+    solar_map.distance_matrix(sources[:1], destinations, RESTRICTIONS)
+    start = time.perf_counter()
+    matrix = solar_map.distance_matrix(sources, destinations, RESTRICTIONS)
+    return matrix, time.perf_counter() - start
+
+
+def main():
+    solar_map, systems = build_map()
+    sources = random.Random(1).sample(systems, SOURCES)
+    print("{} sources x {} systems, {} wormholes".format(len(sources), len(systems), WORMHOLES))
+
+    expected, elapsed = run(solar_map, RoutingBackend.PYTHON, sources, systems)
+    print("python: {:8.3f}s".format(elapsed))
+    if not AVAILABLE:
+        print("scipy:  not installed (pip install shortcircuit[fast])")
+        return
+
+    matrix, elapsed_scipy = run(solar_map, RoutingBackend.SCIPY, sources, systems)
+    print("scipy:  {:8.3f}s  ({:.1f}x)".format(elapsed_scipy, elapsed / elapsed_scipy))
+    if matrix != expected:
+        print("MISMATCH between backends")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
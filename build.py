@@ -95,6 +95,12 @@ def build(sde_only=False):
                 print(f"[ERROR] Failed to download {sde}: {e}")
                 sys.exit(1)
 
+    # 2. Compile the SDE image EveDb loads instead of parsing the CSV files
+    sys.path.insert(0, src_path)
+    from shortcircuit.model.evedb import EveDb
+
+    print(f"Compiled SDE image: {EveDb().compile_image()}")
+
     if sde_only:
         print("SDE download complete. Skipping PyInstaller build.")
         return
@@ -15,6 +15,7 @@ import qdarktheme
 
 from . import __appname__, __appslug__, __date__ as last_update, __version__
 import shortcircuit.resources
+from .model.avoidance import AvoidanceSet
 from .model.esi_processor import ESIProcessor
 from .model.evedb import EveDb, Restrictions, SpaceType, WormholeSize
 from .model.solarmap import ConnectionType
@@ -45,7 +46,8 @@ class MessageType(Enum):
 
 
 class RouteWorker(QtCore.QObject):
-    finished = QtCore.Signal(list, str)
+    # [(route, short_format), ...], shortest first
+    finished = QtCore.Signal(list)
 
     def __init__(self, nav):
         super().__init__()
@@ -55,10 +57,19 @@ class RouteWorker(QtCore.QObject):
     def process(self, source_id, dest_id):
         try:
             result = self.nav.route(source_id, dest_id)
-            self.finished.emit(result[0], result[1])
+            alternatives = [result]
+            if result[0]:
+                # Keep the (cached) route first, equal-cost ties may differ
+                seen = [[step["id"] for step in result[0]]]
+                for alternative in self.nav.alternatives(source_id, dest_id):
+                    ids = [step["id"] for step in alternative[0]]
+                    if ids not in seen and len(alternatives) < Navigation.ALTERNATIVES:
+                        seen.append(ids)
+                        alternatives.append(alternative)
+            self.finished.emit(alternatives)
         except Exception as e:
             Logger.error("Routing exception: {}".format(e))
-            self.finished.emit([], "")
+            self.finished.emit([])
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -96,6 +107,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.source_manager.load_configuration()
 
         self.global_proxy = None
+        self.route_alternatives = []
         self.auto_refresh_enabled = False
         self.auto_refresh_interval = 30
 
@@ -106,10 +118,6 @@ class MainWindow(QtWidgets.QMainWindow):
         self.network_manager = QtNetwork.QNetworkAccessManager(self)
         self.network_manager.finished.connect(self._on_portrait_loaded)
 
-        self.auto_refresh_timer = QtCore.QTimer(self)
-        self.auto_refresh_timer.setInterval(self.auto_refresh_interval * 1000)
-        self.auto_refresh_timer.timeout.connect(self.auto_refresh_triggered)
-
         # Create UI Elements (replaces setupUi)
         self._create_ui_elements()
 
@@ -131,6 +139,8 @@ class MainWindow(QtWidgets.QMainWindow):
         # Read resources
         self.eve_db = EveDb()
         self.nav = Navigation(self, self.eve_db)
+        # Resolved avoidance list, see `get_restrictions_avoidance`
+        self._avoidance = None
 
         # Apply Sidebar Layout
         self._setup_ui_layout()
@@ -146,6 +156,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.status_sources_widget.refresh_requested.connect(self.btn_refresh_source_clicked)
         self.statusBar().addPermanentWidget(self.status_sources_widget, 0)
         self.source_manager.sources_changed.connect(self.on_sources_changed)
+        self.source_manager.source_refreshed.connect(self.source_refreshed)
 
         self.status_eve_connection = QtWidgets.QLabel()
         self.status_eve_connection.setContentsMargins(5, 0, 5, 0)
@@ -269,6 +280,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.tableWidget_path.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.tableWidget_path.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
         self.tableWidget_path.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.comboBox_alternatives = QtWidgets.QComboBox()
+        self.comboBox_alternatives.setToolTip("Alternative routes, shortest first")
+        self.comboBox_alternatives.setVisible(False)
         self.lineEdit_short_format = QtWidgets.QLineEdit()
         self.lineEdit_short_format.setReadOnly(True)
         self.lineEdit_short_format.setPlaceholderText("Short format route (click to copy)")
@@ -351,6 +365,7 @@ class MainWindow(QtWidgets.QMainWindow):
         results_layout.setSpacing(10)
 
         results_layout.addWidget(self.label_status)
+        results_layout.addWidget(self.comboBox_alternatives)
         results_layout.addWidget(self.tableWidget_path)
 
         # Floating action buttons below table
@@ -695,6 +710,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.pushButton_copy_clipboard.clicked.connect(self.short_format_click_btn)
         self.lineEdit_set_dest.returnPressed.connect(self.btn_set_dest_clicked)
         self.tableWidget_path.itemSelectionChanged.connect(self.table_item_selection_changed)
+        self.comboBox_alternatives.currentIndexChanged.connect(self.alternative_selected)
 
         # Tab order
         self.setTabOrder(self.lineEdit_source, self.lineEdit_destination)
@@ -981,26 +997,13 @@ class MainWindow(QtWidgets.QMainWindow):
 
         return security_prio
 
-    def get_restrictions_avoidance(self) -> List[int]:
-        if not self.avoidance_enabled():
-            return []
-
-        res = []
-        for entity in self.avoidance_list():
-            idx = self.eve_db.name2id(entity)
-
-            if idx:
-                res.append(idx)
-                continue
-
-            idx = self.eve_db.region_name_to_id(entity)
-
-            if not idx:
-                continue
-
-            res.extend(self.eve_db.get_region_system_ids(idx))
-
-        return res
+    def get_restrictions_avoidance(self) -> AvoidanceSet:
+        # Only resolved again when the list changes; the same set keeps its
+        # compiled masks across route requests
+        entries = tuple(self.avoidance_list()) if self.avoidance_enabled() else ()
+        if self._avoidance is None or self._avoidance.entries != entries:
+            self._avoidance = AvoidanceSet.resolve(self.eve_db, entries)
+        return self._avoidance
 
     def get_restrictions(self) -> Restrictions:
         size_restriction = self.get_restrictions_size()
@@ -1022,6 +1025,9 @@ class MainWindow(QtWidgets.QMainWindow):
     def _clear_results(self):
         self.tableWidget_path.setRowCount(0)
         self.lineEdit_short_format.setText("")
+        self.route_alternatives = []
+        self.comboBox_alternatives.clear()
+        self.comboBox_alternatives.setVisible(False)
 
     def find_path(self):
         source_sys_name = self.nav.eve_db.normalize_name(self.lineEdit_source.text().strip())
@@ -1035,6 +1041,15 @@ class MainWindow(QtWidgets.QMainWindow):
             if not dest_sys_name:
                 error_msg.append("destination")
             error_msg = "Invalid system name in {}.".format(" and ".join(error_msg))
+            suggestions = []
+            for sys_name, line_edit in (
+                (source_sys_name, self.lineEdit_source),
+                (dest_sys_name, self.lineEdit_destination),
+            ):
+                if not sys_name:
+                    suggestions.extend(self.nav.eve_db.suggest_system_names(line_edit.text(), 1))
+            if suggestions:
+                error_msg += " Did you mean {}?".format(" and ".join(suggestions))
             self._path_message(error_msg, MessageType.ERROR)
             return
 
@@ -1046,16 +1061,35 @@ class MainWindow(QtWidgets.QMainWindow):
             self.eve_db.name2id(dest_sys_name),
         )
 
-    @QtCore.Slot(list, str)
-    def route_result_handler(self, route, short_format):
+    @QtCore.Slot(list)
+    def route_result_handler(self, alternatives):
         self.pushButton_find_path.setEnabled(True)
         self.progressBar_route.setVisible(False)
 
-        if not route:
+        if not alternatives or not alternatives[0][0]:
             self._clear_results()
             self._path_message("No path found between the solar systems.", MessageType.ERROR)
             return
 
+        self.route_alternatives = alternatives
+        self.comboBox_alternatives.blockSignals(True)
+        self.comboBox_alternatives.clear()
+        for idx, (route, _) in enumerate(alternatives):
+            jumps, wormholes = Navigation.route_summary(route)
+            self.comboBox_alternatives.addItem(
+                "Route {}: {} jumps, {} via wormhole".format(idx + 1, jumps, wormholes)
+            )
+        self.comboBox_alternatives.setCurrentIndex(0)
+        self.comboBox_alternatives.blockSignals(False)
+        self.comboBox_alternatives.setVisible(len(alternatives) > 1)
+        self._show_route(*alternatives[0])
+
+    @QtCore.Slot(int)
+    def alternative_selected(self, index):
+        if 0 <= index < len(self.route_alternatives):
+            self._show_route(*self.route_alternatives[index])
+
+    def _show_route(self, route, short_format):
         route_length = len(route)
         if route_length == 1:
             self._path_message("Set the same source and destination :P", MessageType.OK)
@@ -1161,7 +1195,6 @@ class MainWindow(QtWidgets.QMainWindow):
         for source in self.source_manager.get_sources():
             if not source.enabled:
                 self.nav.solar_map.connection_db.clear_source(source.id)
-                self.nav.solar_map._graph_dirty = True
                 # Clear last fetch result so it doesn't show outdated numbers in the status bar
                 if hasattr(self, "last_fetch_results") and source.name in self.last_fetch_results:
                     del self.last_fetch_results[source.name]
@@ -1324,13 +1357,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.pushButton_trip_get.setEnabled(has_active and not self.worker_thread.isRunning())
 
     def update_auto_refresh_state(self):
-        self.auto_refresh_timer.setInterval(self.auto_refresh_interval * 1000)
         has_active = any(s.enabled for s in self.source_manager.sources)
         if self.auto_refresh_enabled and has_active:
-            if not self.auto_refresh_timer.isActive():
-                self.auto_refresh_timer.start()
+            # Each source refreshes on its own schedule, see RefreshScheduler
+            self.source_manager.start_auto_refresh(
+                lambda: self.nav.solar_map, self.auto_refresh_interval
+            )
         else:
-            self.auto_refresh_timer.stop()
+            self.source_manager.stop_auto_refresh()
 
     @QtCore.Slot(str)
     def btn_refresh_source_clicked(self, source_id):
@@ -1351,19 +1385,12 @@ class MainWindow(QtWidgets.QMainWindow):
             self._update_sources_status()
             self._message_box("Wormhole Sources", "Update process is already running.")
 
-    @QtCore.Slot()
-    def auto_refresh_triggered(self):
-        from shortcircuit.model.mapsource import SourceType
-
-        has_active = any(s.enabled for s in self.source_manager.sources)
-        if not self.worker_thread.isRunning() and has_active:
-            self.btn_trip_get_clicked()
-        elif self.worker_thread.isRunning():
-            # Silently skip if already running to avoid spamming status bar
-            pass
-        else:
-            # Credentials missing or other issue
-            self._update_sources_status()
+    @QtCore.Slot(str, int)
+    def source_refreshed(self, name, count):
+        if not hasattr(self, "last_fetch_results"):
+            self.last_fetch_results = {}
+        self.last_fetch_results[name] = count
+        self._update_sources_status()
 
     @QtCore.Slot()
     def btn_system_avoid_add_clicked(self):
@@ -1523,6 +1550,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.worker_thread.quit()
         self.worker_thread.wait()
+        self.source_manager.shutdown()
 
         self.version_thread.quit()
         self.version_thread.wait()
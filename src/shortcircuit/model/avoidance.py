@@ -0,0 +1,94 @@
+# avoidance.py
+
+from typing import TYPE_CHECKING, FrozenSet, Iterable, Iterator, Optional, Tuple
+
+from .csr_graph import CsrGraph, RoutingGraph
+
+if TYPE_CHECKING:
+  from .evedb import EveDb
+
+
+class AvoidanceSet:
+  """
+  Avoidance list resolved to system IDs once
+
+  Entries are system or region names; regions expand to their systems.
+  Iterating yields the system IDs, so an instance can stand in for
+  `Restrictions["avoidance_list"]`. `mask` lowers it to a byte per index
+  of a routing graph, with the base layer part computed once per base.
+  """
+
+  __slots__ = ('entries', 'system_ids', '_base_mask')
+
+  def __init__(self, system_ids: Iterable[int], entries: Tuple[str, ...] = ()):
+    self.entries = entries
+    self.system_ids: FrozenSet[int] = frozenset(system_ids)
+    # (base, mask over its indices, IDs outside of it)
+    self._base_mask: Optional[Tuple[CsrGraph, bytes, Tuple[int, ...]]] = None
+
+  @classmethod
+  def resolve(cls, eve_db: 'EveDb', entries: Iterable[str]) -> 'AvoidanceSet':
+    """
+    Unknown names are skipped.
+    """
+    entries = tuple(entries)
+    system_ids = set()
+    for entity in entries:
+      system_id = eve_db.name2id(entity)
+      if system_id:
+        system_ids.add(system_id)
+        continue
+      region_id = eve_db.region_name_to_id(entity)
+      if region_id:
+        system_ids.update(eve_db.get_region_system_ids(region_id))
+    return cls(system_ids, entries)
+
+  def __iter__(self) -> Iterator[int]:
+    return iter(self.system_ids)
+
+  def __len__(self) -> int:
+    return len(self.system_ids)
+
+  def __contains__(self, system_id: object) -> bool:
+    return system_id in self.system_ids
+
+  def __eq__(self, other: object) -> bool:
+    return isinstance(other, AvoidanceSet) and other.system_ids == self.system_ids
+
+  def __hash__(self) -> int:
+    return hash(self.system_ids)
+
+  def __getstate__(self):
+    # The mask cache holds a whole graph, workers rebuild their own
+    return (self.entries, self.system_ids)
+
+  def __setstate__(self, state):
+    self.entries, self.system_ids = state
+    self._base_mask = None
+
+  def mask(self, graph: RoutingGraph) -> bytearray:
+    """
+    Fresh `bytearray(len(graph))` with 1 at every avoided index.
+    """
+    base = graph.base
+    cached = self._base_mask
+    if cached is None or cached[0] is not base:
+      base_mask = bytearray(len(base))
+      outside = []
+      for system_id in self.system_ids:
+        idx = base.index_of(system_id)
+        if idx is None:
+          outside.append(system_id)
+        else:
+          base_mask[idx] = 1
+      cached = (base, bytes(base_mask), tuple(outside))
+      self._base_mask = cached
+
+    mask = bytearray(cached[1])
+    mask.extend(bytes(len(graph) - len(mask)))
+    # Systems missing from the gate layer may still be chain systems
+    for system_id in cached[2]:
+      idx = graph.index_of(system_id)
+      if idx is not None:
+        mask[idx] = 1
+    return mask
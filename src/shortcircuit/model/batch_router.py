@@ -0,0 +1,289 @@
+# batch_router.py
+
+import atexit
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# NOTE: worker processes import this module, keep it free of Qt and of
+# `evedb` / `solarmap` at module level.
+from .csr_graph import (
+  INFINITY,
+  CompiledRestrictions,
+  CsrGraph,
+  EdgeFilter,
+  RoutingGraph,
+  dijkstra,
+  shortest_path_tree,
+)
+
+if TYPE_CHECKING:
+  from .evedb import Restrictions
+  from .solarmap import SolarMap
+
+RouteRequest = Tuple[int, int, 'Restrictions']
+
+# Arguments of `CompiledRestrictions.compile` after the graph:
+# (type costs, wormhole cost, edge filter, avoid mask)
+_Params = Tuple[List[float], float, EdgeFilter, bytearray]
+
+# (source, restriction fingerprint, params, [(position, destination)])
+_Job = Tuple[int, Hashable, _Params, List[Tuple[int, int]]]
+
+# (snapshot key, pickled overlay), see `_overlay_snapshot`
+_Overlay = Tuple[int, bytes]
+
+# Worker side: the base layer sent once by `_init_worker`, and the graph
+# for the overlay snapshot last seen
+_base: Optional[CsrGraph] = None
+_snapshot: Optional[RoutingGraph] = None
+_snapshot_key: Optional[int] = None
+# fingerprint -> restrictions compiled against `_snapshot`
+_compiled: Dict[Hashable, CompiledRestrictions] = {}
+
+# Parent side: the pool outlives routers, see `_executor`
+_pool: Optional[ProcessPoolExecutor] = None
+# (base layer, worker count) the pool was started for
+_pool_config: Optional[Tuple[CsrGraph, int]] = None
+# ((graph, graph version), overlay snapshot), the graph is held so its
+# identity cannot be reused by another map
+_last_overlay: Optional[Tuple[Tuple[RoutingGraph, int], _Overlay]] = None
+_snapshot_keys = itertools.count()
+_pool_lock = threading.Lock()
+
+
+def _init_worker(base: bytes):
+  global _base, _snapshot, _snapshot_key
+  _base = pickle.loads(base)
+  _snapshot = _snapshot_key = None
+  _compiled.clear()
+
+
+def _load_overlay(overlay: _Overlay) -> RoutingGraph:
+  """
+  Graph of a worker for `overlay`, unpickled only when its key changes.
+  """
+  global _snapshot, _snapshot_key
+  key, data = overlay
+  if key != _snapshot_key:
+    graph = RoutingGraph(_base)
+    graph.overlay, graph.extra_ids, graph.extra_types, graph.extra_index = pickle.loads(data)
+    _snapshot, _snapshot_key = graph, key
+    _compiled.clear()
+  return _snapshot
+
+
+def _run_pooled(job: _Job, overlay: _Overlay) -> List[Tuple[int, List[int]]]:
+  graph = _load_overlay(overlay)
+  weights = _compiled.get(job[1])
+  if weights is None:
+    weights = CompiledRestrictions.compile(graph, *job[2])
+    _compiled[job[1]] = weights
+  return _run_job(job, graph, weights)
+
+
+def _overlay_snapshot(graph: RoutingGraph, version: int) -> _Overlay:
+  """
+  Overlay of `graph` at `version` for the workers, pickled once per version.
+  """
+  global _last_overlay
+  with _pool_lock:
+    last = _last_overlay
+    if last is not None and last[0][0] is graph and last[0][1] == version:
+      return last[1]
+    data = pickle.dumps(
+      (graph.overlay, graph.extra_ids, graph.extra_types, graph.extra_index),
+      protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    overlay = (next(_snapshot_keys), data)
+    _last_overlay = ((graph, version), overlay)
+    return overlay
+
+
+def _executor(base: CsrGraph, workers: int) -> ProcessPoolExecutor:
+  """
+  The shared pool, started on first use and again only when the base layer
+  or the worker count changes.
+  """
+  global _pool, _pool_config
+  with _pool_lock:
+    if _pool is not None and _pool_config is not None and (
+      _pool_config[0] is not base or _pool_config[1] != workers
+    ):
+      _pool.shutdown(wait=False, cancel_futures=True)
+      _pool = None
+    if _pool is None:
+      # Spawned, not forked: the app has threads running and locks held
+      # that a forked worker would inherit mid-flight
+      _pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(pickle.dumps(base, protocol=pickle.HIGHEST_PROTOCOL),),
+      )
+      _pool_config = (base, workers)
+    return _pool
+
+
+def shutdown_pool():
+  """
+  Stop the worker processes. The next pooled `BatchRouter.route` starts
+  new ones.
+  """
+  global _pool, _pool_config, _last_overlay
+  with _pool_lock:
+    pool = _pool
+    _pool = _pool_config = _last_overlay = None
+  if pool is not None:
+    pool.shutdown()
+
+
+atexit.register(shutdown_pool)
+
+
+def _run_job(
+  job: _Job,
+  graph: RoutingGraph,
+  weights: CompiledRestrictions,
+) -> List[Tuple[int, List[int]]]:
+  """
+  Routes every destination of one source group.
+
+  A lone destination gets a point-to-point search, which stops early and
+  picks the same path as `SolarMap.shortest_path`. Larger groups share one
+  shortest-path tree.
+  """
+  source, _, _, targets = job
+  if len(targets) == 1:
+    position, destination = targets[0]
+    path = dijkstra(graph, source, destination, weights)
+    return [(position, [graph.system_id(x) for x in path])]
+
+  distance, parent = shortest_path_tree(graph, source, weights)
+  ret = []
+  for position, destination in targets:
+    path: List[int] = []
+    if distance[destination] < INFINITY:
+      u = destination
+      while u >= 0:
+        path.append(graph.system_id(u))
+        u = parent[u]
+      path.reverse()
+    ret.append((position, path))
+  return ret
+
+
+class BatchRouter:
+  """
+  Routes many (source, destination, restrictions) requests at once
+
+  Requests are grouped by source and restrictions so each group needs a
+  single search. Large batches fan out over a process pool shared by all
+  routers: workers get the frozen base layer once when they start, and
+  the chain overlay again only when `graph_version` moves on. Results
+  stream back in submission order.
+  """
+
+  # Below this many groups the pool costs more than it saves. A warm pool
+  # adds about a millisecond per group, starting one some 0.3s.
+  MIN_POOL_GROUPS = 16
+
+  def __init__(self, solar_map: 'SolarMap', workers: Optional[int] = None):
+    """
+    :param workers: Process count, defaults to the CPU count. 1 routes in
+      the calling process.
+    """
+    self.solar_map = solar_map
+    self.workers = workers or os.cpu_count() or 1
+    # fingerprint -> restrictions of the last `route` call
+    self._restrictions: Dict[Hashable, 'Restrictions'] = {}
+
+  def _plan(self, requests: List[RouteRequest]) -> Tuple[Dict[int, List[int]], List[_Job]]:
+    """
+    :return: (answers known without searching, jobs)
+    """
+    from .evedb import SpaceType
+    from .route_cache import RouteCache
+    solar_map = self.solar_map
+    graph = solar_map.graph
+    known: Dict[int, List[int]] = {}
+    groups: Dict[Tuple[int, Hashable], _Job] = {}
+    self._restrictions = {}
+    for position, (source, destination, restrictions) in enumerate(requests):
+      # Same early outs as `SolarMap.shortest_path`
+      if (
+        not solar_map._has_connections(source) or
+        not solar_map._has_connections(destination)
+      ):
+        known[position] = []
+        continue
+      if source == destination:
+        known[position] = [source]
+        continue
+
+      fingerprint = RouteCache.fingerprint(restrictions)
+      job = groups.get((source, fingerprint))
+      if job is None:
+        if fingerprint not in self._restrictions:
+          self._restrictions[fingerprint] = restrictions
+        params = (
+          solar_map._type_costs(restrictions),
+          restrictions["security_prio"].get(SpaceType.WH, 1),
+          solar_map._edge_filter(restrictions),
+          solar_map._avoid_mask(restrictions),
+        )
+        job = (graph.index_of(source), fingerprint, params, [])
+        groups[(source, fingerprint)] = job
+      job[3].append((position, graph.index_of(destination)))
+    return known, list(groups.values())
+
+  def route(self, requests: Iterable[RouteRequest]) -> Iterator[List[int]]:
+    """
+    Yields one path (system IDs, empty if unreachable) per request, in
+    submission order, as soon as it and all earlier ones are done.
+    """
+    requests = list(requests)
+    self.solar_map._build_graph()
+    known, jobs = self._plan(requests)
+    # Jobs are ordered by their first request, so finishing them in order
+    # releases results in submission order
+    results = self._run_local(jobs) if (
+      self.workers <= 1 or len(jobs) < self.MIN_POOL_GROUPS
+    ) else self._run_pool(jobs)
+
+    position = 0
+    for batch in results:
+      known.update(batch)
+      while position in known:
+        yield known.pop(position)
+        position += 1
+    while position < len(requests):
+      yield known.pop(position)
+      position += 1
+
+  def _run_local(self, jobs: List[_Job]) -> Iterator[List[Tuple[int, List[int]]]]:
+    solar_map = self.solar_map
+    for job in jobs:
+      weights = solar_map.compile_restrictions(self._restrictions[job[1]])
+      yield _run_job(job, solar_map.graph, weights)
+
+  def _run_pool(self, jobs: List[_Job]) -> Iterator[List[Tuple[int, List[int]]]]:
+    graph = self.solar_map.graph
+    overlay = _overlay_snapshot(graph, self.solar_map.graph_version)
+    pool = _executor(graph.base, self.workers)
+    futures = [pool.submit(_run_pooled, job, overlay) for job in jobs]
+    try:
+      for future in futures:
+        yield future.result()
+    except BrokenProcessPool:
+      # A dead worker breaks the whole pool, start over on the next call
+      shutdown_pool()
+      raise
+    finally:
+      for future in futures:
+        future.cancel()
@@ -0,0 +1,90 @@
+import pytest
+
+from shortcircuit.model.connection_db import ConnectionData
+from shortcircuit.model.csr_graph import path_cost
+from shortcircuit.model.evedb import EveDb, SpaceType
+from shortcircuit.model.solarmap import ConnectionType, SearchMode, SolarMap
+
+
+@pytest.fixture
+def make_restrictions():
+  """
+  Builds routing restrictions. Every space type costs 1 unless given by
+  name, e.g. `make_restrictions(NS=10)`.
+  """
+
+  def make(avoidance_list=None, size_restriction=None, **security_prio):
+    restrictions = {
+      "avoidance_list": [] if avoidance_list is None else avoidance_list,
+      "security_prio": {x: security_prio.get(x.name, 1) for x in SpaceType},
+    }
+    if size_restriction is not None:
+      restrictions["size_restriction"] = dict(size_restriction)
+    return restrictions
+
+  return make
+
+
+@pytest.fixture
+def make_wormhole():
+  """
+  Builds a wormhole between two systems by name, keyword arguments
+  override the `ConnectionData` fields.
+  """
+
+  def make(eve_db, source, dest, **fields):
+    return ConnectionData(
+      source_id="test",
+      source_system=eve_db.name2id(source),
+      dest_system=eve_db.name2id(dest),
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+      **fields,
+    )
+
+  return make
+
+
+@pytest.fixture
+def wormhole_map(make_wormhole):
+  """
+  Map with a single wormhole, from Botane to Ikuchi.
+  """
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  return map
+
+
+@pytest.fixture
+def check_route():
+  """
+  Finds a route with the given search mode and checks that it is valid and
+  costs as much as the Dijkstra one.
+  """
+
+  def check(map, source, destination, restrictions, mode):
+    expected = map.shortest_path(source, destination, restrictions, SearchMode.DIJKSTRA)
+    path = map.shortest_path(source, destination, restrictions, mode)
+
+    graph = map.graph
+    weights = map.compile_restrictions(restrictions)
+    assert [path[0], path[-1]] == [source, destination]
+    assert all(map.get_weight(u, v) is not None for u, v in zip(path, path[1:]))
+    assert path_cost(graph, [graph.index_of(x) for x in path], weights) == path_cost(
+      graph, [graph.index_of(x) for x in expected], weights
+    )
+    return path
+
+  return check
+
+
+@pytest.fixture
+def contraction_dir(tmp_path, monkeypatch):
+  """
+  Contraction hierarchies are built into and loaded from `tmp_path` only.
+  """
+  monkeypatch.setattr(SolarMap, "contraction_dir", str(tmp_path))
+  monkeypatch.setattr(SolarMap, "_shared_contractions", type(SolarMap._shared_contractions)())
+  return tmp_path
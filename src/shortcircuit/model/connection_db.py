@@ -1,5 +1,7 @@
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Optional
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional
 from datetime import datetime, timezone
 from shortcircuit.model.solarmap import ConnectionType
 from shortcircuit.model.evedb import WormholeSize, WormholeTimespan, WormholeMassspan
@@ -24,80 +26,288 @@ class ConnectionData:
     
     updated_at: float = field(default_factory=lambda: datetime.now(timezone.utc).timestamp())
 
+    def reversed(self) -> 'ConnectionData':
+        """The same connection seen from `dest_system`."""
+        return replace(
+            self,
+            source_system=self.dest_system,
+            dest_system=self.source_system,
+            sig_source=self.sig_dest,
+            code_source=self.code_dest,
+            sig_dest=self.sig_source,
+            code_dest=self.code_source,
+        )
+
 
 class ConnectionDB:
     """
     In-memory database for storing connections from multiple map sources.
-    Handles deduplication and conflict resolution at query time.
+    Handles deduplication and conflict resolution.
+    Connections are undirected: both orientations share the key
+    (min(system), max(system)) and are stored oriented along it, so the
+    same wormhole reported from either side by different sources is one
+    entry. The winning connection of every key is kept up to date as
+    connections come and go, re-resolving only the keys a change touched.
+    Every key whose winner changed since the last `pop_changes()` is
+    recorded so consumers can patch instead of rebuild.
+    Keys are also indexed by source_id, so one source's data is cleared
+    or replaced in time proportional to its own connections.
     """
+
+    # Connections older than this never win, see `resolve`
+    MAX_AGE_HOURS = 48.0
+
     def __init__(self):
-        # Maps (source_system, dest_system) -> Dict[source_id, ConnectionData]
+        # Maps (low system, high system) -> Dict[source_id, ConnectionData]
         self._connections: Dict[Tuple[int, int], Dict[str, ConnectionData]] = {}
+        # Maps source_id -> keys it holds a connection for
+        self._by_source: Dict[str, Set[Tuple[int, int]]] = {}
+        # Maps key -> winning connection, for keys that have one
+        self._winners: Dict[Tuple[int, int], ConnectionData] = {}
+        # Snapshot of the winners handed out by `resolved`, None when stale
+        self._resolved: Optional[Tuple[ConnectionData, ...]] = None
+        self._listeners: List[Callable[[Tuple[int, int], Optional[ConnectionData]], None]] = []
+        self._changes: Set[Tuple[int, int]] = set()
+        # Maps source_id -> number of its connections changed so far
+        self._source_changes: Dict[str, int] = {}
+        # Sources being collected by `replacing`, see `add_connection`
+        self._staged: Dict[str, List[ConnectionData]] = {}
+        # Guards mutations against readers on other threads
+        self._lock = threading.RLock()
 
     def add_connection(self, data: ConnectionData):
+        with self._lock:
+            staged = self._staged.get(data.source_id)
+            if staged is not None:
+                staged.append(data)
+                return
+            self._count_changes(data.source_id, 1)
+            self._settle((self._add(data),))
+
+    @staticmethod
+    def key(source_system: int, dest_system: int) -> Tuple[int, int]:
+        """Canonical key of the connection between two systems."""
+        if source_system > dest_system:
+            return dest_system, source_system
+        return source_system, dest_system
+
+    def subscribe(self, callback: Callable[[Tuple[int, int], Optional[ConnectionData]], None]):
+        """
+        Calls `callback(key, winner)` whenever the winner of a key changes,
+        with None once the key has none. Callbacks run on the mutating
+        thread with the lock held, so they should be quick.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Tuple[int, int], Optional[ConnectionData]], None]):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def _add(self, data: ConnectionData) -> Tuple[int, int]:
+        if data.source_system > data.dest_system:
+            data = data.reversed()
         key = (data.source_system, data.dest_system)
         if key not in self._connections:
             self._connections[key] = {}
         self._connections[key][data.source_id] = data
+        self._by_source.setdefault(data.source_id, set()).add(key)
+        return key
+
+    def _remove(self, key: Tuple[int, int], source_id: str):
+        sources_dict = self._connections[key]
+        del sources_dict[source_id]
+        if not sources_dict:
+            del self._connections[key]
+
+    @staticmethod
+    def _same(conn: Optional[ConnectionData], other: Optional[ConnectionData]) -> bool:
+        """True if both are the same connection, apart from their age."""
+        if conn is other:
+            return True
+        if conn is None or other is None:
+            return False
+        return replace(conn, time_elapsed=other.time_elapsed, updated_at=other.updated_at) == other
+
+    def _count_changes(self, source_id: str, count: int):
+        if count:
+            self._source_changes[source_id] = self._source_changes.get(source_id, 0) + count
+
+    def change_count(self, source_id: str) -> int:
+        """
+        Number of connections of `source_id` added, removed or changed in
+        more than their age so far. Compare two readings to tell whether a
+        fetch changed anything.
+        """
+        with self._lock:
+            return self._source_changes.get(source_id, 0)
+
+    def _settle(self, keys: Iterable[Tuple[int, int]]):
+        """Re-resolve `keys` after their connections changed."""
+        for key in keys:
+            sources_dict = self._connections.get(key)
+            winner = None
+            if sources_dict:
+                winner = self._resolve_sources(sources_dict, self.MAX_AGE_HOURS)
+            if winner is self._winners.get(key):
+                continue
+            if winner is None:
+                del self._winners[key]
+            else:
+                self._winners[key] = winner
+            self._resolved = None
+            self._changes.add(key)
+            for callback in self._listeners:
+                callback(key, winner)
 
     def remove_connection(self, source_system: int, dest_system: int, source_id: str):
-        key = (source_system, dest_system)
-        if key in self._connections and source_id in self._connections[key]:
-            del self._connections[key][source_id]
-            if not self._connections[key]:
-                del self._connections[key]
+        key = self.key(source_system, dest_system)
+        with self._lock:
+            if key in self._connections and source_id in self._connections[key]:
+                self._remove(key, source_id)
+                self._count_changes(source_id, 1)
+                self._settle((key,))
+                keys = self._by_source[source_id]
+                keys.discard(key)
+                if not keys:
+                    del self._by_source[source_id]
 
     def clear_source(self, source_id: str):
         """Remove all connections from a specific source."""
-        empty_keys = []
-        for key, sources_dict in self._connections.items():
-            if source_id in sources_dict:
-                del sources_dict[source_id]
-                if not sources_dict:
-                    empty_keys.append(key)
-        for key in empty_keys:
-            del self._connections[key]
+        self.replace_source(source_id, ())
+
+    def replace_source(self, source_id: str, connections: Iterable[ConnectionData]):
+        """
+        Swap all connections of `source_id` for `connections` in one step:
+        other threads see either the old or the new set, never a mix.
+        """
+        connections = list(connections)
+        with self._lock:
+            touched = self._by_source.pop(source_id, set())
+            previous = {key: self._connections[key][source_id] for key in touched}
+            for key in touched:
+                self._remove(key, source_id)
+            for data in connections:
+                touched.add(self._add(data))
+            self._count_changes(source_id, sum(
+                not self._same(previous.get(key), self._connections.get(key, {}).get(source_id))
+                for key in touched
+            ))
+            self._settle(touched)
+
+    @contextmanager
+    def replacing(self, source_id: str) -> Iterator[None]:
+        """
+        Collects every `add_connection` for `source_id` made inside the
+        block, then swaps them in with `replace_source`, also when the block
+        raises.
+        """
+        with self._lock:
+            self._staged[source_id] = []
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.replace_source(source_id, self._staged.pop(source_id))
+
+    def keys(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            return list(self._connections.keys())
+
+    def pop_changes(self) -> Set[Tuple[int, int]]:
+        """Return and forget the keys whose winner changed since the previous call."""
+        with self._lock:
+            changes = self._changes
+            self._changes = set()
+            return changes
 
-    def get_resolved_connections(self, max_age_hours: float = 48.0) -> List[ConnectionData]:
+    @staticmethod
+    def prefer(conn: ConnectionData, best: Optional[ConnectionData]) -> bool:
         """
-        Returns a deduplicated list of connections.
-        Conflict resolution:
+        True if `conn` should replace `best` as the resolved connection.
         1. Gates always win over Wormholes.
         2. Fresher data (lower time_elapsed) wins.
         3. If same age, healthier status wins.
         """
+        if best is None:
+            return True
+
+        # Gates take precedence
+        if conn.con_type == ConnectionType.GATE and best.con_type != ConnectionType.GATE:
+            return True
+        if best.con_type == ConnectionType.GATE and conn.con_type != ConnectionType.GATE:
+            return False
+
+        # If both are wormholes or both are gates
+        if conn.con_type == ConnectionType.WORMHOLE:
+            if conn.time_elapsed < best.time_elapsed:
+                return True
+            if conn.time_elapsed == best.time_elapsed:
+                # Tie-breaker: Health (Stable < Critical)
+                # WormholeTimespan: STABLE=0, CRITICAL=1
+                return conn.wh_life < best.wh_life
+        return False
+
+    @staticmethod
+    def _resolve_sources(
+        sources_dict: Dict[str, ConnectionData], max_age_hours: float
+    ) -> Optional[ConnectionData]:
+        best_conn = None
+        for conn in sources_dict.values():
+            # Filter out stale connections based on our internal DB timestamp or age
+            # (Assuming time_elapsed is the primary age indicator provided by sources)
+            if conn.time_elapsed > max_age_hours:
+                continue
+
+            if ConnectionDB.prefer(conn, best_conn):
+                best_conn = conn
+        return best_conn
+
+    def resolve(
+        self, source_system: int, dest_system: int, max_age_hours: float = MAX_AGE_HOURS
+    ) -> Optional[ConnectionData]:
+        """
+        Resolved connection between two systems, oriented from
+        `source_system` to `dest_system`, or None.
+        Only another `max_age_hours` than `MAX_AGE_HOURS` resolves anew.
+        """
+        key = self.key(source_system, dest_system)
+        with self._lock:
+            if max_age_hours == self.MAX_AGE_HOURS:
+                best_conn = self._winners.get(key)
+            else:
+                sources_dict = self._connections.get(key)
+                if not sources_dict:
+                    return None
+                best_conn = self._resolve_sources(sources_dict, max_age_hours)
+        if best_conn is not None and best_conn.source_system != source_system:
+            best_conn = best_conn.reversed()
+        return best_conn
+
+    def resolved(self) -> Iterator[ConnectionData]:
+        """
+        Iterates the winning connections, one per system pair, each oriented
+        from the lower to the higher system ID. Iteration runs over a
+        snapshot that is shared by calls until the winners change.
+        """
+        with self._lock:
+            if self._resolved is None:
+                self._resolved = tuple(self._winners.values())
+            return iter(self._resolved)
+
+    def get_resolved_connections(self, max_age_hours: float = MAX_AGE_HOURS) -> List[ConnectionData]:
+        """
+        Returns a deduplicated list of connections, one per system pair,
+        each oriented from the lower to the higher system ID.
+        Conflict resolution is described in `prefer`.
+        """
+        if max_age_hours == self.MAX_AGE_HOURS:
+            return list(self.resolved())
         resolved = []
-        for (src, dst), sources_dict in self._connections.items():
-            best_conn = None
-            
-            for conn in sources_dict.values():
-                # Filter out stale connections based on our internal DB timestamp or age
-                # (Assuming time_elapsed is the primary age indicator provided by sources)
-                if conn.time_elapsed > max_age_hours:
-                    continue
-                
-                if best_conn is None:
-                    best_conn = conn
-                    continue
-                
-                # Gates take precedence
-                if conn.con_type == ConnectionType.GATE and best_conn.con_type != ConnectionType.GATE:
-                    best_conn = conn
-                    continue
-                if best_conn.con_type == ConnectionType.GATE and conn.con_type != ConnectionType.GATE:
-                    continue
-                    
-                # If both are wormholes or both are gates
-                if conn.con_type == ConnectionType.WORMHOLE:
-                    if conn.time_elapsed < best_conn.time_elapsed:
-                        best_conn = conn
-                    elif conn.time_elapsed == best_conn.time_elapsed:
-                        # Tie-breaker: Health (Stable < Critical)
-                        # WormholeTimespan: STABLE=0, CRITICAL=1
-                        if conn.wh_life < best_conn.wh_life:
-                            best_conn = conn
-                            
-            if best_conn:
-                resolved.append(best_conn)
-                
+        with self._lock:
+            for sources_dict in self._connections.values():
+                best_conn = self._resolve_sources(sources_dict, max_age_hours)
+                if best_conn:
+                    resolved.append(best_conn)
+
         return resolved
@@ -0,0 +1,537 @@
+# contraction.py
+
+import hashlib
+import heapq
+import os
+from array import array
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
+
+from .csr_graph import INFINITY, CompiledRestrictions, CsrGraph, RoutingGraph, SearchStats
+
+# One side of an upward search: (distance, parent) by index
+SearchSpace = Tuple[Dict[int, float], Dict[int, int]]
+# Downward edges by their upper end: u -> [(v, cost of u -> v)]
+Descents = Dict[int, List[Tuple[int, float]]]
+
+
+class Metric:
+  """
+  Costs over the edges of a hierarchy for one set of avoided systems
+
+  Parallel to `ContractionHierarchy.targets`: `up_costs[e]` is the cost of
+  climbing edge `e`, `down_costs[e]` the cost of descending it.
+  `*_middle[e]` is the contracted system the cheapest way over it skips,
+  -1 for plain gates.
+  """
+
+  __slots__ = ('up_costs', 'up_middle', 'down_costs', 'down_middle')
+
+  def __init__(self, up_costs: array, up_middle: array, down_costs: array, down_middle: array):
+    self.up_costs = up_costs
+    self.up_middle = up_middle
+    self.down_costs = down_costs
+    self.down_middle = down_middle
+
+
+class ContractionHierarchy:
+  """
+  Contraction hierarchy over the gate layer for one gate cost profile
+
+  Systems are contracted in minimum degree order and every shortcut is
+  kept, witness or not, so the shortcut edges hold a climbing then
+  descending route for any set of avoided systems. Their costs are found
+  by customizing: in rank order, each system offers the way over itself
+  to every pair of its higher neighbors. `profile` is customized with
+  nothing avoided. `metric` customizes again skipping avoided systems, in
+  tens of milliseconds and cached per avoid set, so avoidance never
+  rebuilds or persists anything.
+
+  `offsets` / `targets` is the CSR list of edges from every system to its
+  higher ranked neighbors.
+  """
+
+  # Bump when the file layout or the contraction changes
+  FORMAT = 2
+  MAGIC = b'SCCH'
+  COLUMNS = 7
+  # Avoid sets kept customized, see `metric`
+  METRIC_CACHE_SIZE = 8
+
+  __slots__ = (
+    'key',
+    'rank',
+    'offsets',
+    'targets',
+    'profile',
+    '_edges',
+    '_metrics',
+    '_chain',
+  )
+
+  def __init__(self, key: str, columns: List[array]):
+    self.key = key
+    self.rank, self.offsets, self.targets = columns[:3]
+    self.profile = Metric(*columns[3:])
+    # (lower, higher) -> edge, see `_edge`
+    self._edges: Optional[Dict[Tuple[int, int], int]] = None
+    # Avoid mask over the base layer -> metric, see `metric`
+    self._metrics: 'OrderedDict[bytes, Metric]' = OrderedDict()
+    # (compiled overlay, descents towards its endpoints), see `_chain_descents`
+    self._chain: Optional[Tuple[CompiledRestrictions, Descents]] = None
+
+  def __len__(self) -> int:
+    return len(self.rank)
+
+  def _columns(self) -> List[array]:
+    profile = self.profile
+    return [
+      self.rank,
+      self.offsets,
+      self.targets,
+      profile.up_costs,
+      profile.up_middle,
+      profile.down_costs,
+      profile.down_middle,
+    ]
+
+  @classmethod
+  def profile_key(cls, base: CsrGraph, type_costs: List[float]) -> str:
+    """
+    Hex digest identifying the gate layer and the gate costs.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(cls.FORMAT).encode())
+    for column in (base.ids, base.types, base.offsets, base.targets):
+      digest.update(column.tobytes())
+    digest.update(repr([float(x) for x in type_costs]).encode())
+    return digest.hexdigest()
+
+  @classmethod
+  def build(cls, base: CsrGraph, type_costs: List[float]) -> 'ContractionHierarchy':
+    """
+    :param type_costs: Cost of entering a system via a gate, by `SpaceType`
+    """
+    size = len(base)
+    offsets = base.offsets
+    targets = base.targets
+    types = base.types
+
+    neighbors: List[Set[int]] = [set() for _ in range(size)]
+    gates: Set[Tuple[int, int]] = set()
+    for u in range(size):
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if v != u:
+          neighbors[u].add(v)
+          neighbors[v].add(u)
+          gates.add((u, v))
+
+    rank = array('i', [-1]) * size
+    higher: List[List[int]] = [[] for _ in range(size)]
+    # Minimum degree: fewest neighbors left, so fewest shortcuts added
+    queue = [(len(neighbors[v]), v) for v in range(size)]
+    heapq.heapify(queue)
+    order = 0
+    while queue:
+      current, v = heapq.heappop(queue)
+      if rank[v] >= 0 or current != len(neighbors[v]):
+        continue
+      rank[v] = order
+      order += 1
+      higher[v] = sorted(neighbors[v])
+      touched = set(higher[v])
+      for u in higher[v]:
+        links = neighbors[u]
+        links.discard(v)
+        links.update(higher[v])
+        links.discard(u)
+        touched.update(links)
+      neighbors[v] = set()
+      for u in touched:
+        if rank[u] < 0:
+          heapq.heappush(queue, (len(neighbors[u]), u))
+
+    edge_offsets = array('i', [0])
+    edge_targets = array('i')
+    up_costs = array('d')
+    down_costs = array('d')
+    for v in range(size):
+      for w in higher[v]:
+        edge_targets.append(w)
+        up_costs.append(type_costs[types[w]] if (v, w) in gates else INFINITY)
+        down_costs.append(type_costs[types[v]] if (w, v) in gates else INFINITY)
+      edge_offsets.append(len(edge_targets))
+
+    unset = array('i', [-1]) * len(edge_targets)
+    hierarchy = cls(
+      cls.profile_key(base, type_costs),
+      [rank, edge_offsets, edge_targets, up_costs, unset, down_costs, array('i', unset)],
+    )
+    hierarchy.profile = hierarchy._customize(up_costs, down_costs)
+    return hierarchy
+
+  def _edge(self, u: int, v: int) -> int:
+    """
+    Index of the edge between `u` and higher ranked `v`.
+    """
+    if self._edges is None:
+      offsets, targets = self.offsets, self.targets
+      self._edges = {
+        (x, targets[e]): e
+        for x in range(len(self.rank))
+        for e in range(offsets[x], offsets[x + 1])
+      }
+    return self._edges[(u, v)]
+
+  def _customize(self, up: array, down: array, avoid: bytes = b'') -> Metric:
+    """
+    Shortcut costs, starting from the plain gate costs `up` and `down`.
+    Systems set in `avoid` offer no way over themselves.
+    """
+    rank, offsets, targets = self.rank, self.offsets, self.targets
+    up = array('d', up)
+    down = array('d', down)
+    up_middle = array('i', [-1]) * len(targets)
+    down_middle = array('i', [-1]) * len(targets)
+    edge = self._edge
+    for z in sorted(range(len(rank)), key=rank.__getitem__):
+      if avoid and avoid[z]:
+        continue
+      start, end = offsets[z], offsets[z + 1]
+      for i in range(start, end):
+        x = targets[i]
+        into = down[i]
+        if into == INFINITY:
+          continue
+        for j in range(start, end):
+          cost = into + up[j]
+          if i == j or cost == INFINITY:
+            continue
+          y = targets[j]
+          if rank[x] < rank[y]:
+            e = edge(x, y)
+            if cost < up[e]:
+              up[e] = cost
+              up_middle[e] = z
+          else:
+            e = edge(y, x)
+            if cost < down[e]:
+              down[e] = cost
+              down_middle[e] = z
+    return Metric(up, up_middle, down, down_middle)
+
+  def metric(self, avoid: Optional[bytearray] = None) -> Metric:
+    """
+    Costs with the systems set in `avoid`, a mask over at least the base
+    layer, never passed through.
+    """
+    size = len(self.rank)
+    key = bytes(avoid[:size]).ljust(size, b'\0') if avoid else b''
+    if not key.strip(b'\0'):
+      return self.profile
+    metric = self._metrics.get(key)
+    if metric is None:
+      # Gates are never beaten by shortcuts, so they are the unset middles
+      profile = self.profile
+      metric = self._customize(
+        array('d', (
+          c if m < 0 else INFINITY for c, m in zip(profile.up_costs, profile.up_middle)
+        )),
+        array('d', (
+          c if m < 0 else INFINITY for c, m in zip(profile.down_costs, profile.down_middle)
+        )),
+        key,
+      )
+      self._metrics[key] = metric
+    self._metrics.move_to_end(key)
+    while len(self._metrics) > self.METRIC_CACHE_SIZE:
+      self._metrics.popitem(last=False)
+    return metric
+
+  def save(self, path: str):
+    """
+    Writes the hierarchy to `path` atomically.
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+      f.write(self.MAGIC)
+      f.write(self.key.encode('ascii'))
+      for column in self._columns():
+        header = array('q', [len(column)])
+        f.write(column.typecode.encode('ascii'))
+        header.tofile(f)
+        column.tofile(f)
+    os.replace(temporary, path)
+
+  @classmethod
+  def load(cls, path: str, key: str) -> Optional['ContractionHierarchy']:
+    """
+    :return: None if the file is missing, damaged or built for another key
+    """
+    try:
+      with open(path, 'rb') as f:
+        if f.read(len(cls.MAGIC)) != cls.MAGIC:
+          return None
+        if f.read(len(key)).decode('ascii', 'replace') != key:
+          return None
+        columns = [cls._read_column(f) for _ in range(cls.COLUMNS)]
+        if f.read(1):
+          return None
+    except (OSError, EOFError, ValueError):
+      return None
+    return cls(key, columns)
+
+  @staticmethod
+  def _read_column(f: BinaryIO) -> array:
+    typecode = f.read(1).decode('ascii')
+    if typecode not in ('i', 'd'):
+      raise ValueError(typecode)
+    header = array('q')
+    header.fromfile(f, 1)
+    column = array(typecode)
+    column.fromfile(f, header[0])
+    return column
+
+  def _space(
+    self,
+    root: int,
+    forward: bool,
+    metric: Metric,
+    blocked: bytes = b'',
+  ) -> SearchSpace:
+    """
+    Complete upward Dijkstra from `root`. Backward spaces hold the cost
+    from each system to `root`. Systems set in `blocked` are not entered.
+    """
+    offsets, targets = self.offsets, self.targets
+    costs = metric.up_costs if forward else metric.down_costs
+    distance = {root: 0.0}
+    parent: Dict[int, int] = {}
+    done = set()
+    queue = [(0.0, root)]
+    while queue:
+      base_u, u = heapq.heappop(queue)
+      if u in done:
+        continue
+      done.add(u)
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if v < len(blocked) and blocked[v]:
+          continue
+        candidate = base_u + costs[e]
+        if candidate < distance.get(v, INFINITY):
+          distance[v] = candidate
+          parent[v] = u
+          heapq.heappush(queue, (candidate, v))
+    return distance, parent
+
+  def _middle(self, metric: Metric, u: int, v: int) -> int:
+    if self.rank[v] > self.rank[u]:
+      return metric.up_middle[self._edge(u, v)]
+    return metric.down_middle[self._edge(v, u)]
+
+  def _unpack(self, metric: Metric, u: int, v: int, path: List[int]):
+    """
+    Appends the gate hops of hierarchy edge `u -> v` after `u` to `path`.
+    """
+    stack = [(u, v)]
+    while stack:
+      a, b = stack.pop()
+      middle = self._middle(metric, a, b)
+      if middle < 0:
+        path.append(b)
+      else:
+        stack.append((middle, b))
+        stack.append((a, middle))
+
+  def gate_route(
+    self,
+    source: int,
+    destination: int,
+    avoid: Optional[bytearray] = None,
+  ) -> Tuple[float, List[int]]:
+    """
+    Cheapest gate-only route between two base indices.
+
+    :param avoid: Mask of systems not to pass through, see `metric`
+    :return: (cost, path), INFINITY and empty if unreachable
+    """
+    metric = self.metric(avoid)
+    blocked = bytearray(avoid or b'')
+    for x in (source, destination):
+      if x < len(blocked):
+        blocked[x] = 0
+    forward, forward_parent = self._space(source, True, metric, blocked)
+    backward, backward_parent = self._space(destination, False, metric, blocked)
+    best, meeting = min(
+      ((d + backward[v], v) for v, d in forward.items() if v in backward),
+      default=(INFINITY, -1),
+    )
+    if meeting < 0:
+      return INFINITY, []
+
+    upward = [meeting]
+    while upward[-1] != source:
+      upward.append(forward_parent[upward[-1]])
+    upward.reverse()
+    path = [source]
+    for u, v in zip(upward, upward[1:]):
+      self._unpack(metric, u, v, path)
+    u = meeting
+    while u != destination:
+      v = backward_parent[u]
+      self._unpack(metric, u, v, path)
+      u = v
+    return best, path
+
+  def _descents(self, roots: Iterable[int], metric: Metric, blocked: bytes, into: Descents):
+    """
+    Adds the downward edges inside the backward spaces of `roots`: the
+    only ones a gate leg ending at a root can descend.
+    """
+    offsets, targets, costs = self.offsets, self.targets, metric.down_costs
+    seen = set()
+    for root in roots:
+      for v in self._space(root, False, metric, blocked)[0]:
+        if v in seen:
+          continue
+        seen.add(v)
+        for e in range(offsets[v], offsets[v + 1]):
+          into.setdefault(targets[e], []).append((v, costs[e]))
+
+  def _chain_descents(self, weights: CompiledRestrictions, metric: Metric) -> Descents:
+    cached = self._chain
+    if cached is not None and cached[0] is weights:
+      return cached[1]
+
+    size = len(self.rank)
+    avoid = weights.avoid
+    endpoints = set(weights.overlay)
+    for row in weights.overlay.values():
+      endpoints.update(v for v, _ in row)
+    descents: Descents = {}
+    self._descents(
+      (x for x in endpoints if x < size and not (x < len(avoid) and avoid[x])),
+      metric,
+      avoid,
+      descents,
+    )
+
+    self._chain = (weights, descents)
+    return descents
+
+  def route(
+    self,
+    graph: RoutingGraph,
+    source: int,
+    destination: int,
+    weights: CompiledRestrictions,
+    stats: Optional[SearchStats] = None,
+  ) -> List[int]:
+    """
+    Cheapest route over gates and the compiled chain connections.
+
+    Every route is a series of gate legs joined by chain connections, and
+    every shortest gate leg climbs the hierarchy and then descends it. So
+    Dijkstra runs over (system, climbing or descending) states: climbing
+    states follow upward edges, any state may start descending, and chain
+    connections lead to a climbing state at their far end. Descents are
+    pruned to the backward spaces of the destination and the chain.
+
+    Avoided systems other than `source` and `destination` are never
+    entered, and `metric` keeps shortcuts from skipping over them.
+
+    :param weights: Must use the gate costs this hierarchy was built for
+    :return: Path as a list of indices, empty if unreachable
+    """
+    size = len(self.rank)
+    metric = self.metric(weights.avoid)
+    up_offsets, up_targets, up_costs = self.offsets, self.targets, metric.up_costs
+    blocked = weights.blocked_mask(graph, source, destination)
+    chain_descents = self._chain_descents(weights, metric)
+    target_descents: Descents = {}
+    if destination < size:
+      self._descents((destination,), metric, blocked, target_descents)
+    overlay = weights.overlay
+
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    # State `2 * system + descending`. Climbing states can do anything the
+    # descending state of the same system can, so they dominate it.
+    start = 2 * source
+    distance = [INFINITY] * (2 * len(graph))
+    distance[start] = 0
+    # state -> previous state, and whether a hierarchy edge led here
+    parent = array('l', [-1]) * (2 * len(graph))
+    hierarchy = bytearray(2 * len(graph))
+    settled = bytearray(2 * len(graph))
+    queue = [(0.0, start)]
+    count = 0
+    goal = -1
+
+    while queue:
+      base_u, state = pop(queue)
+      if settled[state]:
+        continue
+      settled[state] = 1
+      count += 1
+      u = state >> 1
+      if u == destination:
+        goal = state
+        break
+
+      if u < size:
+        if not state & 1:
+          for e in range(up_offsets[u], up_offsets[u + 1]):
+            v = up_targets[e]
+            if blocked[v]:
+              continue
+            v = 2 * v
+            candidate = base_u + up_costs[e]
+            if candidate < distance[v]:
+              distance[v] = candidate
+              parent[v] = state
+              hierarchy[v] = 1
+              push(queue, (candidate, v))
+        for descents in (chain_descents, target_descents):
+          for v, cost in descents.get(u, ()):
+            if blocked[v]:
+              continue
+            candidate = base_u + cost
+            if candidate < distance[2 * v + 1] and candidate < distance[2 * v]:
+              v = 2 * v + 1
+              distance[v] = candidate
+              parent[v] = state
+              hierarchy[v] = 1
+              push(queue, (candidate, v))
+      for v, cost in overlay.get(u, ()):
+        if blocked[v]:
+          continue
+        v = 2 * v
+        candidate = base_u + cost
+        if candidate < distance[v]:
+          distance[v] = candidate
+          parent[v] = state
+          hierarchy[v] = 0
+          push(queue, (candidate, v))
+
+    if stats is not None:
+      stats.settled = count
+    if goal < 0:
+      return []
+
+    steps = []
+    state = goal
+    while state != start:
+      previous = parent[state]
+      steps.append((previous >> 1, state >> 1, hierarchy[state]))
+      state = previous
+    path = [source]
+    for u, v, via_hierarchy in reversed(steps):
+      if via_hierarchy:
+        self._unpack(metric, u, v, path)
+      else:
+        path.append(v)
+    return path
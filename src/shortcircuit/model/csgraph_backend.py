@@ -0,0 +1,133 @@
+# csgraph_backend.py
+
+from array import array
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
+
+from .csr_graph import INFINITY, CompiledRestrictions, RoutingGraph
+
+try:
+  import numpy as np
+  from scipy.sparse import csgraph, csr_matrix
+  AVAILABLE = True
+except ImportError:
+  AVAILABLE = False
+
+
+class RoutingBackend(str, Enum):
+  AUTO = "auto"
+  PYTHON = "python"
+  SCIPY = "scipy"
+
+
+def resolve_backend(backend: RoutingBackend) -> RoutingBackend:
+  """
+  `AUTO` picks SciPy when it is importable.
+  """
+  if backend == RoutingBackend.AUTO:
+    return RoutingBackend.SCIPY if AVAILABLE else RoutingBackend.PYTHON
+  if backend == RoutingBackend.SCIPY and not AVAILABLE:
+    raise RuntimeError("SciPy routing backend requested but scipy is not installed")
+  return backend
+
+
+def _ints(values: array) -> 'np.ndarray':
+  # array('l') is 4 bytes on Windows and 8 elsewhere
+  return np.frombuffer(values, dtype='i{}'.format(values.itemsize)).astype(np.int64)
+
+
+class CsgraphMatrix:
+  """
+  Routing graph plus compiled restrictions as a `scipy.sparse` CSR matrix
+
+  Filtered out edges (INFINITY cost) are dropped with one vectorized mask.
+  Avoided systems lose their outgoing edges, so they can end a route but
+  not be passed through, which matches the pure-Python engine. Sources
+  that are avoided themselves get a matrix with their edges kept.
+  """
+
+  def __init__(self, graph: RoutingGraph, weights: CompiledRestrictions):
+    if not AVAILABLE:
+      raise RuntimeError("scipy is not installed")
+    self.version = weights.version
+    self.size = len(graph)
+
+    base = graph.base
+    rows = [np.repeat(np.arange(len(base)), np.diff(_ints(base.offsets)))]
+    cols = [_ints(base.targets)]
+    costs = [np.frombuffer(weights.edge_costs, dtype=np.float64)]
+
+    overlay_rows = array('l')
+    overlay_cols = array('l')
+    overlay_costs = array('d')
+    for u, row in weights.overlay.items():
+      for v, cost in row:
+        overlay_rows.append(u)
+        overlay_cols.append(v)
+        overlay_costs.append(cost)
+    rows.append(_ints(overlay_rows))
+    cols.append(_ints(overlay_cols))
+    costs.append(np.array(overlay_costs, dtype=np.float64))
+
+    self._rows = np.concatenate(rows)
+    self._cols = np.concatenate(cols)
+    self._costs = np.concatenate(costs)
+    avoid = np.zeros(self.size, dtype=bool)
+    avoid[:len(weights.avoid)] = np.frombuffer(weights.avoid, dtype=np.uint8).astype(bool)
+    self._avoid = avoid
+    self._allowed = np.isfinite(self._costs)
+    self.matrix = self._build(self._allowed & ~avoid[self._rows])
+
+  def _build(self, keep) -> 'csr_matrix':
+    # Explicit (data, indices, indptr) keeps zero-cost edges as edges
+    rows = self._rows[keep]
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(self.size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=self.size), out=indptr[1:])
+    return csr_matrix(
+      (self._costs[keep][order], self._cols[keep][order], indptr),
+      shape=(self.size, self.size),
+    )
+
+  def _matrix_for(self, source: int) -> 'csr_matrix':
+    if not self._avoid[source]:
+      return self.matrix
+    return self._build(self._allowed & (~self._avoid[self._rows] | (self._rows == source)))
+
+  def tree(self, source: int) -> Tuple[List[float], array]:
+    """
+    Same result as `csr_graph.shortest_path_tree` (forward).
+    """
+    distance, predecessors = csgraph.dijkstra(
+      self._matrix_for(source),
+      directed=True,
+      indices=source,
+      return_predecessors=True,
+    )
+    predecessors[predecessors < 0] = -1
+    return distance.tolist(), array('l', predecessors.tolist())
+
+  def distances(
+    self,
+    sources: Sequence[int],
+    destinations: Optional[Sequence[int]] = None,
+  ) -> List[List[float]]:
+    """
+    Many-to-many route costs, one row per source, INFINITY if unreachable.
+    Without `destinations` every row covers the whole graph.
+    """
+    sources = list(sources)
+    result = np.full((len(sources), self.size), INFINITY)
+    plain = [i for i, s in enumerate(sources) if not self._avoid[s]]
+    if plain:
+      result[plain] = csgraph.dijkstra(
+        self.matrix,
+        directed=True,
+        indices=[sources[i] for i in plain],
+      )
+    for i, source in enumerate(sources):
+      if self._avoid[source]:
+        result[i] = csgraph.dijkstra(self._matrix_for(source), directed=True, indices=source)
+    if destinations is not None:
+      result = result[:, list(destinations)]
+    return result.tolist()
@@ -0,0 +1,780 @@
+# csr_graph.py
+
+import heapq
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# NOTE: mirrors `solarmap.ConnectionType`. Kept as plain ints so this module
+# does not import `solarmap` (which imports us).
+KIND_GATE = 1
+KIND_WORMHOLE = 2
+
+INFINITY = float('inf')
+
+# Edge tuple used while building: (kind, size, life, mass, age, info)
+Edge = Tuple[int, int, int, int, float, Optional[List]]
+
+
+class CsrGraph:
+  """
+  Compressed-sparse-row routing graph
+
+  Systems are mapped to dense indices `0..n-1`; `ids[i]` is the solar system
+  ID of index `i`. Outgoing edges of `i` are `offsets[i]..offsets[i + 1]` in
+  the parallel edge columns (`targets`, `kinds`, `sizes`, `lifes`, `masses`,
+  `ages`). `infos[e]` holds the wormhole info list shown by `Navigation` and
+  is `None` for gates. `types[i]` is the `SpaceType` value of index `i`.
+  """
+
+  __slots__ = (
+    'ids',
+    'index',
+    'types',
+    'offsets',
+    'targets',
+    'kinds',
+    'sizes',
+    'lifes',
+    'masses',
+    'ages',
+    'infos',
+  )
+
+  def __init__(self):
+    self.ids = array('l')
+    self.index: Dict[int, int] = {}
+    self.types = array('B')
+    self.offsets = array('l', [0])
+    self.targets = array('l')
+    self.kinds = array('B')
+    self.sizes = array('B')
+    self.lifes = array('B')
+    self.masses = array('B')
+    self.ages = array('d')
+    self.infos: List[Optional[List]] = []
+
+  @classmethod
+  def from_adjacency(
+    cls,
+    ids: Iterable[int],
+    types: Iterable[int],
+    adjacency: Dict[int, Dict[int, Edge]],
+  ) -> 'CsrGraph':
+    """
+    :param ids: System IDs in index order
+    :param types: `SpaceType` values in index order
+    :param adjacency: index -> {neighbor index -> Edge}, insertion ordered
+    """
+    graph = cls()
+    graph.ids.extend(ids)
+    graph.types.extend(types)
+    graph.index = {sid: idx for idx, sid in enumerate(graph.ids)}
+
+    targets: List[int] = []
+    columns: List[Edge] = []
+    offsets = graph.offsets
+    for idx in range(len(graph.ids)):
+      row = adjacency.get(idx)
+      if row:
+        targets.extend(row.keys())
+        columns.extend(row.values())
+      offsets.append(len(targets))
+
+    if columns:
+      kinds, sizes, lifes, masses, ages, infos = zip(*columns)
+      graph.targets.extend(targets)
+      graph.kinds.extend(kinds)
+      graph.sizes.extend(sizes)
+      graph.lifes.extend(lifes)
+      graph.masses.extend(masses)
+      graph.ages.extend(ages)
+      graph.infos.extend(infos)
+
+    return graph
+
+  def __len__(self) -> int:
+    return len(self.ids)
+
+  @property
+  def edge_count(self) -> int:
+    return len(self.targets)
+
+  def index_of(self, system_id: int) -> Optional[int]:
+    return self.index.get(system_id)
+
+  def neighbors(self, idx: int) -> List[int]:
+    return list(self.targets[self.offsets[idx]:self.offsets[idx + 1]])
+
+  def degree(self, idx: int) -> int:
+    return self.offsets[idx + 1] - self.offsets[idx]
+
+  def find_edge(self, u: int, v: int) -> Optional[int]:
+    for e in range(self.offsets[u], self.offsets[u + 1]):
+      if self.targets[e] == v:
+        return e
+    return None
+
+  def edge(self, e: int) -> Edge:
+    return (
+      self.kinds[e],
+      self.sizes[e],
+      self.lifes[e],
+      self.masses[e],
+      self.ages[e],
+      self.infos[e],
+    )
+
+  def nbytes(self) -> int:
+    """
+    Size of the array columns in bytes (excludes `index` and `infos`).
+    """
+    return sum(
+      col.itemsize * len(col) for col in (
+        self.ids,
+        self.types,
+        self.offsets,
+        self.targets,
+        self.kinds,
+        self.sizes,
+        self.lifes,
+        self.masses,
+        self.ages,
+      )
+    )
+
+
+class RoutingGraph:
+  """
+  Frozen base layer plus a mutable overlay of chain connections
+
+  `base` is shared by every `SolarMap` of the process and is never mutated.
+  `overlay` maps index -> {neighbor index -> Edge} for connections reported
+  by map sources. Systems unknown to `base` get indices past its end.
+  """
+
+  __slots__ = ('base', 'overlay', 'extra_ids', 'extra_types', 'extra_index')
+
+  def __init__(self, base: Optional[CsrGraph] = None):
+    self.base = base if base is not None else CsrGraph()
+    self.overlay: Dict[int, Dict[int, Edge]] = {}
+    self.extra_ids: List[int] = []
+    self.extra_types: List[int] = []
+    self.extra_index: Dict[int, int] = {}
+
+  def __len__(self) -> int:
+    return len(self.base) + len(self.extra_ids)
+
+  def index_of(self, system_id: int) -> Optional[int]:
+    idx = self.base.index.get(system_id)
+    if idx is None:
+      idx = self.extra_index.get(system_id)
+    return idx
+
+  def add_node(self, system_id: int, space_type: int) -> int:
+    idx = self.index_of(system_id)
+    if idx is None:
+      idx = len(self)
+      self.extra_ids.append(system_id)
+      self.extra_types.append(space_type)
+      self.extra_index[system_id] = idx
+    return idx
+
+  def system_id(self, idx: int) -> int:
+    size = len(self.base)
+    return self.base.ids[idx] if idx < size else self.extra_ids[idx - size]
+
+  def space_type(self, idx: int) -> int:
+    size = len(self.base)
+    return self.base.types[idx] if idx < size else self.extra_types[idx - size]
+
+  def neighbors(self, idx: int) -> List[int]:
+    ret = self.base.neighbors(idx) if idx < len(self.base) else []
+    ret.extend(self.overlay.get(idx, {}).keys())
+    return ret
+
+  def degree(self, idx: int) -> int:
+    ret = self.base.degree(idx) if idx < len(self.base) else 0
+    return ret + len(self.overlay.get(idx, {}))
+
+  def has_base_edge(self, u: int, v: int) -> bool:
+    if u >= len(self.base) or v >= len(self.base):
+      return False
+    return self.base.find_edge(u, v) is not None
+
+  def get_edge(self, u: int, v: int) -> Optional[Edge]:
+    if self.has_base_edge(u, v):
+      return self.base.edge(self.base.find_edge(u, v))
+    return self.overlay.get(u, {}).get(v)
+
+  def set_edge(self, u: int, v: int, edge: Edge):
+    if u not in self.overlay:
+      self.overlay[u] = {}
+    self.overlay[u][v] = edge
+
+  def remove_edge(self, u: int, v: int):
+    row = self.overlay.get(u)
+    if row and v in row:
+      del row[v]
+      if not row:
+        del self.overlay[u]
+
+  def clear_overlay(self):
+    self.overlay = {}
+    self.extra_ids = []
+    self.extra_types = []
+    self.extra_index = {}
+
+
+class SearchStats:
+  """
+  Counters filled in by a search, mostly for benchmarks and tests
+  """
+
+  __slots__ = ('settled',)
+
+  def __init__(self):
+    self.settled = 0
+
+
+class EdgeFilter:
+  """
+  Wormhole restriction values unpacked once per query
+  """
+
+  __slots__ = (
+    'blocked_sizes',
+    'ignore_eol',
+    'ignore_masscrit',
+    'age_threshold',
+    'critical_life',
+    'critical_mass',
+  )
+
+  def __init__(
+    self,
+    blocked_sizes: Set[int],
+    ignore_eol: bool,
+    ignore_masscrit: bool,
+    age_threshold: float,
+    critical_life: int,
+    critical_mass: int,
+  ):
+    self.blocked_sizes = blocked_sizes
+    self.ignore_eol = ignore_eol
+    self.ignore_masscrit = ignore_masscrit
+    self.age_threshold = age_threshold
+    self.critical_life = critical_life
+    self.critical_mass = critical_mass
+
+  def allows(self, size: int, life: int, mass: int, age: float) -> bool:
+    if size in self.blocked_sizes:
+      return False
+    if self.ignore_eol and life == self.critical_life:
+      return False
+    if self.ignore_masscrit and mass == self.critical_mass:
+      return False
+    if age > self.age_threshold:
+      return False
+    return True
+
+
+class CompiledRestrictions:
+  """
+  Restrictions of one query lowered to plain arrays over a routing graph
+
+  `edge_costs[e]` is the cost of base edge `e` and `reverse_costs[e]` the
+  cost of its reverse twin, paid by backward searches walking `e` against
+  its direction. `overlay[u]` lists the allowed chain edges leaving `u` as
+  `(v, cost)`, `overlay_reverse[u]` the allowed ones entering `u` as
+  `(v, cost of v -> u)`. Filtered out edges cost INFINITY or are left out,
+  so searches never look at restrictions. `avoid[i]` is 1 for systems that
+  may start or end a route but not be passed through.
+  """
+
+  __slots__ = (
+    'base',
+    'version',
+    'wormhole_cost',
+    'edge_costs',
+    'reverse_costs',
+    'overlay',
+    'overlay_reverse',
+    'avoid',
+  )
+
+  @classmethod
+  def compile(
+    cls,
+    graph: RoutingGraph,
+    type_costs: List[float],
+    wormhole_cost: float,
+    edge_filter: EdgeFilter,
+    avoid: Union[Iterable[int], bytearray],
+    version: int = 0,
+    reuse: Optional['CompiledRestrictions'] = None,
+  ) -> 'CompiledRestrictions':
+    """
+    :param type_costs: Cost of entering a system via a gate, by `SpaceType`
+    :param wormhole_cost: Cost of any wormhole jump
+    :param avoid: Avoided indices, or a ready-made mask over `graph`,
+      taken over as `avoid`
+    :param version: Graph version the overlay part was compiled for
+    :param reuse: Earlier compilation of the same restrictions; its base
+      layer arrays are shared if the base layer is the same
+    """
+    ret = cls()
+    base = graph.base
+    allows = edge_filter.allows
+    ret.base = base
+    ret.version = version
+    ret.wormhole_cost = wormhole_cost
+
+    def cost_of(edge: Edge, v: int) -> float:
+      if edge[0] == KIND_GATE:
+        return type_costs[graph.space_type(v)]
+      if allows(edge[1], edge[2], edge[3], edge[4]):
+        return wormhole_cost
+      return INFINITY
+
+    if reuse is not None and reuse.base is base:
+      ret.edge_costs = reuse.edge_costs
+      ret.reverse_costs = reuse.reverse_costs
+    else:
+      offsets = base.offsets
+      targets = base.targets
+      node_costs = [type_costs[t] for t in base.types]
+      sources = [
+        u for u in range(len(base)) for _ in range(offsets[u + 1] - offsets[u])
+      ]
+      # Gates come in pairs; the reverse of `u -> v` enters `u`
+      ret.edge_costs = array('d', [node_costs[v] for v in targets])
+      ret.reverse_costs = array('d', [node_costs[u] for u in sources])
+      for e, kind in enumerate(base.kinds):
+        if kind != KIND_GATE:
+          ret.edge_costs[e] = cost_of(base.edge(e), targets[e])
+      for e, kind in enumerate(base.kinds):
+        if kind != KIND_GATE:
+          twin = base.find_edge(targets[e], sources[e])
+          ret.reverse_costs[e] = INFINITY if twin is None else ret.edge_costs[twin]
+
+    ret.overlay = {}
+    ret.overlay_reverse = {}
+    for u, row in graph.overlay.items():
+      for v, edge in row.items():
+        cost = cost_of(edge, v)
+        if cost < INFINITY:
+          ret.overlay.setdefault(u, []).append((v, cost))
+          ret.overlay_reverse.setdefault(v, []).append((u, cost))
+
+    if isinstance(avoid, bytearray):
+      ret.avoid = avoid
+    else:
+      ret.avoid = bytearray(len(graph))
+      for x in avoid:
+        ret.avoid[x] = 1
+    return ret
+
+  def blocked_mask(self, graph: RoutingGraph, *allowed: int) -> bytearray:
+    """
+    Fresh copy of `avoid` sized for `graph`, with `allowed` cleared.
+    """
+    mask = bytearray(self.avoid)
+    if len(mask) < len(graph):
+      mask.extend(bytes(len(graph) - len(mask)))
+    for x in allowed:
+      mask[x] = 0
+    return mask
+
+
+def dijkstra(
+  graph: RoutingGraph,
+  source: int,
+  destination: int,
+  weights: CompiledRestrictions,
+  blocked: Iterable[int] = (),
+  stats: Optional[SearchStats] = None,
+) -> List[int]:
+  """
+  Point-to-point Dijkstra over the CSR base layer and the overlay.
+
+  Avoided systems other than `source` and `destination` are never entered.
+
+  :param blocked: Further indices that may not be entered
+  :return: Path as a list of indices, empty if unreachable
+  """
+  offsets = graph.base.offsets
+  targets = graph.base.targets
+  edge_costs = weights.edge_costs
+  overlay = weights.overlay
+  base_size = len(graph.base)
+  push = heapq.heappush
+  pop = heapq.heappop
+
+  distance = [INFINITY] * len(graph)
+  distance[source] = 0
+  parent = array('l', [-1]) * len(graph)
+  settled = weights.blocked_mask(graph, source, destination)
+  for x in blocked:
+    settled[x] = 1
+  queue: List[Tuple[float, int]] = [(0, source)]
+  count = 0
+
+  while queue:
+    base_u, u = pop(queue)
+    if settled[u]:
+      continue
+    count += 1
+    if u == destination:
+      break
+    settled[u] = 1
+
+    if u < base_size:
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if settled[v]:
+          continue
+        candidate = base_u + edge_costs[e]
+        if candidate < distance[v]:
+          distance[v] = candidate
+          parent[v] = u
+          push(queue, (candidate, v))
+    for v, cost in overlay.get(u, ()):
+      if settled[v]:
+        continue
+      candidate = base_u + cost
+      if candidate < distance[v]:
+        distance[v] = candidate
+        parent[v] = u
+        push(queue, (candidate, v))
+
+  if stats is not None:
+    stats.settled = count
+  return _unwind(parent, source, destination, distance)
+
+
+def _unwind(parent: array, source: int, destination: int, distance: List[float]) -> List[int]:
+  if distance[destination] == INFINITY:
+    return []
+  path = [destination]
+  u = destination
+  while u != source:
+    u = parent[u]
+    path.append(u)
+  path.reverse()
+  return path
+
+
+def astar(
+  graph: RoutingGraph,
+  source: int,
+  destination: int,
+  weights: CompiledRestrictions,
+  blocked: Iterable[int],
+  heuristic: Callable[[int], float],
+  stats: Optional[SearchStats] = None,
+  excluded_first: Optional[Set[int]] = None,
+) -> List[int]:
+  """
+  A* over the CSR base layer and the overlay, same costs as `dijkstra`.
+  The heuristic must be consistent, settled nodes are final.
+
+  :param excluded_first: Neighbors of `source` that may not be the first hop
+  """
+  offsets = graph.base.offsets
+  targets = graph.base.targets
+  edge_costs = weights.edge_costs
+  overlay = weights.overlay
+  base_size = len(graph.base)
+  push = heapq.heappush
+  pop = heapq.heappop
+
+  distance = [INFINITY] * len(graph)
+  distance[source] = 0
+  parent = array('l', [-1]) * len(graph)
+  settled = weights.blocked_mask(graph, source, destination)
+  for x in blocked:
+    settled[x] = 1
+  estimate = [-1.0] * len(graph)
+  queue: List[Tuple[float, float, int]] = [(heuristic(source), 0, source)]
+  count = 0
+  skip_first = excluded_first or ()
+
+  while queue:
+    u = pop(queue)[2]
+    if settled[u]:
+      continue
+    count += 1
+    if u == destination:
+      break
+    settled[u] = 1
+    banned = skip_first if u == source else ()
+    base_u = distance[u]
+
+    edges = overlay.get(u, [])
+    if u < base_size:
+      edges = [
+        (targets[e], edge_costs[e]) for e in range(offsets[u], offsets[u + 1])
+      ] + edges
+    for v, cost in edges:
+      if settled[v] or v in banned:
+        continue
+      candidate = base_u + cost
+      if candidate < distance[v]:
+        distance[v] = candidate
+        parent[v] = u
+        h = estimate[v]
+        if h < 0:
+          h = estimate[v] = heuristic(v)
+        # Ties go to the node closer to the destination
+        push(queue, (candidate + h, h, v))
+
+  if stats is not None:
+    stats.settled = count
+  return _unwind(parent, source, destination, distance)
+
+
+def _edges(
+  graph: RoutingGraph,
+  weights: CompiledRestrictions,
+  u: int,
+  forward: bool,
+) -> List[Tuple[int, float]]:
+  """
+  (v, cost) for every allowed edge `u -> v` (forward) or `v -> u`
+  (backward). Every edge has a reverse twin, so the incoming neighbors of
+  `u` are its outgoing ones.
+  """
+  if forward:
+    costs, extra = weights.edge_costs, weights.overlay
+  else:
+    costs, extra = weights.reverse_costs, weights.overlay_reverse
+  ret = extra.get(u, [])
+  if u < len(graph.base):
+    offsets = graph.base.offsets
+    targets = graph.base.targets
+    ret = [(targets[e], costs[e]) for e in range(offsets[u], offsets[u + 1])] + ret
+  return ret
+
+
+def bidirectional_dijkstra(
+  graph: RoutingGraph,
+  source: int,
+  destination: int,
+  weights: CompiledRestrictions,
+  blocked: Iterable[int] = (),
+  stats: Optional[SearchStats] = None,
+) -> List[int]:
+  """
+  Dijkstra from both ends, same parameters and costs as `dijkstra`.
+
+  Costs are asymmetric: a gate jump costs the weight of the system entered,
+  so the backward side walks `reverse_costs`. Stops once the two queue tops
+  add up to at least the best meeting cost found so far.
+  """
+  size = len(graph)
+  distance = ([INFINITY] * size, [INFINITY] * size)
+  parent = (array('l', [-1]) * size, array('l', [-1]) * size)
+  mask = weights.blocked_mask(graph, source, destination)
+  for x in blocked:
+    mask[x] = 1
+  settled = (mask, bytearray(mask))
+  distance[0][source] = 0
+  distance[1][destination] = 0
+  queues: Tuple[List[Tuple[float, int]], List[Tuple[float, int]]] = (
+    [(0, source)],
+    [(0, destination)],
+  )
+  best = INFINITY
+  meeting = -1
+  count = 0
+
+  if source == destination:
+    meeting = source
+    queues = ([], [])
+
+  while queues[0] and queues[1]:
+    if queues[0][0][0] + queues[1][0][0] >= best:
+      break
+    # Advance the side with the smaller frontier
+    side = 0 if len(queues[0]) <= len(queues[1]) else 1
+    _, u = heapq.heappop(queues[side])
+    if settled[side][u]:
+      continue
+    settled[side][u] = 1
+    count += 1
+
+    dist = distance[side]
+    other = distance[1 - side]
+    for v, cost in _edges(graph, weights, u, side == 0):
+      if settled[side][v]:
+        continue
+      candidate = dist[u] + cost
+      if candidate < dist[v]:
+        dist[v] = candidate
+        parent[side][v] = u
+        heapq.heappush(queues[side], (candidate, v))
+      if other[v] < INFINITY and dist[v] + other[v] < best:
+        best = dist[v] + other[v]
+        meeting = v
+
+  if stats is not None:
+    stats.settled = count
+  if meeting < 0:
+    return []
+
+  path = [meeting]
+  u = meeting
+  while u != source:
+    u = parent[0][u]
+    path.append(u)
+  path.reverse()
+  u = meeting
+  while u != destination:
+    u = parent[1][u]
+    path.append(u)
+  return path
+
+
+def shortest_path_tree(
+  graph: RoutingGraph,
+  root: int,
+  weights: CompiledRestrictions,
+  reverse: bool = False,
+  stats: Optional[SearchStats] = None,
+) -> Tuple[List[float], array]:
+  """
+  One-to-all Dijkstra from `root`, same costs as `dijkstra`. Avoided
+  systems are reached but never passed through.
+
+  :param reverse: Search towards `root` instead: `distance[v]` is then the
+    cost from `v` to `root` and `parent[v]` the next hop on that path
+  :return: (distance, parent), INFINITY and -1 where unreachable
+  """
+  size = len(graph)
+  distance = [INFINITY] * size
+  distance[root] = 0
+  parent = array('l', [-1]) * size
+  settled = bytearray(size)
+  terminal = weights.blocked_mask(graph, root)
+  queue: List[Tuple[float, int]] = [(0, root)]
+  count = 0
+
+  while queue:
+    _, u = heapq.heappop(queue)
+    if settled[u]:
+      continue
+    settled[u] = 1
+    count += 1
+    if terminal[u]:
+      continue
+    base_u = distance[u]
+    for v, cost in _edges(graph, weights, u, not reverse):
+      if settled[v]:
+        continue
+      candidate = base_u + cost
+      if candidate < distance[v]:
+        distance[v] = candidate
+        parent[v] = u
+        heapq.heappush(queue, (candidate, v))
+
+  if stats is not None:
+    stats.settled = count
+  return distance, parent
+
+
+def path_cost(
+  graph: RoutingGraph,
+  path: List[int],
+  weights: CompiledRestrictions,
+) -> float:
+  total = 0.0
+  for u, v in zip(path, path[1:]):
+    cost = INFINITY
+    e = graph.base.find_edge(u, v) if u < len(graph.base) and v < len(graph.base) else None
+    if e is not None:
+      cost = weights.edge_costs[e]
+    else:
+      for w, overlay_cost in weights.overlay.get(u, ()):
+        if w == v:
+          cost = overlay_cost
+          break
+    total += cost
+  return total
+
+
+def k_shortest_paths(
+  graph: RoutingGraph,
+  source: int,
+  destination: int,
+  k: int,
+  weights: CompiledRestrictions,
+  stats: Optional[SearchStats] = None,
+) -> List[List[int]]:
+  """
+  Up to `k` loopless paths in order of cost (Yen's algorithm).
+
+  One reverse shortest-path tree towards `destination` is built up front.
+  It yields the first path directly, and its distances are an exact lower
+  bound for every spur search (spurs only remove nodes and edges), so
+  each spur runs as an A* that barely leaves its own shortest path.
+  """
+  tree_stats = SearchStats()
+  remaining, next_hop = shortest_path_tree(
+    graph,
+    destination,
+    weights,
+    reverse=True,
+    stats=tree_stats,
+  )
+  count = tree_stats.settled
+  # An avoided source is fine: the tree ends at, never passes through it
+  if remaining[source] == INFINITY:
+    if stats is not None:
+      stats.settled = count
+    return []
+
+  first = [source]
+  while first[-1] != destination:
+    first.append(next_hop[first[-1]])
+
+  accepted: List[List[int]] = [first]
+  candidates: List[Tuple[float, List[int]]] = []
+  seen = {tuple(first)}
+  heuristic = remaining.__getitem__
+  spur_stats = SearchStats()
+
+  while len(accepted) < k:
+    previous = accepted[-1]
+    for i in range(len(previous) - 1):
+      spur = previous[i]
+      root = previous[:i + 1]
+      excluded = {
+        path[i + 1] for path in accepted
+        if len(path) > i + 1 and path[:i + 1] == root
+      }
+      spur_path = astar(
+        graph,
+        spur,
+        destination,
+        weights,
+        root[:-1],
+        heuristic,
+        spur_stats,
+        excluded,
+      )
+      count += spur_stats.settled
+      if not spur_path:
+        continue
+      path = root[:-1] + spur_path
+      if tuple(path) in seen:
+        continue
+      seen.add(tuple(path))
+      heapq.heappush(candidates, (path_cost(graph, path, weights), path))
+
+    if not candidates:
+      break
+    accepted.append(heapq.heappop(candidates)[1])
+
+  if stats is not None:
+    stats.settled = count
+  return accepted
@@ -2,16 +2,19 @@
 
 import csv
 from enum import Enum
+import math
 import sys
 import os
 from os import path
-from typing import Dict, List, Optional, TypedDict, Union
+from typing import Collection, Dict, List, Optional, Tuple, TypedDict, Union
 
 from .logger import Logger
+from .name_index import NameIndex
+from .sde_image import SdeImage, SystemTable, pack_strings, unpack_strings
 from .utility.singleton import Singleton
 
 
-def get_csv_data(filename: str):
+def get_database_path(filename: str) -> str:
   if getattr(sys, 'frozen', False):
     # If the application is run as a bundle, the PyInstaller bootloader
     # extends the sys module by a flag frozen=True and sets the app
@@ -76,7 +79,11 @@ def get_csv_data(filename: str):
           Logger.info(f"Resolved case-insensitive path: {normpath}")
           break
 
-  with open(normpath, 'r', encoding='utf-8') as f:
+  return normpath
+
+
+def get_csv_data(filename: str):
+  with open(get_database_path(filename), 'r', encoding='utf-8') as f:
     reader = csv.reader(f, delimiter=',')
     # NOTE(secondfry): skip headings.
     next(reader)
@@ -125,7 +132,8 @@ class Restrictions(TypedDict):
   ignore_masscrit: bool
   age_threshold: float
   security_prio: Dict[SpaceType, float]
-  avoidance_list: List[int]
+  # System IDs, a list or an `AvoidanceSet`
+  avoidance_list: Collection[int]
 
 
 SystemDescription = TypedDict(
@@ -143,10 +151,17 @@ SystemDescription = TypedDict(
 
 class SolarSystem:
 
-  MAP_LOCATION_WORMHOLE_CLASSES = {
-    int(row[0]): int(row[1])
-    for row in get_csv_data('mapLocationWormholeClasses.csv')
-  }
+  # Wormhole class by system or region ID, see `wormhole_classes`
+  _wormhole_classes: Optional[Dict[int, int]] = None
+
+  @classmethod
+  def wormhole_classes(cls) -> Dict[int, int]:
+    if cls._wormhole_classes is None:
+      cls._wormhole_classes = {
+        int(row[0]): int(row[1])
+        for row in get_csv_data('mapLocationWormholeClasses.csv')
+      }
+    return cls._wormhole_classes
 
   def __init__(
     self,
@@ -270,9 +285,9 @@ class SolarSystem:
     if self.is_zarzakh(): return 'Z'
 
     if self.is_anoikis():
-      system_class = self.MAP_LOCATION_WORMHOLE_CLASSES.get(self.solarSystemID)
+      system_class = self.wormhole_classes().get(self.solarSystemID)
       if system_class: return 'C{}'.format(system_class)
-      region_class = self.MAP_LOCATION_WORMHOLE_CLASSES.get(self.regionID)
+      region_class = self.wormhole_classes().get(self.regionID)
       if region_class: return 'C{}'.format(region_class)
       return 'C??'
 
@@ -468,6 +483,22 @@ class EveDb(metaclass=Singleton):
 
   ZARZAKH_SYSTEM_ID = 30100000
 
+  # System class name -> space type, anything else routes as null sec
+  CLASS_SPACE_TYPES = {
+    'HS': SpaceType.HS,
+    'LS': SpaceType.LS,
+    'NS': SpaceType.NS,
+    'WH': SpaceType.WH,
+  }
+
+  # Name lookups, built on first use
+  _system_index: Optional[NameIndex] = None
+  _region_index: Optional[NameIndex] = None
+  # Region IDs in the order of `_region_index`
+  _region_ids: Tuple[int, ...] = ()
+  # Region ID -> system IDs, built on first use
+  _region_system_ids: Optional[Dict[int, List[int]]] = None
+
   def __init__(self):
     filename_statics = 'statics.csv'
     filename_renames = 'renames.csv'
@@ -478,6 +509,14 @@ class EveDb(metaclass=Singleton):
     filename_descriptions = 'mapSolarSystems.csv'
     filename_regions = 'mapRegions.csv'
 
+    # Compiled by `compile_image`, parsing the CSVs takes a few hundred ms
+    directory = path.dirname(get_database_path(filename_descriptions))
+    image = SdeImage.load(path.join(directory, SdeImage.FILENAME), directory)
+    if image is not None:
+      self._init_image(image)
+      return
+    Logger.info("SDE image missing or stale, parsing CSV files")
+
     self._init_gates(get_csv_data(filename_gates))
     self._init_system_descriptions(get_csv_data(filename_descriptions))
     self._init_renames(get_csv_data(filename_renames))
@@ -487,6 +526,14 @@ class EveDb(metaclass=Singleton):
       rows[0]: WormholeSize(int(rows[1]))
       for rows in get_csv_data(filename_statics)
     }
+    self._init_systems(SystemTable(self.to_image()))
+
+  def _init_systems(self, systems: SystemTable):
+    self.systems = systems
+    # Space type by class code of `systems`
+    self._class_space_types = tuple(
+      self.CLASS_SPACE_TYPES.get(x, SpaceType.NS) for x in systems.class_names
+    )
 
   def _init_gates(self, data):
     """
@@ -501,8 +548,8 @@ class EveDb(metaclass=Singleton):
     self.gates = [[int(row[2]), int(row[3])] for row in data]
 
   def _init_system_descriptions(self, data):
-    self.system_desc: Dict[int, SystemDescription] = {}
-    self.region_systems: Dict[int, List[SystemDescription]] = {}
+    self._system_desc: Optional[Dict[int, SystemDescription]] = {}
+    self._region_systems: Optional[Dict[int, List[SystemDescription]]] = {}
     for row in data:
       system = SolarSystem.from_row(row)
       description = SystemDescription({
@@ -515,10 +562,10 @@ class EveDb(metaclass=Singleton):
         'region_id': system.regionID,
         'security': system.security
       })
-      self.system_desc[system.solarSystemID] = description
-      if description['region_id'] not in self.region_systems:
-        self.region_systems[description['region_id']] = []
-      self.region_systems[description['region_id']].append(description)
+      self._system_desc[system.solarSystemID] = description
+      if description['region_id'] not in self._region_systems:
+        self._region_systems[description['region_id']] = []
+      self._region_systems[description['region_id']].append(description)
 
   def _init_renames(self, data):
     for row in data:
@@ -532,16 +579,157 @@ class EveDb(metaclass=Singleton):
       region = Region.from_row(row)
       self.regions[region.regionID] = region
 
+  def _init_image(self, image: SdeImage):
+    gates = iter(image.gates)
+    self.gates = list(map(list, zip(gates, gates)))
+
+    # Descriptions are built from `systems` on first use
+    self._init_systems(SystemTable(image))
+    self._system_desc = None
+    self._region_systems = None
+
+    self.regions = {}
+    geometry = image.region_geometry
+    for i, (region_id, name, faction_id, nebula) in enumerate(zip(
+      image.region_ids,
+      unpack_strings(image.region_names),
+      image.region_factions,
+      unpack_strings(image.region_nebulae),
+    )):
+      x, y, z, x_min, x_max, y_min, y_max, z_min, z_max, radius = geometry[10 * i:10 * i + 10]
+      self.regions[region_id] = Region(
+        regionID=region_id,
+        regionName=name,
+        x=x,
+        y=y,
+        z=z,
+        xMin=x_min,
+        xMax=x_max,
+        yMin=y_min,
+        yMax=y_max,
+        zMin=z_min,
+        zMax=z_max,
+        factionID=faction_id or None,
+        nebula=nebula,
+        radius=None if math.isnan(radius) else radius
+      )
+
+    self.wh_codes = {
+      code: WormholeSize(size)
+      for code, size in zip(unpack_strings(image.static_codes), image.static_sizes)
+    }
+
+  @property
+  def system_desc(self) -> Dict[int, SystemDescription]:
+    """
+    Descriptions by system ID. Built on first use from `systems`, which
+    the lookups below read directly.
+    """
+    if self._system_desc is None:
+      self._system_desc = {
+        system_id: self._describe(row)
+        for row, system_id in enumerate(self.systems.ids)
+      }
+    return self._system_desc
+
+  @property
+  def region_systems(self) -> Dict[int, List[SystemDescription]]:
+    if self._region_systems is None:
+      self._region_systems = {}
+      for description in self.system_desc.values():
+        self._region_systems.setdefault(description['region_id'], []).append(description)
+    return self._region_systems
+
+  def _describe(self, row: int) -> SystemDescription:
+    systems = self.systems
+    return {
+      'class': systems.class_name(row),
+      'flags': {
+        'triglavian': systems.is_triglavian(row)
+      },
+      'id': systems.ids[row],
+      'name': systems.name(row),
+      'region_id': systems.regions[row],
+      'security': systems.security[row]
+    }
+
+  def to_image(self) -> SdeImage:
+    image = SdeImage()
+    class_names: List[str] = []
+    for system in self.system_desc.values():
+      if system['class'] not in class_names:
+        class_names.append(system['class'])
+      image.system_ids.append(system['id'])
+      image.system_regions.append(system['region_id'])
+      image.system_security.append(system['security'])
+      image.system_classes.append(class_names.index(system['class']))
+      image.system_flags.append(SdeImage.FLAG_TRIGLAVIAN if system['flags']['triglavian'] else 0)
+    image.system_names = pack_strings([x['name'] for x in self.system_desc.values()])
+    image.class_names = pack_strings(class_names)
+    image.index_systems()
+    for source, dest in self.gates:
+      image.gates.extend((source, dest))
+
+    for region in self.regions.values():
+      image.region_ids.append(region.regionID)
+      image.region_geometry.extend((
+        region.x,
+        region.y,
+        region.z,
+        region.xMin,
+        region.xMax,
+        region.yMin,
+        region.yMax,
+        region.zMin,
+        region.zMax,
+        math.nan if region.radius is None else region.radius,
+      ))
+      image.region_factions.append(region.factionID or 0)
+    image.region_names = pack_strings([x.regionName for x in self.regions.values()])
+    image.region_nebulae = pack_strings([x.nebula for x in self.regions.values()])
+
+    image.static_codes = pack_strings(list(self.wh_codes))
+    image.static_sizes.extend(self.wh_codes.values())
+    return image
+
+  def compile_image(self, filename: Optional[str] = None) -> str:
+    """
+    Writes the loaded tables as an `SdeImage` for the next start.
+
+    :param filename: Defaults to `SdeImage.FILENAME` next to the CSV files
+    :return: Path of the image
+    """
+    directory = path.dirname(get_database_path('mapSolarSystems.csv'))
+    filename = filename or path.join(directory, SdeImage.FILENAME)
+    self.to_image().save(filename, directory)
+    return filename
+
   def get_whsize_by_code(self, code: Optional[str]) -> WormholeSize:
     if not code:
       return WormholeSize.UNKNOWN
     return self.wh_codes.get(code.upper(), WormholeSize.UNKNOWN)
 
+  def system_description(self, system_id: int) -> Optional[SystemDescription]:
+    """
+    :return: A fresh description of `system_id`, None if unknown
+    """
+    row = self.systems.row(system_id)
+    if row < 0:
+      return None
+    return self._describe(row)
+
+  def system_region(self, system_id: int) -> Optional[int]:
+    row = self.systems.row(system_id)
+    if row < 0:
+      return None
+    return self.systems.regions[row]
+
   def get_class(self, system_id: int):
-    if system_id not in self.system_desc:
+    row = self.systems.row(system_id)
+    if row < 0:
       return "Unknown"
 
-    db_class = self.system_desc[system_id]['class']
+    db_class = self.systems.class_name(row)
     # FIXME learn about triglavian wormhole sizes
     if db_class in ["HS", "LS", "NS", "▲", "Unknown"]:
       sys_class = "kspace"
@@ -552,14 +740,10 @@ class EveDb(metaclass=Singleton):
     return sys_class
 
   def system_type(self, system_id: int) -> SpaceType:
-    db_class = self.system_desc[system_id]['class']
-
-    return {
-      'HS': SpaceType.HS,
-      'LS': SpaceType.LS,
-      'NS': SpaceType.NS,
-      'WH': SpaceType.WH,
-    }.get(db_class, SpaceType.NS)
+    row = self.systems.row(system_id)
+    if row < 0:
+      raise KeyError(system_id)
+    return self._class_space_types[self.systems.classes[row]]
 
   def get_whsize_by_system(self, source_id: int, dest_id: int) -> WormholeSize:
     source_class = self.get_class(source_id)
@@ -567,65 +751,89 @@ class EveDb(metaclass=Singleton):
     return EveDb.SIZE_MATRIX[source_class][dest_class]
 
   def system_name_list(self):
-    return [x['name'] for x in self.system_desc.values()]
+    return list(self.systems.names())
 
   def region_name_list(self):
     return [x.regionName for x in self.regions.values()]
 
-  def get_system_dict_pair_by_partial_name(self, part: str):
-    if not part:
-      return (None, None)
+  def _system_names(self) -> NameIndex:
+    if self._system_index is None:
+      self._system_index = NameIndex(self.systems.names())
+    return self._system_index
 
-    ret = (None, None)
-    matches = 0
-    part_upper = part.upper()
+  def _region_names(self) -> NameIndex:
+    if self._region_index is None:
+      self._region_ids = tuple(self.regions)
+      self._region_index = NameIndex([x.regionName for x in self.regions.values()])
+    return self._region_index
 
-    for sid, system in self.system_desc.items():
-      name_upper = system['name'].upper()
-      if name_upper == part_upper:
-        return (sid, system)
-      if name_upper.startswith(part_upper):
-        ret = (sid, system)
-        matches = matches + 1
+  def _resolve_system(self, part: Optional[str]) -> int:
+    """
+    :return: Row of the system named `part` or, failing that, of the only
+      system whose name starts with it; -1 if none
+    """
+    if not part:
+      return -1
+    return self._system_names().resolve(part)
 
-    if matches > 1:
+  def get_system_dict_pair_by_partial_name(self, part: str):
+    row = self._resolve_system(part)
+    if row < 0:
       return (None, None)
 
-    return ret
+    return (self.systems.ids[row], self._describe(row))
 
   # TODO properly type this
   def normalize_name(self, name) -> Union[None, str]:
-    _, system = self.get_system_dict_pair_by_partial_name(name)
+    row = self._resolve_system(name)
 
-    if system is None:
+    if row < 0:
       return None
 
-    return system['name']
+    return self.systems.name(row)
 
   def normalize_region_name(self, partial: str):
-    for region in self.regions.values():
-      if partial.lower() in region.regionName.lower():
-        return region.regionName
-    return None
+    index = self._region_names()
+    matches = index.containing(partial)
+    if not matches:
+      return None
+    return index.names[matches[0]]
 
   # TODO properly type this
   def name2id(self, name):
-    [sid, _] = self.get_system_dict_pair_by_partial_name(name)
-    return sid
+    row = self._resolve_system(name)
+    if row < 0:
+      return None
+    return self.systems.ids[row]
 
   # TODO properly type this
   def id2name(self, sid):
-    try:
-      sys_name = self.system_desc[sid]['name']
-    except KeyError:
-      sys_name = None
-    return sys_name
+    row = self.systems.row(sid)
+    if row < 0:
+      return None
+    return self.systems.name(row)
 
   def region_name_to_id(self, name: str):
-    for region in self.regions.values():
-      if name == region.regionName:
-        return region.regionID
-    return None
+    index = self._region_names()
+    position = index.exact(name)
+    if position < 0 or index.names[position] != name:
+      return None
+    return self._region_ids[position]
+
+  def suggest_system_names(self, text: str, limit: int = 10) -> List[str]:
+    """
+    System names ranked by similarity to `text`, typos included.
+    """
+    index = self._system_names()
+    return [index.names[x] for x in index.suggest(text, limit)]
+
+  def suggest_region_names(self, text: str, limit: int = 10) -> List[str]:
+    index = self._region_names()
+    return [index.names[x] for x in index.suggest(text, limit)]
 
   def get_region_system_ids(self, idx: int):
-    return [x["id"] for x in self.region_systems[idx]]
+    if self._region_system_ids is None:
+      self._region_system_ids = {}
+      for system_id, region_id in zip(self.systems.ids, self.systems.regions):
+        self._region_system_ids.setdefault(region_id, []).append(system_id)
+    return list(self._region_system_ids.get(idx, ()))
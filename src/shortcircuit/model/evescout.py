@@ -2,11 +2,14 @@
 
 import asyncio
 from datetime import datetime, timezone
+from typing import Optional
 
 import httpx
 from shortcircuit import USER_AGENT
 
 from .evedb import EveDb, WormholeSize, WormholeMassspan, WormholeTimespan
+from .http_cache import ParsedBody, RecordingMap, cached_get
+from .http_pool import ClientPool, pooled_client
 from .logger import Logger
 from .solarmap import ConnectionType, SolarMap
 
@@ -26,16 +29,21 @@ class EveScout:
     self.evescout_url = url
     self.name = name
     self.source_id = name
+    self._parsed = ParsedBody()
 
   def get_name(self) -> str:
     return self.name
 
-  async def _augment_map_async(self, solar_map: SolarMap) -> int:
+  async def augment_map_async(
+    self, solar_map: SolarMap, clients: Optional[ClientPool] = None
+  ) -> int:
     headers = {'User-Agent': USER_AGENT}
-    async with httpx.AsyncClient(verify=True) as client:
+    async with pooled_client(clients, self.evescout_url) as client:
       try:
-        result = await client.get(
-          url=self.evescout_url,
+        result, digest = await cached_get(
+          client,
+          clients.responses if clients else None,
+          self.evescout_url,
           headers=headers,
           timeout=EveScout.TIMEOUT,
           follow_redirects=True,
@@ -50,7 +58,13 @@ class EveScout:
         Logger.error(result)
         return -1
 
+      # Unchanged since the last parse
+      replayed = self._parsed.replay(digest, solar_map)
+      if replayed is not None:
+        return replayed
+
       # we get some sort of response so at least something is working
+      recording = RecordingMap(solar_map)
       connections = 0
       json_response = result.json()
       for connection in json_response:
@@ -95,7 +109,7 @@ class EveScout:
             wh_size = self.eve_db.get_whsize_by_system(source, dest)
 
           from shortcircuit.model.connection_db import ConnectionData
-          solar_map.add_connection(
+          recording.add_connection(
             ConnectionData(
               source_id=self.source_id,
               source_system=source,
@@ -113,6 +127,7 @@ class EveScout:
             )
           )
 
+      self._parsed.store(digest, connections, recording.added)
       return connections
 
   def augment_map(self, solar_map: SolarMap):
@@ -120,4 +135,4 @@ class EveScout:
     :param solar_map: SolarMap
     :return: Number of connections in case of success, -1 in case of failure
     """
-    return asyncio.run(self._augment_map_async(solar_map))
+    return asyncio.run(self.augment_map_async(solar_map))
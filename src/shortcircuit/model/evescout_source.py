@@ -1,4 +1,5 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+from shortcircuit.model.http_pool import ClientPool
 from shortcircuit.model.mapsource import MapSource, SourceType
 from shortcircuit.model.evescout import EveScout
 from shortcircuit.model.solarmap import SolarMap
@@ -33,6 +34,13 @@ class EveScoutSource(MapSource):
             
         return self._evescout.augment_map(solar_map)
 
+    async def fetch(self, solar_map: SolarMap, clients: Optional[ClientPool] = None) -> int:
+        """Fetch data and augment the provided solar map on the running event loop."""
+        if not self.enabled:
+            return 0
+
+        return await self._evescout.augment_map_async(solar_map, clients)
+
     def connect(self) -> Tuple[bool, str]:
         """EveScout doesn't require authentication, just return True if URL is set."""
         if self.url:
@@ -0,0 +1,201 @@
+# http_cache.py
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import httpx
+from appdirs import AppDirs
+
+from shortcircuit import __appslug__, __version__
+from .logger import Logger
+
+if TYPE_CHECKING:
+  from .connection_db import ConnectionData
+  from .solarmap import SolarMap
+
+
+class CacheEntry:
+  __slots__ = ('etag', 'last_modified', 'digest', 'body')
+
+  def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: str, body: bytes):
+    self.etag = etag
+    self.last_modified = last_modified
+    self.digest = digest
+    self.body = body
+
+
+class ResponseCache:
+  """
+  Last good GET response per URL and credentials, kept on disk
+
+  Requests carry the ETag and Last-Modified validators of the cached
+  response. A 304 is answered from the cached body, so callers always get
+  a complete response, together with the digest of its body. Callers that
+  remember the digest they last parsed can skip parsing when it repeats,
+  whether the server answered 304 or sent the same body again. Entries
+  survive restarts, one file each in `directory`.
+  """
+
+  # Default for `directory`, under the user cache directory if None
+  cache_dir: Optional[str] = None
+
+  def __init__(self, directory: Optional[str] = None):
+    self.directory = directory or self.cache_dir or os.path.join(
+      AppDirs(__appslug__, "mogglemoss", version=__version__).user_cache_dir,
+      'http',
+    )
+    self._entries: Dict[str, Optional[CacheEntry]] = {}
+
+  @staticmethod
+  def key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+    # Bodies differ per credentials, keep them apart without storing them
+    authorization = (headers or {}).get('Authorization', '')
+    return hashlib.sha1('{}\n{}'.format(url, authorization).encode()).hexdigest()
+
+  def _path(self, key: str) -> str:
+    return os.path.join(self.directory, key + '.http')
+
+  def entry(self, key: str) -> Optional[CacheEntry]:
+    """
+    Cached response for `key`, read from disk the first time.
+    """
+    if key not in self._entries:
+      self._entries[key] = self._load(key)
+    return self._entries[key]
+
+  def _load(self, key: str) -> Optional[CacheEntry]:
+    try:
+      with open(self._path(key), 'rb') as f:
+        meta, body = f.read().split(b'\n', 1)
+      meta = json.loads(meta)
+    except (OSError, ValueError):
+      return None
+    if hashlib.sha1(body).hexdigest() != meta.get('digest'):
+      return None
+    return CacheEntry(meta.get('etag'), meta.get('last_modified'), meta['digest'], body)
+
+  def _store(self, key: str, entry: CacheEntry):
+    self._entries[key] = entry
+    meta = {'etag': entry.etag, 'last_modified': entry.last_modified, 'digest': entry.digest}
+    path = self._path(key)
+    temporary = path + '.tmp'
+    try:
+      os.makedirs(self.directory, exist_ok=True)
+      with open(temporary, 'wb') as f:
+        f.write(json.dumps(meta).encode())
+        f.write(b'\n')
+        f.write(entry.body)
+      os.replace(temporary, path)
+    except OSError as e:
+      Logger.error('Could not save HTTP cache entry: {}'.format(e))
+
+  async def get(
+    self, client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None, **kwargs
+  ) -> Tuple[httpx.Response, Optional[str]]:
+    """
+    Conditional GET through the cache.
+
+    :return: Response, with status 200 and the cached body after a 304,
+      and the digest of its body, None unless the status is 200
+    """
+    key = self.key(url, headers)
+    entry = self.entry(key)
+    request_headers = dict(headers or {})
+    if entry is not None:
+      if entry.etag:
+        request_headers['If-None-Match'] = entry.etag
+      if entry.last_modified:
+        request_headers['If-Modified-Since'] = entry.last_modified
+
+    response = await client.get(url, headers=request_headers, **kwargs)
+    if response.status_code == 304 and entry is not None:
+      return httpx.Response(200, content=entry.body, request=response.request), entry.digest
+    if response.status_code != 200:
+      return response, None
+
+    body = response.content
+    digest = hashlib.sha1(body).hexdigest()
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    validators = (digest, etag, last_modified)
+    if entry is None or (entry.digest, entry.etag, entry.last_modified) != validators:
+      self._store(key, CacheEntry(etag, last_modified, digest, body))
+    return response, digest
+
+
+async def cached_get(
+  client: httpx.AsyncClient,
+  cache: Optional[ResponseCache],
+  url: str,
+  **kwargs,
+) -> Tuple[httpx.Response, Optional[str]]:
+  """
+  `ResponseCache.get` if there is a cache, else a plain GET with no digest.
+  """
+  if cache is None:
+    return await client.get(url, **kwargs), None
+  return await cache.get(client, url, **kwargs)
+
+
+class RecordingMap:
+  """
+  Stands in for a SolarMap while a response is parsed, remembering what
+  was added for `ParsedBody.store`.
+  """
+
+  __slots__ = ('solar_map', 'added')
+
+  def __init__(self, solar_map: 'SolarMap'):
+    self.solar_map = solar_map
+    self.added: List['ConnectionData'] = []
+
+  def add_connection(self, conn: 'ConnectionData'):
+    self.added.append(conn)
+    self.solar_map.add_connection(conn)
+
+
+class ParsedBody:
+  """
+  Connections a source parsed from its last response body
+
+  `replay` re-adds them while the body digest stays the same, ages moved on
+  by the time since parsing, so an unchanged response costs neither
+  parsing nor `ConnectionDB` changes.
+  """
+
+  __slots__ = ('digest', 'parsed_at', 'count', 'connections')
+
+  def __init__(self):
+    self.digest: Optional[str] = None
+    self.parsed_at = 0.0
+    self.count = 0
+    # (connection, its time_elapsed when parsed)
+    self.connections: List[Tuple['ConnectionData', float]] = []
+
+  def replay(self, digest: Optional[str], solar_map: 'SolarMap') -> Optional[int]:
+    """
+    :return: Count the parse returned, None if `digest` is not the body
+      the connections were parsed from
+    """
+    if digest is None or digest != self.digest:
+      return None
+    hours = (time.time() - self.parsed_at) / 3600.0
+    connections = []
+    for connection, time_elapsed in self.connections:
+      aged = round(time_elapsed + hours, 1)
+      if connection.time_elapsed != aged:
+        connection = replace(connection, time_elapsed=aged)
+      connections.append((connection, time_elapsed))
+      solar_map.add_connection(connection)
+    self.connections = connections
+    return self.count
+
+  def store(self, digest: Optional[str], count: int, connections: List['ConnectionData']):
+    self.digest = digest
+    self.parsed_at = time.time()
+    self.count = count
+    self.connections = [(x, x.time_elapsed) for x in connections]
@@ -0,0 +1,147 @@
+# http_pool.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from .http_cache import ResponseCache
+from .logger import Logger
+
+try:
+  import h2  # noqa: F401
+  HTTP2_AVAILABLE = True
+except ImportError:
+  HTTP2_AVAILABLE = False
+
+T = TypeVar('T')
+
+# (scheme://host:port, proxy, session)
+ClientKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class ClientPool:
+  """
+  Long-lived HTTP clients, one per (host, proxy)
+
+  Clients keep their connections alive between refreshes, so only the
+  first request to a host pays for the TCP and TLS handshakes. Async
+  clients are bound to the event loop they first connect on, so the pool
+  runs its own loop on a background thread: coroutines that use pooled
+  clients go through `run`. Callers that keep cookies per account pass a
+  `session` to get a client of their own. Sources that can skip work
+  on unchanged responses fetch through `responses`, if set.
+  """
+
+  # Idle connections are dropped by most servers after a minute or two
+  KEEPALIVE_EXPIRY = 90.0
+  MAX_CONNECTIONS = 10
+
+  def __init__(self, http2: bool = HTTP2_AVAILABLE, responses: Optional[ResponseCache] = None):
+    self.http2 = http2 and HTTP2_AVAILABLE
+    self.responses = responses
+    self._clients: Dict[ClientKey, httpx.AsyncClient] = {}
+    self._loop: Optional[asyncio.AbstractEventLoop] = None
+    self._thread: Optional[threading.Thread] = None
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def key(url: str, proxy: Optional[str] = None, session: Optional[str] = None) -> ClientKey:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return ('{}://{}:{}'.format(parts.scheme, parts.hostname, port), proxy or None, session)
+
+  def __len__(self) -> int:
+    return len(self._clients)
+
+  def get(
+    self, url: str, proxy: Optional[str] = None, session: Optional[str] = None
+  ) -> httpx.AsyncClient:
+    """
+    Client for the host of `url`. Only to be used on the pool's loop.
+    """
+    key = self.key(url, proxy, session)
+    client = self._clients.get(key)
+    if client is None or client.is_closed:
+      client_kwargs = {
+        'verify': True,
+        'http2': self.http2,
+        'limits': httpx.Limits(
+          max_connections=self.MAX_CONNECTIONS,
+          keepalive_expiry=self.KEEPALIVE_EXPIRY,
+        ),
+      }
+      if proxy:
+        client_kwargs['proxy'] = str(proxy)
+      client = httpx.AsyncClient(**client_kwargs)
+      self._clients[key] = client
+    return client
+
+  def submit(self, coroutine: Awaitable[T]) -> 'Future[T]':
+    """
+    Start `coroutine` on the pool's loop without waiting for it.
+    """
+    with self._lock:
+      if self._loop is None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+          target=self._loop.run_forever, name='ClientPool', daemon=True
+        )
+        self._thread.start()
+      loop = self._loop
+    return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+  def run(self, coroutine: Awaitable[T]) -> T:
+    """
+    Run `coroutine` on the pool's loop and wait for its result.
+    """
+    return self.submit(coroutine).result()
+
+  async def aclose(self):
+    clients = list(self._clients.values())
+    self._clients.clear()
+    for client in clients:
+      try:
+        await client.aclose()
+      except Exception as e:
+        Logger.error('Error closing HTTP client: {}'.format(e))
+
+  def close(self):
+    """
+    Close every client and stop the loop. The pool starts over on next use.
+    """
+    with self._lock:
+      loop, thread = self._loop, self._thread
+      self._loop = self._thread = None
+    if loop is None:
+      return
+    asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@asynccontextmanager
+async def pooled_client(
+  pool: Optional[ClientPool],
+  url: str,
+  proxy: Optional[str] = None,
+  session: Optional[str] = None,
+) -> AsyncIterator[httpx.AsyncClient]:
+  """
+  Pooled client for `url`, or a client of its own closed on exit when
+  there is no pool.
+  """
+  if pool is not None:
+    yield pool.get(url, proxy, session)
+    return
+
+  client_kwargs = {'verify': True}
+  if proxy:
+    client_kwargs['proxy'] = str(proxy)
+  async with httpx.AsyncClient(**client_kwargs) as client:
+    yield client
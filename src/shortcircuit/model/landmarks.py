@@ -0,0 +1,141 @@
+# landmarks.py
+
+from array import array
+from collections import deque
+from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple
+
+from .csr_graph import CsrGraph
+
+
+class LandmarkIndex:
+  """
+  Gate-only hop distances from a handful of landmark systems (ALT)
+
+  `tables[k][v]` is the number of gate jumps between landmark `k` and index
+  `v` of the gate layer, or -1 if `v` can not be reached through gates.
+  """
+
+  DEFAULT_COUNT = 8
+
+  def __init__(self, base: CsrGraph, landmarks: List[int], tables: List[array]):
+    self.base = base
+    self.landmarks = landmarks
+    self.tables = tables
+    self._chain_cache: Optional[Tuple[FrozenSet[int], array]] = None
+
+  @staticmethod
+  def _bfs(base: CsrGraph, root: int) -> array:
+    offsets = base.offsets
+    targets = base.targets
+    hops = array('l', [-1]) * len(base)
+    hops[root] = 0
+    queue = deque([root])
+    while queue:
+      u = queue.popleft()
+      next_hop = hops[u] + 1
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if hops[v] < 0:
+          hops[v] = next_hop
+          queue.append(v)
+    return hops
+
+  @classmethod
+  def build(cls, base: CsrGraph, count: int = DEFAULT_COUNT) -> 'LandmarkIndex':
+    """
+    Picks landmarks by farthest-point selection inside the gate component of
+    index 0 (New Eden), then stores one BFS table per landmark.
+    """
+    if len(base) == 0:
+      return cls(base, [], [])
+
+    reach = cls._bfs(base, 0)
+    # Distance from the closest landmark chosen so far
+    closest = [x if x >= 0 else -1 for x in reach]
+    landmarks: List[int] = []
+    tables: List[array] = []
+    for _ in range(count):
+      candidate = max(range(len(base)), key=closest.__getitem__)
+      if closest[candidate] <= 0:
+        break
+      table = cls._bfs(base, candidate)
+      landmarks.append(candidate)
+      tables.append(table)
+      for v, hops in enumerate(table):
+        if 0 <= hops < closest[v]:
+          closest[v] = hops
+
+    return cls(base, landmarks, tables)
+
+  def chain_hops(self, chain_endpoints: Iterable[int]) -> array:
+    """
+    Gate jumps from every index to the nearest chain endpoint, -1 if none is
+    reachable through gates. The last result is cached per endpoint set.
+    """
+    size = len(self.base)
+    key = frozenset(a for a in chain_endpoints if a < size)
+    cached = self._chain_cache
+    if cached is not None and cached[0] == key:
+      return cached[1]
+
+    offsets = self.base.offsets
+    targets = self.base.targets
+    hops = array('l', [-1]) * size
+    queue = deque(key)
+    for a in key:
+      hops[a] = 0
+    while queue:
+      u = queue.popleft()
+      next_hop = hops[u] + 1
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if hops[v] < 0:
+          hops[v] = next_hop
+          queue.append(v)
+
+    self._chain_cache = (key, hops)
+    return hops
+
+  def heuristic(
+    self,
+    target: int,
+    chain_endpoints: Iterable[int],
+    min_cost: float,
+  ) -> Optional[Callable[[int], float]]:
+    """
+    Admissible and consistent lower bound on the cost from any index to
+    `target`, valid while chain connections add shortcuts to the gate graph.
+
+    A path either stays on gates, costing at least the ALT bound
+    `max_L |d(L, target) - d(L, v)|` jumps, or first walks through gates to
+    the nearest chain endpoint and then takes at least one more jump. Each
+    jump costs at least `min_cost`.
+
+    :return: None if the target is not part of the gate layer
+    """
+    if target >= len(self.base) or not self.landmarks:
+      return None
+
+    size = len(self.base)
+    pairs = [
+      (table, table[target]) for table in self.tables if table[target] >= 0
+    ]
+    chain = self.chain_hops(chain_endpoints)
+
+    def estimate(v: int) -> float:
+      if v >= size:
+        return 0.0
+      bound = 0
+      for table, target_hops in pairs:
+        hops = table[v]
+        if hops >= 0:
+          diff = target_hops - hops if target_hops > hops else hops - target_hops
+          if diff > bound:
+            bound = diff
+      # -1: no chain endpoint reachable through gates, only gates remain
+      via_chain = chain[v] + 1
+      if 0 < via_chain < bound:
+        bound = via_chain
+      return min_cost * bound
+
+    return estimate
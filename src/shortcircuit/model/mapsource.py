@@ -1,7 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
 import uuid
 from enum import Enum
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+from shortcircuit.model.http_pool import ClientPool
 from shortcircuit.model.solarmap import SolarMap
 
 
@@ -38,6 +40,14 @@ class MapSource(ABC):
         """Fetch data and augment the provided solar map. Returns number of connections added."""
         pass
 
+    async def fetch(self, solar_map: SolarMap, clients: Optional[ClientPool] = None) -> int:
+        """
+        `fetch_data` as a coroutine, so sources can be fetched side by side.
+        Sources without an async client run `fetch_data` on a worker thread.
+        `clients` is the pool to take HTTP clients from, if any.
+        """
+        return await asyncio.to_thread(self.fetch_data, solar_map)
+
     @abstractmethod
     def connect(self) -> Tuple[bool, str]:
         """Test connection or authenticate. Returns (success, message)."""
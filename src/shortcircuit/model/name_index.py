@@ -0,0 +1,126 @@
+# name_index.py
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Sorts after every character a name can hold
+_LAST = '\U0010ffff'
+
+
+def _trigrams(key: str) -> Set[str]:
+  padded = '  {} '.format(key)
+  return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+  """
+  Case-insensitive lookups over a fixed list of names
+
+  Results are positions in that list. Exact matches are a hash lookup,
+  unique prefixes a binary search over the sorted upper case names. The
+  trigram postings behind `containing` and `suggest` are built on first
+  use.
+  """
+
+  __slots__ = ('names', '_exact', '_keys', '_positions', '_trigrams', '_sizes')
+
+  def __init__(self, names: Sequence[str]):
+    self.names = names
+    self._exact: Dict[str, int] = {}
+    for position, name in enumerate(names):
+      self._exact.setdefault(name.upper(), position)
+    order = sorted(range(len(names)), key=lambda x: (names[x].upper(), x))
+    self._keys = [names[x].upper() for x in order]
+    self._positions = order
+    self._trigrams: Optional[Dict[str, List[int]]] = None
+    # Trigram count by position
+    self._sizes: List[int] = []
+
+  def __len__(self) -> int:
+    return len(self.names)
+
+  def exact(self, text: str) -> int:
+    """
+    :return: Position of the name equal to `text` ignoring case, -1 if none
+    """
+    return self._exact.get(text.upper(), -1)
+
+  def prefixed(self, text: str) -> List[int]:
+    """
+    :return: Positions of the names starting with `text`, sorted by name
+    """
+    key = text.upper()
+    lo = bisect_left(self._keys, key)
+    hi = bisect_left(self._keys, key + _LAST, lo)
+    return self._positions[lo:hi]
+
+  def resolve(self, text: str) -> int:
+    """
+    Exact match, else the only name starting with `text`.
+
+    :return: Position, -1 if there is no match or the prefix is ambiguous
+    """
+    if not text:
+      return -1
+    key = text.upper()
+    position = self._exact.get(key)
+    if position is not None:
+      return position
+    keys = self._keys
+    lo = bisect_left(keys, key)
+    if lo == len(keys) or not keys[lo].startswith(key):
+      return -1
+    if lo + 1 < len(keys) and keys[lo + 1].startswith(key):
+      return -1
+    return self._positions[lo]
+
+  def _postings(self) -> Dict[str, List[int]]:
+    if self._trigrams is None:
+      self._trigrams = {}
+      for position, name in enumerate(self.names):
+        grams = _trigrams(name.upper())
+        self._sizes.append(len(grams))
+        for trigram in grams:
+          self._trigrams.setdefault(trigram, []).append(position)
+    return self._trigrams
+
+  def containing(self, text: str) -> List[int]:
+    """
+    :return: Positions of the names containing `text`, in list order
+    """
+    key = text.upper()
+    inner = [key[i:i + 3] for i in range(len(key) - 2)]
+    if not inner:
+      return [x for x, name in enumerate(self.names) if key in name.upper()]
+    postings = self._postings()
+    candidates = None
+    for trigram in sorted(inner, key=lambda x: len(postings.get(x, ()))):
+      matches = postings.get(trigram)
+      if not matches:
+        return []
+      candidates = set(matches) if candidates is None else candidates.intersection(matches)
+    return sorted(x for x in candidates if key in self.names[x].upper())
+
+  def suggest(self, text: str, limit: int = 10) -> List[int]:
+    """
+    Names ranked by similarity to `text`, tolerating typos: names starting
+    with `text` first, then by shared trigrams.
+    """
+    key = text.upper().strip()
+    if not key or limit <= 0:
+      return []
+    postings = self._postings()
+    grams = _trigrams(key)
+    shared: Dict[int, int] = {}
+    for trigram in grams:
+      for position in postings.get(trigram, ()):
+        shared[position] = shared.get(position, 0) + 1
+
+    def score(position: int) -> Tuple[int, float, str]:
+      name = self.names[position].upper()
+      # Dice coefficient over the padded trigram sets
+      similarity = 2.0 * shared[position] / (len(grams) + self._sizes[position])
+      return (0 if name.startswith(key) else 1, -similarity, name)
+
+    ranked = sorted(shared, key=score)
+    return ranked[:limit]
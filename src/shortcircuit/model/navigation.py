@@ -1,8 +1,15 @@
 # navigation.py
 
-from typing import TYPE_CHECKING, List
-
-from .evedb import EveDb, SystemDescription, WormholeMassspan, WormholeSize, WormholeTimespan
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+from .evedb import (
+  EveDb,
+  Restrictions,
+  SystemDescription,
+  WormholeMassspan,
+  WormholeSize,
+  WormholeTimespan,
+)
 from .solarmap import ConnectionType, SolarMap
 
 if TYPE_CHECKING:
@@ -14,6 +21,9 @@ class Navigation:
   Navigation
   """
 
+  # Routes offered by `alternatives`
+  ALTERNATIVES = 5
+
   def __init__(self, app_obj: 'MainWindow', eve_db: EveDb):
     self.app_obj = app_obj
     self.eve_db = eve_db
@@ -146,7 +156,56 @@ class Navigation:
       destination,
       self.app_obj.get_restrictions(),
     )
+    return self._build_route(path)
+
+  def alternatives(self, source: int, destination: int, k: int = ALTERNATIVES):
+    """
+    Up to `k` routes in order of cost, each as returned by `route`.
+    """
+    paths = self.solar_map.k_shortest_paths(
+      source,
+      destination,
+      self.app_obj.get_restrictions(),
+      k,
+    )
+    return [self._build_route(path) for path in paths]
+
+  def route_batch(
+    self,
+    requests: Iterable[Tuple[int, int, Optional[Restrictions]]],
+    workers: Optional[int] = None,
+  ) -> Iterator[Tuple[List[SystemDescription], str]]:
+    """
+    Routes many (source, destination, restrictions) requests, see
+    `BatchRouter`. Yields what `route` returns, in submission order.
+    Restrictions left as None use the current app settings.
+    """
+    from shortcircuit.model.batch_router import BatchRouter
+    defaults = None
+    prepared = []
+    for source, destination, restrictions in requests:
+      if restrictions is None:
+        if defaults is None:
+          defaults = self.app_obj.get_restrictions()
+        restrictions = defaults
+      prepared.append((source, destination, restrictions))
+
+    router = BatchRouter(self.solar_map, workers)
+    for path in router.route(prepared):
+      yield self._build_route(path)
+
+  @staticmethod
+  def route_summary(route: List[SystemDescription]) -> Tuple[int, int]:
+    """
+    :return: (jump count, wormhole jump count)
+    """
+    wormholes = sum(
+      1 for route_step in route[:-1]
+      if route_step['path_data'][0] == ConnectionType.WORMHOLE
+    )
+    return max(len(route) - 1, 0), wormholes
 
+  def _build_route(self, path: List[int]):
     # Construct route
     route: List[SystemDescription] = []
     for idx, x in enumerate(path):
@@ -159,7 +218,8 @@ class Navigation:
         weight = source.get_weight(dest)
         weight_back = dest.get_weight(source)
 
-      route_step = self.eve_db.system_desc[x]
+      # Fresh per step, alternatives may visit the same system with other instructions
+      route_step = self.eve_db.system_description(x)
       route_step['path_action'] = Navigation._get_instructions(weight)
       route_step['path_info'] = Navigation._get_additional_info(
         weight,
@@ -0,0 +1,131 @@
+# path_tree.py
+
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .csr_graph import INFINITY, RoutingGraph
+
+
+class ShortestPathTree:
+  """
+  One-to-all result of `SolarMap.shortest_path_tree`
+
+  Keeps compact per-index `distance`, `parent` and `jumps` arrays along with
+  the index -> system ID mapping of the graph at query time, so later graph
+  updates do not affect it. Every answer follows the same cheapest routes
+  `SolarMap.shortest_path` would pick under the same restrictions.
+  """
+
+  def __init__(
+    self,
+    graph: RoutingGraph,
+    source: int,
+    distance: List[float],
+    parent: array,
+  ):
+    self.source = source
+    self.ids = array('l', graph.base.ids)
+    self.ids.extend(graph.extra_ids)
+    self._base_index = graph.base.index
+    self._extra_index: Dict[int, int] = dict(graph.extra_index)
+    self.distance = array('d', distance)
+    self.parent = parent
+    self.jumps = self._count_jumps(self.distance, parent)
+
+  @staticmethod
+  def _count_jumps(distance: array, parent: array) -> array:
+    jumps = array('l', [-1]) * len(parent)
+    for v in range(len(parent)):
+      if jumps[v] >= 0 or distance[v] == INFINITY:
+        continue
+      # Walk up to a node with a known count (or the source), fill back down
+      chain = []
+      u = v
+      while jumps[u] < 0 and parent[u] >= 0:
+        chain.append(u)
+        u = parent[u]
+      count = max(jumps[u], 0)
+      jumps[u] = count
+      for w in reversed(chain):
+        count += 1
+        jumps[w] = count
+    return jumps
+
+  def _index(self, system_id: int) -> Optional[int]:
+    idx = self._base_index.get(system_id)
+    if idx is None:
+      idx = self._extra_index.get(system_id)
+    return idx
+
+  def _reached(self, idx: Optional[int]) -> bool:
+    return idx is not None and self.distance[idx] < INFINITY
+
+  def __contains__(self, system_id: int) -> bool:
+    return self._reached(self._index(system_id))
+
+  def __iter__(self) -> Iterator[int]:
+    """
+    Reached system IDs, the source included
+    """
+    for idx, cost in enumerate(self.distance):
+      if cost < INFINITY:
+        yield self.ids[idx]
+
+  def cost(self, system_id: int) -> float:
+    """
+    Route cost to `system_id`, INFINITY if it can not be reached
+    """
+    idx = self._index(system_id)
+    return self.distance[idx] if self._reached(idx) else INFINITY
+
+  def jump_count(self, system_id: int) -> Optional[int]:
+    """
+    Jumps on the route to `system_id`, None if it can not be reached
+    """
+    idx = self._index(system_id)
+    return self.jumps[idx] if self._reached(idx) else None
+
+  def path(self, system_id: int) -> List[int]:
+    """
+    Route from the source to `system_id` as system IDs, empty if unreachable
+    """
+    idx = self._index(system_id)
+    if not self._reached(idx):
+      return []
+    path = [self.ids[idx]]
+    while self.parent[idx] >= 0:
+      idx = self.parent[idx]
+      path.append(self.ids[idx])
+    path.reverse()
+    return path
+
+  def nearest(self, predicate: Callable[[int], bool]) -> Optional[int]:
+    """
+    Cheapest reached system ID matching `predicate`, fewest jumps on ties.
+    The source itself is a candidate.
+    """
+    best = None
+    best_key = None
+    for idx, cost in enumerate(self.distance):
+      if cost == INFINITY:
+        continue
+      key = (cost, self.jumps[idx])
+      if best_key is not None and key >= best_key:
+        continue
+      system_id = self.ids[idx]
+      if predicate(system_id):
+        best = system_id
+        best_key = key
+    return best
+
+  def within(self, jumps: int) -> List[int]:
+    """
+    System IDs at most `jumps` jumps away on their cheapest route, closest
+    first. The source itself is included.
+    """
+    found = [
+      idx for idx, count in enumerate(self.jumps)
+      if 0 <= count <= jumps and self.distance[idx] < INFINITY
+    ]
+    found.sort(key=lambda idx: (self.distance[idx], self.jumps[idx]))
+    return [self.ids[idx] for idx in found]
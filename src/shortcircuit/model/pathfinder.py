@@ -7,6 +7,8 @@ from typing import Tuple, Dict, Any, List, Optional
 import httpx
 from shortcircuit import USER_AGENT
 from .evedb import EveDb, WormholeSize, WormholeTimespan, WormholeMassspan
+from .http_cache import ParsedBody, RecordingMap, cached_get
+from .http_pool import ClientPool, pooled_client
 from .solarmap import SolarMap, ConnectionType
 from .logger import Logger
 
@@ -24,6 +26,7 @@ class Pathfinder:
     self.token = token
     self.name = name
     self.source_id = name
+    self._parsed = ParsedBody()
 
   def get_name(self) -> str:
     return self.name
@@ -49,7 +52,9 @@ class Pathfinder:
     except Exception as e:
       return False, f"Connection failed: {e}"
 
-  async def _augment_map_async(self, solar_map: SolarMap) -> int:
+  async def augment_map_async(
+    self, solar_map: SolarMap, clients: Optional[ClientPool] = None
+  ) -> int:
     # Construct the API endpoint. 
     # If the user provided a base URL (e.g. https://pathfinder.example.com),
     # we assume the API is at /api/connections or similar.
@@ -67,12 +72,23 @@ class Pathfinder:
     headers = {k: v for k, v in headers.items() if v is not None}
 
     try:
-      async with httpx.AsyncClient(verify=True) as client:
-        response = await client.get(target_url, headers=headers, timeout=10.0)
+      async with pooled_client(clients, target_url) as client:
+        response, digest = await cached_get(
+          client,
+          clients.responses if clients else None,
+          target_url,
+          headers=headers,
+          timeout=10.0,
+        )
         
         if response.status_code != 200:
           Logger.error(f"Pathfinder API returned {response.status_code}")
           return -1
+
+        # Unchanged since the last parse
+        replayed = self._parsed.replay(digest, solar_map)
+        if replayed is not None:
+          return replayed
         
         data = response.json()
         # Handle list or dict response
@@ -82,10 +98,12 @@ class Pathfinder:
           Logger.error("Pathfinder API response format not recognized")
           return -1
 
+        recording = RecordingMap(solar_map)
         count = 0
         for conn in connections_list:
-          if self._process_connection(conn, solar_map):
+          if self._process_connection(conn, recording):
             count += 1
+        self._parsed.store(digest, count, recording.added)
         return count
 
     except Exception as e:
@@ -172,4 +190,4 @@ class Pathfinder:
       return False
 
   def augment_map(self, solar_map: SolarMap) -> int:
-    return asyncio.run(self._augment_map_async(solar_map))
\ No newline at end of file
+    return asyncio.run(self.augment_map_async(solar_map))
\ No newline at end of file
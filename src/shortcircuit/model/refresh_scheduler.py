@@ -0,0 +1,228 @@
+# refresh_scheduler.py
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logger import Logger
+
+
+class SourceSchedule:
+  """
+  Refresh state of one source
+  """
+
+  __slots__ = ('interval', 'next_run', 'failures', 'running')
+
+  def __init__(self, interval: float, next_run: float):
+    # Current adaptive interval in seconds
+    self.interval = interval
+    self.next_run = next_run
+    # Failed refreshes in a row
+    self.failures = 0
+    self.running = False
+
+
+class RefreshScheduler:
+  """
+  Per-source refresh times
+
+  Every source refreshes on its own clock. Intervals adapt to how often a
+  source's data changes: halved down to `MIN_FACTOR` times the base
+  interval after a refresh that changed something, grown by `SLOWDOWN` up
+  to `MAX_FACTOR` times it after one that did not. Failures back off
+  exponentially up to `MAX_BACKOFF`. After `FAILURE_THRESHOLD` of them in
+  a row the circuit opens: the source is only probed every `OPEN_SECONDS`
+  until a refresh succeeds again. Every delay is spread by up to
+  +-`JITTER` so sources do not fire in lock step.
+
+  `run` drives the refreshes on an event loop; the other methods may be
+  called from any thread.
+  """
+
+  MIN_FACTOR = 0.5
+  MAX_FACTOR = 4.0
+  SLOWDOWN = 1.5
+  # Seconds, no source is polled more often than this
+  MIN_INTERVAL = 10.0
+  MAX_BACKOFF = 600.0
+  FAILURE_THRESHOLD = 5
+  OPEN_SECONDS = 900.0
+  JITTER = 0.1
+
+  def __init__(
+    self,
+    interval: float = 30.0,
+    clock: Callable[[], float] = time.monotonic,
+    rng: Callable[[], float] = random.random,
+  ):
+    """
+    :param interval: Base interval in seconds of sources without one of their own
+    :param clock: Source of the times `next_runs` reports
+    :param rng: Uniform [0, 1) numbers for the jitter
+    """
+    self.interval = interval
+    self.clock = clock
+    self._rng = rng
+    self._sources: Dict[str, SourceSchedule] = {}
+    self._intervals: Dict[str, float] = {}
+    self._lock = threading.Lock()
+    # Loop and event of a running `run`, set to reschedule early
+    self._wakeup: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = None
+
+  def base_interval(self, source_id: str) -> float:
+    return max(self.MIN_INTERVAL, self._intervals.get(source_id, self.interval))
+
+  def _jittered(self, delay: float) -> float:
+    return delay * (1.0 + self.JITTER * (2.0 * self._rng() - 1.0))
+
+  def _wake(self):
+    if self._wakeup is not None:
+      loop, event = self._wakeup
+      loop.call_soon_threadsafe(event.set)
+
+  def set_interval(self, interval: float, source_id: Optional[str] = None):
+    """
+    Set the base interval of one source, or the default of all sources if
+    `source_id` is None. Adaptation starts over from the new interval.
+    """
+    with self._lock:
+      if source_id is None:
+        self.interval = interval
+      else:
+        self._intervals[source_id] = interval
+      now = self.clock()
+      for key, state in self._sources.items():
+        if source_id is not None and key != source_id:
+          continue
+        state.interval = self.base_interval(key)
+        if not state.running:
+          state.next_run = min(state.next_run, now + self._jittered(state.interval))
+      self._wake()
+
+  def sync(self, source_ids: Iterable[str]):
+    """
+    Schedule exactly `source_ids`. Sources new to the scheduler are first
+    due after one interval.
+    """
+    source_ids = list(source_ids)
+    with self._lock:
+      now = self.clock()
+      for source_id in list(self._sources):
+        if source_id not in source_ids:
+          del self._sources[source_id]
+      for source_id in source_ids:
+        if source_id not in self._sources:
+          interval = self.base_interval(source_id)
+          self._sources[source_id] = SourceSchedule(interval, now + self._jittered(interval))
+      self._wake()
+
+  def due(self) -> List[str]:
+    """
+    Sources whose refresh is due, marked as running until `record`.
+    """
+    with self._lock:
+      now = self.clock()
+      due = []
+      for source_id, state in self._sources.items():
+        if not state.running and state.next_run <= now:
+          state.running = True
+          due.append(source_id)
+      return due
+
+  def record(self, source_id: str, ok: bool, changed: bool = False):
+    """
+    Schedule the next refresh of `source_id` after one finished.
+
+    :param ok: Whether the refresh succeeded
+    :param changed: Whether it brought in new data
+    """
+    with self._lock:
+      state = self._sources.get(source_id)
+      if state is None:
+        return
+      state.running = False
+      base = self.base_interval(source_id)
+      if ok:
+        state.failures = 0
+        if changed:
+          state.interval = max(base * self.MIN_FACTOR, state.interval / 2.0)
+        else:
+          state.interval = min(base * self.MAX_FACTOR, state.interval * self.SLOWDOWN)
+        delay = max(self.MIN_INTERVAL, state.interval)
+      else:
+        state.failures += 1
+        if state.failures >= self.FAILURE_THRESHOLD:
+          delay = self.OPEN_SECONDS
+        else:
+          delay = min(self.MAX_BACKOFF, state.interval * 2 ** state.failures)
+      state.next_run = self.clock() + self._jittered(delay)
+
+  def is_open(self, source_id: str) -> bool:
+    """
+    True while the circuit of `source_id` is open, see `FAILURE_THRESHOLD`.
+    """
+    with self._lock:
+      state = self._sources.get(source_id)
+      return state is not None and state.failures >= self.FAILURE_THRESHOLD
+
+  def next_runs(self) -> Dict[str, float]:
+    """
+    Time of the next refresh per source, by `clock`. Sources being
+    refreshed right now are left out.
+    """
+    with self._lock:
+      return {
+        source_id: state.next_run
+        for source_id, state in self._sources.items()
+        if not state.running
+      }
+
+  def _next_delay(self) -> Optional[float]:
+    runs = self.next_runs()
+    if not runs:
+      return None
+    return max(0.0, min(runs.values()) - self.clock())
+
+  async def run(self, refresh: Callable[[str], Awaitable[Tuple[bool, bool]]]):
+    """
+    Refresh sources as they come due, each in a task of its own, until
+    cancelled.
+
+    :param refresh: Refreshes a source, returns whether that succeeded and
+      whether it brought in new data
+    """
+    wakeup = asyncio.Event()
+    with self._lock:
+      self._wakeup = (asyncio.get_running_loop(), wakeup)
+    tasks = set()
+    try:
+      while True:
+        wakeup.clear()
+        for source_id in self.due():
+          task = asyncio.ensure_future(self._refresh(source_id, refresh))
+          tasks.add(task)
+          task.add_done_callback(tasks.discard)
+        try:
+          await asyncio.wait_for(wakeup.wait(), self._next_delay())
+        except asyncio.TimeoutError:
+          pass
+    finally:
+      with self._lock:
+        self._wakeup = None
+        for state in self._sources.values():
+          state.running = False
+      for task in tasks:
+        task.cancel()
+
+  async def _refresh(self, source_id: str, refresh: Callable[[str], Awaitable[Tuple[bool, bool]]]):
+    try:
+      ok, changed = await refresh(source_id)
+    except Exception as e:
+      Logger.error('Scheduled refresh of {} failed: {}'.format(source_id, e))
+      ok, changed = False, False
+    self.record(source_id, ok, changed)
+    # The next refresh of this source may be earlier than the one waited for
+    self._wake()
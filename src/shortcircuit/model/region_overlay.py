@@ -0,0 +1,305 @@
+# region_overlay.py
+
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .csr_graph import INFINITY, CompiledRestrictions, CsrGraph, RoutingGraph, SearchStats
+
+# Cheapest routes from one system to the rest of its region:
+# (distance, parent) by position in `RegionPartition.members`
+RegionTree = Tuple[List[float], array]
+
+
+class RegionPartition:
+  """
+  Regions of the gate layer
+
+  `region_of[i]` is the dense region number of base index `i`, `members[r]`
+  lists the indices of region `r` and `position[i]` is the place of `i` in
+  its region's member list. `borders[r]` are the members with a gate into
+  another region.
+  """
+
+  __slots__ = ('base', 'region_of', 'position', 'members', 'borders', 'is_border')
+
+  @classmethod
+  def build(cls, base: CsrGraph, region_ids: Iterable[int]) -> 'RegionPartition':
+    """
+    :param region_ids: Region ID of every base index, in index order
+    """
+    ret = cls()
+    ret.base = base
+    ret.region_of = array('l')
+    ret.position = array('l')
+    ret.members: List[List[int]] = []
+    numbers: Dict[int, int] = {}
+    for idx, region_id in enumerate(region_ids):
+      r = numbers.get(region_id)
+      if r is None:
+        r = numbers[region_id] = len(ret.members)
+        ret.members.append([])
+      ret.region_of.append(r)
+      ret.position.append(len(ret.members[r]))
+      ret.members[r].append(idx)
+
+    region_of = ret.region_of
+    offsets = base.offsets
+    targets = base.targets
+    ret.borders = [[] for _ in ret.members]
+    ret.is_border = bytearray(len(base))
+    for u in range(len(base)):
+      r = region_of[u]
+      for e in range(offsets[u], offsets[u + 1]):
+        if region_of[targets[e]] != r:
+          ret.borders[r].append(u)
+          ret.is_border[u] = 1
+          break
+    return ret
+
+
+# Upper level edge: (other end, cost, True if linked by a region tree)
+Link = Tuple[int, float, bool]
+
+
+class RegionRouter:
+  """
+  Two-level point-to-point search over a `RegionPartition`
+
+  The upper level only holds region border systems, chain endpoints and the
+  query's source and destination. Inside a region they are linked by the
+  cheapest route that stays in the region, taken from per-system region
+  trees; across regions by the border gates and the chain connections,
+  injected from the compiled overlay at query time. Every route splits
+  into such pieces, so the upper level search is exact. The winning route
+  is then refined inside the regions it crosses by walking the trees.
+
+  Region trees only depend on the base layer costs and are kept for as
+  long as the compiled restrictions share them, see `matches`.
+  """
+
+  def __init__(self, partition: RegionPartition, weights: CompiledRestrictions):
+    self.partition = partition
+    self.edge_costs = weights.edge_costs
+    self.reverse_costs = weights.reverse_costs
+    self.avoid = bytes(weights.avoid[:len(partition.base)])
+    self._trees: Dict[int, RegionTree] = {}
+    # Everything below is valid for the compiled overlay in `_overlay`
+    self._overlay: Optional[CompiledRestrictions] = None
+    self._portals: List[List[int]] = []
+    self._chain: Tuple[Dict[int, List[Link]], Dict[int, List[Link]]] = ({}, {})
+    # Upper level edges leaving / entering a base index, chain excluded
+    self._links: Tuple[Dict[int, List[Link]], Dict[int, List[Link]]] = ({}, {})
+
+  def matches(self, weights: CompiledRestrictions) -> bool:
+    return weights.base is self.partition.base and weights.edge_costs is self.edge_costs
+
+  def _tree(self, root: int) -> RegionTree:
+    tree = self._trees.get(root)
+    if tree is not None:
+      return tree
+
+    partition = self.partition
+    offsets = partition.base.offsets
+    targets = partition.base.targets
+    region_of = partition.region_of
+    position = partition.position
+    edge_costs = self.edge_costs
+    avoid = self.avoid
+    r = region_of[root]
+    size = len(partition.members[r])
+
+    distance = [INFINITY] * size
+    distance[position[root]] = 0
+    parent = array('l', [-1]) * size
+    settled = bytearray(size)
+    queue: List[Tuple[float, int]] = [(0, root)]
+    while queue:
+      base_u, u = heapq.heappop(queue)
+      if settled[position[u]]:
+        continue
+      settled[position[u]] = 1
+      if avoid[u] and u != root:
+        continue
+      for e in range(offsets[u], offsets[u + 1]):
+        v = targets[e]
+        if region_of[v] != r or settled[position[v]]:
+          continue
+        candidate = base_u + edge_costs[e]
+        if candidate < distance[position[v]]:
+          distance[position[v]] = candidate
+          parent[position[v]] = u
+          heapq.heappush(queue, (candidate, v))
+
+    tree = (distance, parent)
+    self._trees[root] = tree
+    return tree
+
+  def _load_overlay(self, weights: CompiledRestrictions):
+    """
+    Makes chain endpoints upper level systems of their regions and turns
+    chain connections into upper level edges.
+    """
+    if self._overlay is weights:
+      return
+
+    partition = self.partition
+    base_size = len(partition.base)
+    portals = [list(borders) for borders in partition.borders]
+    outgoing: Dict[int, List[Link]] = {}
+    incoming: Dict[int, List[Link]] = {}
+    for u, row in weights.overlay.items():
+      for v, cost in row:
+        outgoing.setdefault(u, []).append((v, cost, False))
+        incoming.setdefault(v, []).append((u, cost, False))
+    for x in sorted(set(outgoing) | set(incoming)):
+      if x < base_size and not partition.is_border[x]:
+        portals[partition.region_of[x]].append(x)
+
+    self._overlay = weights
+    self._portals = portals
+    self._chain = (outgoing, incoming)
+    self._links = ({}, {})
+
+  def _links_of(self, u: int, forward: bool) -> List[Link]:
+    links = self._links[0 if forward else 1].get(u)
+    if links is not None:
+      return links
+
+    partition = self.partition
+    offsets = partition.base.offsets
+    targets = partition.base.targets
+    region_of = partition.region_of
+    position = partition.position
+    r = region_of[u]
+    links = []
+    if forward:
+      region_distance = self._tree(u)[0]
+      for v in self._portals[r]:
+        cost = region_distance[position[v]]
+        if v != u and cost < INFINITY:
+          links.append((v, cost, True))
+    else:
+      for v in self._portals[r]:
+        cost = self._tree(v)[0][position[u]]
+        if v != u and cost < INFINITY:
+          links.append((v, cost, True))
+    gate_costs = self.edge_costs if forward else self.reverse_costs
+    for e in range(offsets[u], offsets[u + 1]):
+      v = targets[e]
+      if region_of[v] != r:
+        links.append((v, gate_costs[e], False))
+
+    self._links[0 if forward else 1][u] = links
+    return links
+
+  def route(
+    self,
+    graph: RoutingGraph,
+    source: int,
+    destination: int,
+    weights: CompiledRestrictions,
+    stats: Optional[SearchStats] = None,
+  ) -> List[int]:
+    """
+    Bidirectional Dijkstra over the upper level, same costs as
+    `csr_graph.dijkstra`. Equal cost routes may differ.
+
+    :return: Path as a list of indices, empty if unreachable
+    """
+    self._load_overlay(weights)
+    partition = self.partition
+    base_size = len(partition.base)
+    region_of = partition.region_of
+    position = partition.position
+    size = len(graph)
+    # The query's own systems are upper level only in their regions
+    ends = (destination, source)
+    end_regions = tuple(region_of[x] if x < base_size else -1 for x in ends)
+
+    distance = ([INFINITY] * size, [INFINITY] * size)
+    # upper level node -> (neighbor towards the search root, via tree)
+    parent: Tuple[Dict[int, Tuple[int, bool]], Dict[int, Tuple[int, bool]]] = ({}, {})
+    mask = weights.blocked_mask(graph, source, destination)
+    settled = (mask, bytearray(mask))
+    distance[0][source] = 0
+    distance[1][destination] = 0
+    queues: Tuple[List[Tuple[float, int]], List[Tuple[float, int]]] = (
+      [(0, source)],
+      [(0, destination)],
+    )
+    best = INFINITY
+    meeting = -1
+    count = 0
+
+    while queues[0] and queues[1]:
+      if queues[0][0][0] + queues[1][0][0] >= best:
+        break
+      side = 0 if len(queues[0]) <= len(queues[1]) else 1
+      base_u, u = heapq.heappop(queues[side])
+      if settled[side][u]:
+        continue
+      settled[side][u] = 1
+      count += 1
+
+      forward = side == 0
+      edges = self._chain[side].get(u, [])
+      if u < base_size:
+        edges = self._links_of(u, forward) + edges
+        if region_of[u] == end_regions[side]:
+          end = ends[side]
+          cost = (
+            self._tree(u)[0][position[end]] if forward
+            else self._tree(end)[0][position[u]]
+          )
+          edges.append((end, cost, True))
+
+      dist = distance[side]
+      other = distance[1 - side]
+      links = parent[side]
+      done = settled[side]
+      for v, cost, via_tree in edges:
+        if done[v]:
+          continue
+        candidate = base_u + cost
+        if candidate < dist[v]:
+          dist[v] = candidate
+          links[v] = (u, via_tree)
+          heapq.heappush(queues[side], (candidate, v))
+        if other[v] < INFINITY and dist[v] + other[v] < best:
+          best = dist[v] + other[v]
+          meeting = v
+
+    if stats is not None:
+      stats.settled = count
+    if meeting < 0:
+      return []
+
+    path = [meeting]
+    v = meeting
+    while v != source:
+      u, via_tree = parent[0][v]
+      path.extend(self._refine(u, v, via_tree)[-2::-1])
+      v = u
+    path.reverse()
+    u = meeting
+    while u != destination:
+      v, via_tree = parent[1][u]
+      path.extend(self._refine(u, v, via_tree)[1:])
+      u = v
+    return path
+
+  def _refine(self, u: int, v: int, via_tree: bool) -> List[int]:
+    """
+    Base layer path `u .. v` behind one upper level edge.
+    """
+    if not via_tree:
+      return [u, v]
+    tree_parent = self._tree(u)[1]
+    position = self.partition.position
+    path = [v]
+    while v != u:
+      v = tree_parent[position[v]]
+      path.append(v)
+    path.reverse()
+    return path
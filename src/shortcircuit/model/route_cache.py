@@ -0,0 +1,147 @@
+# route_cache.py
+
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Set, Tuple
+
+from .avoidance import AvoidanceSet
+from .evedb import Restrictions
+
+RouteKey = Tuple[int, int, Hashable, Hashable, int]
+
+
+class RouteCache:
+  """
+  LRU cache of `SolarMap.shortest_path` and `k_shortest_paths` results
+
+  Entries are keyed by (source, destination, search mode, restriction
+  fingerprint, graph version), K-shortest results under the mode
+  `("k_shortest", k)`. When the graph changes, `advance` carries over the
+  entries that are provably still shortest and drops the rest.
+  """
+
+  DEFAULT_SIZE = 256
+
+  def __init__(self, max_size: int = DEFAULT_SIZE):
+    self.max_size = max_size
+    self.version = 0
+    self.hits = 0
+    self.misses = 0
+    # Paths in order of cost, one unless the entry is a K-shortest result
+    self._entries: 'OrderedDict[RouteKey, Tuple[List[int], ...]]' = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  @staticmethod
+  def fingerprint(restrictions: Restrictions) -> Hashable:
+    """
+    Canonical, hashable form of the restrictions that affect routing.
+
+    Missing keys take the same defaults as `SolarMap._edge_filter`.
+    """
+    avoidance = restrictions["avoidance_list"]
+    return (
+      tuple(
+        sorted(
+          int(size)
+          for size, blocked in restrictions.get("size_restriction", {}).items()
+          if blocked
+        )
+      ),
+      bool(restrictions.get("ignore_eol", False)),
+      bool(restrictions.get("ignore_masscrit", False)),
+      float(restrictions.get("age_threshold", float('inf'))),
+      tuple(
+        sorted(
+          (int(space_type), float(cost))
+          for space_type, cost in restrictions["security_prio"].items()
+        )
+      ),
+      # Resolved sets carry theirs, with the hash already computed
+      avoidance.system_ids if isinstance(avoidance, AvoidanceSet) else frozenset(avoidance),
+    )
+
+  def get(
+    self,
+    source: int,
+    destination: int,
+    mode: Hashable,
+    fingerprint: Hashable,
+  ) -> Optional[List[int]]:
+    paths = self.get_paths(source, destination, mode, fingerprint)
+    return None if paths is None else paths[0]
+
+  def put(
+    self,
+    source: int,
+    destination: int,
+    mode: Hashable,
+    fingerprint: Hashable,
+    path: List[int],
+  ):
+    self.put_paths(source, destination, mode, fingerprint, [path])
+
+  def get_paths(
+    self,
+    source: int,
+    destination: int,
+    mode: Hashable,
+    fingerprint: Hashable,
+  ) -> Optional[List[List[int]]]:
+    key = (source, destination, mode, fingerprint, self.version)
+    paths = self._entries.get(key)
+    if paths is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self._entries.move_to_end(key)
+    return [list(path) for path in paths]
+
+  def put_paths(
+    self,
+    source: int,
+    destination: int,
+    mode: Hashable,
+    fingerprint: Hashable,
+    paths: Iterable[List[int]],
+  ):
+    key = (source, destination, mode, fingerprint, self.version)
+    self._entries[key] = tuple(list(path) for path in paths)
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_size:
+      self._entries.popitem(last=False)
+
+  def advance(
+    self,
+    version: int,
+    touched: Iterable[Tuple[int, int]],
+    widened: bool,
+  ):
+    """
+    Moves the cache to a new graph version.
+
+    :param touched: System pairs whose connection changed, as (min, max)
+    :param widened: True if any change added a connection or relaxed one.
+      A new shortcut can beat any cached path, so everything is dropped.
+      Otherwise only entries with a path running over a touched pair are
+      dropped: the rest only got more expensive, so what was cheapest
+      still is.
+    """
+    entries = self._entries
+    self._entries = OrderedDict()
+    self.version = version
+    if widened:
+      return
+
+    touched_set: Set[Tuple[int, int]] = set(touched)
+    for (source, destination, mode, fingerprint, _), paths in entries.items():
+      if any(
+        (min(a, b), max(a, b)) in touched_set
+        for path in paths
+        for a, b in zip(path, path[1:])
+      ):
+        continue
+      self._entries[(source, destination, mode, fingerprint, version)] = paths
+
+  def clear(self):
+    self._entries.clear()
@@ -0,0 +1,291 @@
+# sde_image.py
+
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from typing import List, Optional, Sequence, Union
+
+# Image columns are arrays when compiled, read-only views into the mapped
+# file when loaded
+Column = Union[array, memoryview]
+
+# CSV exports an image is compiled from, see `EveDb`
+SOURCES = (
+  'mapLocationWormholeClasses.csv',
+  'mapRegions.csv',
+  'mapSolarSystemJumps.csv',
+  'mapSolarSystems.csv',
+  'renames.csv',
+  'statics.csv',
+)
+
+
+def _source_stamp(directory: str) -> Optional[bytes]:
+  """
+  Cheap fingerprint of the sources: sizes and modification times. None if
+  a source is missing.
+  """
+  digest = hashlib.sha1()
+  for filename in SOURCES:
+    try:
+      stat = os.stat(os.path.join(directory, filename))
+    except OSError:
+      return None
+    digest.update('{}:{}:{};'.format(filename, stat.st_size, stat.st_mtime_ns).encode())
+  return digest.digest()
+
+
+def _source_digest(directory: str) -> bytes:
+  """
+  Checksum of the source contents, for when only the timestamps moved.
+  """
+  digest = hashlib.sha1()
+  for filename in SOURCES:
+    with open(os.path.join(directory, filename), 'rb') as f:
+      data = f.read()
+    digest.update('{}:{};'.format(filename, len(data)).encode())
+    digest.update(data)
+  return digest.digest()
+
+
+def pack_strings(values: List[str]) -> array:
+  return array('B', '\n'.join(values).encode('utf-8'))
+
+
+def unpack_strings(blob: Column) -> List[str]:
+  if not blob:
+    return []
+  return blob.tobytes().decode('utf-8').split('\n')
+
+
+class SdeImage:
+  """
+  Compiled SDE tables
+
+  Systems, regions and statics are parallel columns in index order,
+  strings are newline separated UTF-8 blobs. Renames and system classes
+  are applied at compile time. `system_name_offsets[i]` is where the name
+  of system `i` starts in `system_names`, with one extra entry past the
+  end. `system_rows` maps IDs to system indices in blocks of
+  `2 ** BLOCK_BITS` IDs, -1 where there is no system; `system_blocks`
+  lists the block numbers (ID >> BLOCK_BITS) the blocks stand for.
+  `gates` holds (from, to) system ID pairs back to back,
+  `region_geometry` ten floats per region: x, y, z, xMin, xMax, yMin,
+  yMax, zMin, zMax and radius (NaN if unknown).
+
+  Every column starts 8-byte aligned in the file, so a loaded image is a
+  set of views into one read-only memory map that all processes opening
+  it share.
+  """
+
+  # Bump when the layout or the way a column is derived changes
+  FORMAT = 2
+  MAGIC = b'SCDB'
+  FILENAME = 'sde.bin'
+  # MAGIC, FORMAT, checksum, source stamp and digest, padding
+  HEADER_SIZE = 56
+  # System IDs cluster in a few dozen blocks of this size
+  BLOCK_BITS = 10
+
+  COLUMNS = (
+    ('system_ids', 'i'),
+    ('system_regions', 'i'),
+    ('system_security', 'd'),
+    ('system_classes', 'B'),
+    ('system_flags', 'B'),
+    ('system_names', 'B'),
+    ('system_name_offsets', 'i'),
+    ('system_blocks', 'i'),
+    ('system_rows', 'i'),
+    ('class_names', 'B'),
+    ('gates', 'i'),
+    ('region_ids', 'i'),
+    ('region_names', 'B'),
+    ('region_geometry', 'd'),
+    ('region_factions', 'i'),
+    ('region_nebulae', 'B'),
+    ('static_codes', 'B'),
+    ('static_sizes', 'B'),
+  )
+
+  # Bits of `system_flags`
+  FLAG_TRIGLAVIAN = 1
+
+  __slots__ = tuple(name for name, _ in COLUMNS)
+
+  def __init__(self, columns: Optional[List[Column]] = None):
+    if columns is None:
+      columns = [array(typecode) for _, typecode in self.COLUMNS]
+    for (name, _), column in zip(self.COLUMNS, columns):
+      setattr(self, name, column)
+
+  def _columns(self) -> List[Column]:
+    return [getattr(self, name) for name, _ in self.COLUMNS]
+
+  def index_systems(self):
+    """
+    Derives `system_name_offsets`, `system_blocks` and `system_rows` from
+    the other system columns.
+    """
+    self.system_name_offsets = array('i', [0])
+    for name in unpack_strings(self.system_names):
+      self.system_name_offsets.append(
+        self.system_name_offsets[-1] + len(name.encode('utf-8')) + 1
+      )
+    bits = self.BLOCK_BITS
+    self.system_blocks = array('i', sorted(set(x >> bits for x in self.system_ids)))
+    self.system_rows = array('i', [-1]) * (len(self.system_blocks) << bits)
+    blocks = {block: i for i, block in enumerate(self.system_blocks)}
+    for row, system_id in enumerate(self.system_ids):
+      block = blocks[system_id >> bits]
+      self.system_rows[(block << bits) | (system_id & ((1 << bits) - 1))] = row
+
+  def save(self, path: str, sources: str):
+    """
+    Writes the image to `path` atomically.
+
+    :param sources: Directory of the CSV exports the image was compiled from
+    """
+    payload = bytearray()
+    for column in self._columns():
+      payload += struct.pack('=q', len(column))
+      payload += column.tobytes()
+      payload += bytes(-len(payload) % 8)
+    stamp = _source_stamp(sources) or bytes(20)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+      f.write(self.MAGIC)
+      f.write(struct.pack('=II', self.FORMAT, zlib.crc32(payload)))
+      f.write(stamp)
+      f.write(_source_digest(sources))
+      f.write(bytes(self.HEADER_SIZE - f.tell()))
+      f.write(payload)
+    os.replace(temporary, path)
+
+  @classmethod
+  def load(cls, path: str, sources: str) -> Optional['SdeImage']:
+    """
+    :param sources: Directory of the CSV exports. The image is only trusted
+      when they are missing or unchanged since it was compiled.
+    :return: None if the image is missing, damaged, of another format or
+      stale
+    """
+    try:
+      with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+      return None
+
+    header = len(cls.MAGIC) + 8
+    if len(data) < cls.HEADER_SIZE or data[:len(cls.MAGIC)] != cls.MAGIC:
+      return None
+    version, checksum = struct.unpack_from('=II', data, len(cls.MAGIC))
+    if version != cls.FORMAT:
+      return None
+    stamp = _source_stamp(sources)
+    if stamp is not None and stamp != data[header:header + 20]:
+      try:
+        if _source_digest(sources) != data[header + 20:header + 40]:
+          return None
+      except OSError:
+        return None
+
+    # The views keep the map open for as long as the columns live
+    payload = memoryview(data)[cls.HEADER_SIZE:]
+    if zlib.crc32(payload) != checksum:
+      return None
+    columns: List[Column] = []
+    offset = 0
+    try:
+      for _, typecode in cls.COLUMNS:
+        length, = struct.unpack_from('=q', payload, offset)
+        offset += 8
+        end = offset + length * array(typecode).itemsize
+        if length < 0 or end > len(payload):
+          return None
+        columns.append(payload[offset:end].cast(typecode))
+        offset = end + (-end % 8)
+    except struct.error:
+      return None
+    if offset != len(payload):
+      return None
+    return cls(columns)
+
+
+_BLOCK_MASK = (1 << SdeImage.BLOCK_BITS) - 1
+
+
+class SystemTable:
+  """
+  Read-only solar system columns of an `SdeImage`
+
+  Rows are system indices in image order. `row` maps a system ID to its
+  row through the image's block index, everything else is indexing.
+  """
+
+  __slots__ = (
+    'ids',
+    'regions',
+    'security',
+    'classes',
+    'flags',
+    'class_names',
+    '_names',
+    '_name_offsets',
+    '_blocks',
+    '_rows',
+    '_name_list',
+  )
+
+  def __init__(self, image: SdeImage):
+    self.ids = image.system_ids
+    self.regions = image.system_regions
+    self.security = image.system_security
+    self.classes = image.system_classes
+    self.flags = image.system_flags
+    self.class_names = unpack_strings(image.class_names)
+    self._names = image.system_names
+    self._name_offsets = image.system_name_offsets
+    # Block number -> position of its block in `_rows`
+    self._blocks = {block: i for i, block in enumerate(image.system_blocks)}
+    self._rows = image.system_rows
+    self._name_list: Optional[List[str]] = None
+
+  def __len__(self) -> int:
+    return len(self.ids)
+
+  def __contains__(self, system_id: int) -> bool:
+    return self.row(system_id) >= 0
+
+  def row(self, system_id: int) -> int:
+    """
+    :return: Row of `system_id`, -1 if unknown
+    """
+    block = self._blocks.get(system_id >> SdeImage.BLOCK_BITS)
+    if block is None:
+      return -1
+    return self._rows[(block << SdeImage.BLOCK_BITS) | (system_id & _BLOCK_MASK)]
+
+  def name(self, row: int) -> str:
+    if self._name_list is not None:
+      return self._name_list[row]
+    start = self._name_offsets[row]
+    end = self._name_offsets[row + 1] - 1
+    return bytes(self._names[start:end]).decode('utf-8')
+
+  def names(self) -> Sequence[str]:
+    """
+    All names in row order, decoded once.
+    """
+    if self._name_list is None:
+      self._name_list = unpack_strings(self._names)
+    return self._name_list
+
+  def class_name(self, row: int) -> str:
+    return self.class_names[self.classes[row]]
+
+  def is_triglavian(self, row: int) -> bool:
+    return self.flags[row] & SdeImage.FLAG_TRIGLAVIAN != 0
@@ -1,10 +1,31 @@
-import heapq
+import os
+from collections import OrderedDict
 from enum import Enum
-from typing import Dict, List, Tuple, TYPE_CHECKING
+from typing import Dict, Hashable, List, Optional, Set, Tuple, TYPE_CHECKING
 
-from shortcircuit.model.logger import Logger
+from appdirs import AppDirs
 from typing_extensions import Self
 
+from shortcircuit import __appslug__, __version__
+from .avoidance import AvoidanceSet
+from .contraction import ContractionHierarchy
+from .csgraph_backend import CsgraphMatrix, RoutingBackend, resolve_backend
+from .csr_graph import (
+  INFINITY,
+  KIND_GATE,
+  KIND_WORMHOLE,
+  CompiledRestrictions,
+  CsrGraph,
+  Edge,
+  EdgeFilter,
+  RoutingGraph,
+  SearchStats,
+  astar,
+  bidirectional_dijkstra,
+  dijkstra,
+  k_shortest_paths,
+  shortest_path_tree,
+)
 from .evedb import (
   EveDb,
   Restrictions,
@@ -13,6 +34,11 @@ from .evedb import (
   WormholeMassspan,
   WormholeTimespan,
 )
+from .landmarks import LandmarkIndex
+from .logger import Logger
+from .path_tree import ShortestPathTree
+from .region_overlay import RegionPartition, RegionRouter
+from .route_cache import RouteCache
 
 if TYPE_CHECKING:
   from shortcircuit.model.connection_db import ConnectionData
@@ -22,30 +48,47 @@ class ConnectionType(int, Enum):
   WORMHOLE = 2
 
 
+class SearchMode(str, Enum):
+  DIJKSTRA = "dijkstra"
+  ASTAR = "astar"
+  BIDIRECTIONAL = "bidirectional"
+  HIERARCHICAL = "hierarchical"
+  CONTRACTION = "contraction"
+
+
 class SolarSystem:
   """
-  Solar system handler
+  Solar system view over the routing graph
   """
 
-  def __init__(self, key: int):
+  def __init__(self, key: int, solar_map: 'SolarMap'):
     self.id = key
-    self.connected_to: Dict[SolarSystem, Tuple[ConnectionType, List]] = {}
+    self.solar_map = solar_map
 
-  def add_neighbor(self, neighbor: Self, weight: Tuple[ConnectionType, List]):
-    """
-    Adds or updates a connection to a neighbor.
-    Conflict resolution is now handled entirely by ConnectionDB.
-    """
-    self.connected_to[neighbor] = weight
+  def __eq__(self, other):
+    return isinstance(other, SolarSystem) and self.id == other.id
 
-  def get_connections(self):
-    return self.connected_to.keys()
+  def __hash__(self):
+    return hash(self.id)
+
+  def get_connections(self) -> List['SolarSystem']:
+    graph = self.solar_map.graph
+    idx = graph.index_of(self.id)
+    if idx is None:
+      return []
+    return [
+      SolarSystem(graph.system_id(x), self.solar_map)
+      for x in graph.neighbors(idx)
+    ]
 
   def get_id(self) -> int:
     return self.id
 
   def get_weight(self, neighbor: Self) -> Tuple[ConnectionType, List]:
-    return self.connected_to[neighbor]
+    weight = self.solar_map.get_weight(self.id, neighbor.get_id())
+    if weight is None:
+      raise KeyError(neighbor.get_id())
+    return weight
 
 
 class SolarMap:
@@ -53,133 +96,473 @@ class SolarMap:
   Solar map handler
   """
 
+  # (eve_db, gate layer) compiled once per process, see `_gate_layer`
+  _shared_gates: Optional[Tuple[EveDb, CsrGraph]] = None
+  # Restriction sets kept compiled, see `compile_restrictions`
+  COMPILED_CACHE_SIZE = 8
+  # (gate layer, landmarks) built on the first A* query, see `_landmarks`
+  _shared_landmarks: Optional[Tuple[CsrGraph, LandmarkIndex]] = None
+  # (gate layer, regions) built on the first hierarchical query, see `_regions`
+  _shared_regions: Optional[Tuple[CsrGraph, RegionPartition]] = None
+  # Contraction hierarchies by profile key, see `_load_contraction`
+  _shared_contractions: 'OrderedDict[str, ContractionHierarchy]' = OrderedDict()
+  # Where contraction hierarchies are persisted, None for the user cache dir
+  contraction_dir: Optional[str] = None
+
   def __init__(self, eve_db: EveDb):
     self.eve_db: EveDb = eve_db
     from shortcircuit.model.connection_db import ConnectionDB
     self.connection_db = ConnectionDB()
+    # Forces a full overlay rebuild on the next query
     self._graph_dirty = True
-    self.systems_list: Dict[int, SolarSystem] = {}
-    self.total_systems: int = 0
-
-    self._init_gates()
-
-  def _init_gates(self):
-    from shortcircuit.model.connection_db import ConnectionData
-    if not self.eve_db:
-      return
-    for row in self.eve_db.gates:
-      self.add_connection(
-        ConnectionData(
-          source_id="eve_db",
-          source_system=row[0],
-          dest_system=row[1],
-          con_type=ConnectionType.GATE
-        )
+    self.graph = RoutingGraph(self._gate_layer(eve_db))
+    self.search_mode = SearchMode.DIJKSTRA
+    self.last_stats = SearchStats()
+    # Bumped whenever the routable connection set actually changes
+    self.graph_version = 0
+    self.route_cache = RouteCache()
+    self._compiled: 'OrderedDict[Hashable, CompiledRestrictions]' = OrderedDict()
+    # Engine for one-to-all and many-to-many queries
+    self.backend = RoutingBackend.AUTO
+    self._matrices: 'OrderedDict[Hashable, CsgraphMatrix]' = OrderedDict()
+    self._region_routers: 'OrderedDict[Hashable, RegionRouter]' = OrderedDict()
+    # gate costs -> (base layer it was picked for, hierarchy)
+    self._contractions: 'OrderedDict[Tuple[float, ...], Tuple[CsrGraph, ContractionHierarchy]]' = (
+      OrderedDict()
+    )
+
+  @classmethod
+  def _gate_layer(cls, eve_db: EveDb) -> CsrGraph:
+    """
+    Stargate network as a frozen CSR graph, shared by all SolarMap instances.
+
+    Gate systems come first in `EveDb.gates` order, followed by every other
+    known system, so wormhole endpoints never need extra indices.
+    """
+    if not eve_db:
+      return CsrGraph()
+
+    shared = cls._shared_gates
+    if shared is not None and shared[0] is eve_db:
+      return shared[1]
+
+    ids: Dict[int, int] = {}
+    adjacency: Dict[int, Dict[int, Edge]] = {}
+    gate = (KIND_GATE, 0, 0, 0, 0.0, None)
+    for source, destination in eve_db.gates:
+      for system_id in (source, destination):
+        if system_id not in ids:
+          ids[system_id] = len(ids)
+          adjacency[ids[system_id]] = {}
+      adjacency[ids[source]][ids[destination]] = gate
+      adjacency[ids[destination]][ids[source]] = gate
+    for system_id in eve_db.systems.ids:
+      if system_id not in ids:
+        ids[system_id] = len(ids)
+
+    types = [
+      eve_db.system_type(x) if x in eve_db.systems else SpaceType.NS
+      for x in ids
+    ]
+    layer = CsrGraph.from_adjacency(ids.keys(), types, adjacency)
+    cls._shared_gates = (eve_db, layer)
+    return layer
+
+  @classmethod
+  def _landmarks(cls, base: CsrGraph) -> LandmarkIndex:
+    shared = cls._shared_landmarks
+    if shared is not None and shared[0] is base:
+      return shared[1]
+    landmarks = LandmarkIndex.build(base)
+    cls._shared_landmarks = (base, landmarks)
+    return landmarks
+
+  @classmethod
+  def _regions(cls, base: CsrGraph, eve_db: EveDb) -> RegionPartition:
+    shared = cls._shared_regions
+    if shared is not None and shared[0] is base:
+      return shared[1]
+    # Systems missing from the SDE descriptions get a region of their own
+    regions = RegionPartition.build(
+      base,
+      (
+        eve_db.system_region(x) or -x
+        for x in base.ids
+      ),
+    )
+    cls._shared_regions = (base, regions)
+    return regions
+
+  @classmethod
+  def _load_contraction(cls, base: CsrGraph, type_costs: List[float]) -> ContractionHierarchy:
+    """
+    Contraction hierarchy of a gate cost profile from memory, from disk,
+    or built and persisted. Only the `COMPILED_CACHE_SIZE` most recently
+    used files are kept.
+    """
+    key = ContractionHierarchy.profile_key(base, type_costs)
+    shared = cls._shared_contractions
+    hierarchy = shared.get(key)
+    if hierarchy is None:
+      directory = cls.contraction_dir or os.path.join(
+        AppDirs(__appslug__, "mogglemoss", version=__version__).user_cache_dir,
+        'contraction',
       )
+      filename = os.path.join(directory, key + '.ch')
+      hierarchy = ContractionHierarchy.load(filename, key)
+      try:
+        if hierarchy is None:
+          Logger.info('Building contraction hierarchy {}'.format(key))
+          hierarchy = ContractionHierarchy.build(base, type_costs)
+          os.makedirs(directory, exist_ok=True)
+          hierarchy.save(filename)
+        else:
+          os.utime(filename)
+        cls._prune_contractions(directory)
+      except OSError as e:
+        Logger.error('Could not save contraction hierarchy: {}'.format(e))
+      shared[key] = hierarchy
+    shared.move_to_end(key)
+    while len(shared) > cls.COMPILED_CACHE_SIZE:
+      shared.popitem(last=False)
+    return hierarchy
+
+  @classmethod
+  def _prune_contractions(cls, directory: str):
+    paths = [
+      os.path.join(directory, x) for x in os.listdir(directory) if x.endswith('.ch')
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[cls.COMPILED_CACHE_SIZE:]:
+      os.remove(path)
+
+  def _space_type(self, system_id: int) -> SpaceType:
+    if not self.eve_db or system_id not in self.eve_db.systems:
+      return SpaceType.NS
+    return self.eve_db.system_type(system_id)
+
+  @staticmethod
+  def _edges_for(conn: 'ConnectionData') -> Tuple[Edge, Edge]:
+    """
+    Forward and backward overlay edges for a resolved connection.
+    """
+    if conn.con_type == ConnectionType.GATE:
+      edge = (KIND_GATE, 0, 0, 0, 0.0, None)
+      return edge, edge
 
-  def _build_graph(self):
-    if not self._graph_dirty:
-      return
-
-    self.systems_list = {}
-    self.total_systems = 0
-
-    # Get deduplicated, resolved view
-    for conn in self.connection_db.get_resolved_connections():
-      source = conn.source_system
-      destination = conn.dest_system
-      
-      if source not in self.systems_list:
-        self.add_system(source)
-      if destination not in self.systems_list:
-        self.add_system(destination)
-
-      if conn.con_type == ConnectionType.GATE:
-        self.systems_list[source].add_neighbor(
-          self.systems_list[destination], (ConnectionType.GATE, None)
-        )
-        self.systems_list[destination].add_neighbor(
-          self.systems_list[source], (ConnectionType.GATE, None)
-        )
-      elif conn.con_type == ConnectionType.WORMHOLE:
-        info_fwd = [conn.sig_source, conn.code_source, conn.wh_size, conn.wh_life, conn.wh_mass, conn.time_elapsed]
-        info_bwd = [conn.sig_dest, conn.code_dest, conn.wh_size, conn.wh_life, conn.wh_mass, conn.time_elapsed]
+    info_fwd = [conn.sig_source, conn.code_source, conn.wh_size, conn.wh_life, conn.wh_mass, conn.time_elapsed]
+    info_bwd = [conn.sig_dest, conn.code_dest, conn.wh_size, conn.wh_life, conn.wh_mass, conn.time_elapsed]
 
-        if conn.source_name:
-          info_fwd.append(conn.source_name)
-          info_bwd.append(conn.source_name)
+    if conn.source_name:
+      info_fwd.append(conn.source_name)
+      info_bwd.append(conn.source_name)
 
-        self.systems_list[source].add_neighbor(
-          self.systems_list[destination],
-          (ConnectionType.WORMHOLE, info_fwd)
-        )
-        self.systems_list[destination].add_neighbor(
-          self.systems_list[source],
-          (ConnectionType.WORMHOLE, info_bwd)
+    attrs = (conn.wh_size, conn.wh_life, conn.wh_mass, conn.time_elapsed)
+    return (KIND_WORMHOLE, *attrs, info_fwd), (KIND_WORMHOLE, *attrs, info_bwd)
+
+  def _patch_pair(self, first: int, second: int) -> bool:
+    """
+    Re-resolve the connection between two systems and update the overlay.
+
+    :return: True if the overlay edges changed
+    """
+    first, second = min(first, second), max(first, second)
+    winner = self.connection_db.resolve(first, second)
+
+    graph = self.graph
+    u = graph.index_of(first)
+    v = graph.index_of(second)
+
+    if winner is None:
+      if u is None or v is None or graph.overlay.get(u, {}).get(v) is None:
+        return False
+      graph.remove_edge(u, v)
+      graph.remove_edge(v, u)
+      return True
+
+    u = graph.add_node(first, self._space_type(first))
+    v = graph.add_node(second, self._space_type(second))
+
+    # Gates always win over chain connections
+    if graph.has_base_edge(u, v):
+      return False
+
+    forward, backward_edge = self._edges_for(winner)
+    if graph.get_edge(u, v) == forward and graph.get_edge(v, u) == backward_edge:
+      return False
+
+    graph.set_edge(u, v, forward)
+    graph.set_edge(v, u, backward_edge)
+    return True
+
+  def _build_graph(self):
+    """
+    Brings the overlay up to date with `connection_db`.
+
+    A full rebuild only happens when `_graph_dirty` is set; otherwise just
+    the pairs recorded by `ConnectionDB.pop_changes()` are patched. Bumps
+    `graph_version` and invalidates `route_cache` if any edge changed.
+    """
+    changes = self.connection_db.pop_changes()
+    rebuilt = self._graph_dirty
+    if rebuilt:
+      self.graph.clear_overlay()
+      changes = [(x.source_system, x.dest_system) for x in self.connection_db.resolved()]
+      self._graph_dirty = False
+
+    touched: List[Tuple[int, int]] = []
+    widened = rebuilt
+    for first, second in changes:
+      before = self._pair_edges(first, second)
+      if self._patch_pair(first, second):
+        touched.append((first, second))
+        after = self._pair_edges(first, second)
+        widened = widened or not all(
+          self._narrows(old, new) for old, new in zip(before, after)
         )
 
-    self._graph_dirty = False
+    if touched or rebuilt:
+      self.graph_version += 1
+      self.route_cache.advance(self.graph_version, touched, widened)
 
-  def add_system(self, key: int):
-    if key not in self.systems_list:
-      self.total_systems += 1
-      new_system = SolarSystem(key)
-      self.systems_list[key] = new_system
-    return self.systems_list[key]
+  def _pair_edges(
+    self,
+    first: int,
+    second: int,
+  ) -> Tuple[Optional[Edge], Optional[Edge]]:
+    graph = self.graph
+    u = graph.index_of(first)
+    v = graph.index_of(second)
+    if u is None or v is None:
+      return None, None
+    return graph.overlay.get(u, {}).get(v), graph.overlay.get(v, {}).get(u)
+
+  @staticmethod
+  def _narrows(old: Optional[Edge], new: Optional[Edge]) -> bool:
+    """
+    True if `new` passes no restriction filter that `old` did not pass,
+    i.e. the change can not open up a shorter route.
+    """
+    if new is None:
+      return True
+    if old is None or new[0] != old[0] or new[1] != old[1]:
+      return False
+    if new[2] != old[2] and new[2] != WormholeTimespan.CRITICAL:
+      return False
+    if new[3] != old[3] and new[3] != WormholeMassspan.CRITICAL:
+      return False
+    return new[4] >= old[4]
+
+  def _has_connections(self, system_id: int) -> bool:
+    idx = self.graph.index_of(system_id)
+    return idx is not None and self.graph.degree(idx) > 0
+
+  @property
+  def total_systems(self) -> int:
+    return len(self.get_all_systems())
 
   def get_system(self, key: int):
     self._build_graph()
-    return self.systems_list.get(key, None)
+    if not self._has_connections(key):
+      return None
+    return SolarSystem(key, self)
 
   def get_all_systems(self):
     self._build_graph()
-    return self.systems_list.keys()
+    graph = self.graph
+    return [
+      graph.system_id(x) for x in range(len(graph)) if graph.degree(x) > 0
+    ]
+
+  def get_weight(
+    self,
+    source: int,
+    destination: int,
+  ) -> Optional[Tuple[ConnectionType, Optional[List]]]:
+    self._build_graph()
+    graph = self.graph
+    u = graph.index_of(source)
+    v = graph.index_of(destination)
+    if u is None or v is None:
+      return None
+    edge = graph.get_edge(u, v)
+    if edge is None:
+      return None
+    return (ConnectionType(edge[0]), edge[5])
 
   def add_connection(self, conn: 'ConnectionData'):
     self.connection_db.add_connection(conn)
-    self._graph_dirty = True
 
   def __contains__(self, system_id: int):
     self._build_graph()
-    return system_id in self.systems_list
+    return self._has_connections(system_id)
 
   def __iter__(self):
-    self._build_graph()
-    return iter(self.systems_list.values())
+    return iter([SolarSystem(x, self) for x in self.get_all_systems()])
 
-  def _check_neighbor(
-    self,
-    current_sys: SolarSystem,
-    neighbor: SolarSystem,
-    restrictions: Restrictions,
-  ) -> Tuple[bool, float]:
-    con_type, con_info = current_sys.get_weight(neighbor)
-
-    if con_type == ConnectionType.GATE:
-      system_type = self.eve_db.system_type(neighbor.get_id())
-      return True, restrictions["security_prio"][system_type]
-
-    if con_type != ConnectionType.WORMHOLE:
-      return False, 0
+  @staticmethod
+  def _edge_filter(restrictions: Restrictions) -> EdgeFilter:
+    """
+    Wormhole size, life, mass and age restrictions for the CSR search.
+    """
+    return EdgeFilter(
+      blocked_sizes={
+        size
+        for size, blocked in restrictions.get("size_restriction", {}).items()
+        if blocked
+      },
+      ignore_eol=restrictions.get("ignore_eol", False),
+      ignore_masscrit=restrictions.get("ignore_masscrit", False),
+      age_threshold=restrictions.get("age_threshold", float('inf')),
+      critical_life=WormholeTimespan.CRITICAL,
+      critical_mass=WormholeMassspan.CRITICAL,
+    )
 
-    wh_size = con_info[2]
-    wh_life = con_info[3]
-    wh_mass = con_info[4]
-    time_elapsed = con_info[5]
+  @staticmethod
+  def _type_costs(restrictions: Restrictions) -> List[float]:
+    security_prio = restrictions["security_prio"]
+    costs = [0.0] * (max(SpaceType) + 1)
+    for space_type in SpaceType:
+      costs[space_type] = security_prio.get(space_type, 1)
+    return costs
 
-    if restrictions["size_restriction"].get(wh_size, False):
-      return False, 0
+  def _avoided(self, restrictions: Restrictions) -> Set[int]:
+    """
+    Indices that may start or end a route but not be passed through.
+    """
+    avoidance_list = list(restrictions["avoidance_list"])
 
-    if restrictions["ignore_eol"] and wh_life == WormholeTimespan.CRITICAL:
-      return False, 0
+    # Capsuleers will only be able to leave Zarzakh via the gate through which
+    # they arrived until the 6-hour timer runs out.
+    # See: https://www.eveonline.com/news/view/zarzakh-is-under-siege
+    # However, players can always exit Zarzakh via the Deathless Shipcaster,
+    # Clone Jumping, or being pod killed, regardless of the lock.
+    # See: https://wiki.eveuniversity.org/Zarzakh
+    avoidance_list.append(self.eve_db.ZARZAKH_SYSTEM_ID)
 
-    if restrictions["ignore_masscrit"] and wh_mass == WormholeMassspan.CRITICAL:
-      return False, 0
+    graph = self.graph
+    return {
+      graph.index_of(x) for x in avoidance_list
+      if graph.index_of(x) is not None
+    }
 
-    if time_elapsed > restrictions["age_threshold"]:
-      return False, 0
+  def _avoid_mask(self, restrictions: Restrictions) -> bytearray:
+    """
+    `_avoided` as a byte per index of the current graph. An `AvoidanceSet`
+    supplies its mask ready-made.
+    """
+    avoidance = restrictions["avoidance_list"]
+    if not isinstance(avoidance, AvoidanceSet):
+      mask = bytearray(len(self.graph))
+      for x in self._avoided(restrictions):
+        mask[x] = 1
+      return mask
+
+    mask = avoidance.mask(self.graph)
+    zarzakh = self.graph.index_of(self.eve_db.ZARZAKH_SYSTEM_ID)
+    if zarzakh is not None:
+      mask[zarzakh] = 1
+    return mask
+
+  def compile_restrictions(self, restrictions: Restrictions) -> CompiledRestrictions:
+    """
+    Restrictions lowered to edge cost arrays for the current graph, cached
+    per fingerprint. Base layer arrays survive graph version bumps.
+    """
+    fingerprint = RouteCache.fingerprint(restrictions)
+    cache = self._compiled
+    compiled = cache.get(fingerprint)
+    if compiled is not None and compiled.version == self.graph_version:
+      cache.move_to_end(fingerprint)
+      return compiled
+
+    compiled = CompiledRestrictions.compile(
+      self.graph,
+      self._type_costs(restrictions),
+      restrictions["security_prio"].get(SpaceType.WH, 1),
+      self._edge_filter(restrictions),
+      self._avoid_mask(restrictions),
+      self.graph_version,
+      reuse=compiled,
+    )
+    cache[fingerprint] = compiled
+    cache.move_to_end(fingerprint)
+    while len(cache) > self.COMPILED_CACHE_SIZE:
+      cache.popitem(last=False)
+    return compiled
 
-    return True, restrictions["security_prio"][SpaceType.WH]
+  def _csgraph_matrix(self, restrictions: Restrictions) -> CsgraphMatrix:
+    """
+    `compile_restrictions` exported to SciPy, cached the same way.
+    """
+    weights = self.compile_restrictions(restrictions)
+    fingerprint = RouteCache.fingerprint(restrictions)
+    cache = self._matrices
+    matrix = cache.get(fingerprint)
+    if matrix is None or matrix.version != weights.version or matrix.size != len(self.graph):
+      matrix = CsgraphMatrix(self.graph, weights)
+      cache[fingerprint] = matrix
+    cache.move_to_end(fingerprint)
+    while len(cache) > self.COMPILED_CACHE_SIZE:
+      cache.popitem(last=False)
+    return matrix
+
+  def _region_router(self, restrictions: Restrictions) -> RegionRouter:
+    """
+    Hierarchical router for `compile_restrictions`, cached the same way.
+    Its region trees outlive graph version bumps.
+    """
+    weights = self.compile_restrictions(restrictions)
+    fingerprint = RouteCache.fingerprint(restrictions)
+    cache = self._region_routers
+    router = cache.get(fingerprint)
+    if router is None or not router.matches(weights):
+      router = RegionRouter(self._regions(self.graph.base, self.eve_db), weights)
+      cache[fingerprint] = router
+    cache.move_to_end(fingerprint)
+    while len(cache) > self.COMPILED_CACHE_SIZE:
+      cache.popitem(last=False)
+    return router
+
+  def _contraction(self, restrictions: Restrictions) -> ContractionHierarchy:
+    """
+    Contraction hierarchy for the gate costs of `restrictions`. Avoided
+    systems and the chain are applied per query.
+    """
+    type_costs = self._type_costs(restrictions)
+    key = tuple(type_costs)
+    base = self.graph.base
+    cache = self._contractions
+    entry = cache.get(key)
+    if entry is None or entry[0] is not base:
+      entry = (base, self._load_contraction(base, type_costs))
+      cache[key] = entry
+    cache.move_to_end(key)
+    while len(cache) > self.COMPILED_CACHE_SIZE:
+      cache.popitem(last=False)
+    return entry[1]
+
+  def _heuristic(
+    self,
+    destination: int,
+    type_costs: List[float],
+    wormhole_cost: float,
+  ):
+    """
+    Landmark lower bound for A*, None if A* would not be admissible here.
+    """
+    min_cost = min(
+      type_costs[SpaceType.HS],
+      type_costs[SpaceType.LS],
+      type_costs[SpaceType.NS],
+      wormhole_cost,
+    )
+    # Zero or negative weights make jump counts useless as lower bounds
+    if not 0 < min_cost < float('inf'):
+      return None
+    return self._landmarks(self.graph.base).heuristic(
+      destination, self.graph.overlay.keys(), min_cost
+    )
 
   # TODO properly type this
   def shortest_path(
@@ -187,86 +570,201 @@ class SolarMap:
     source: int,
     destination: int,
     restrictions: Restrictions,
+    mode: Optional[SearchMode] = None,
   ):
     self._build_graph()
+    self.last_stats = SearchStats()
+    mode = mode or self.search_mode
+    fingerprint = RouteCache.fingerprint(restrictions)
+    path = self.route_cache.get(source, destination, mode, fingerprint)
+    if path is None:
+      path = self._search(source, destination, restrictions, mode)
+      self.route_cache.put(source, destination, mode, fingerprint, path)
+    return path
+
+  def _search(
+    self,
+    source: int,
+    destination: int,
+    restrictions: Restrictions,
+    mode: SearchMode,
+  ) -> List[int]:
+    graph = self.graph
     # We don't have those systems in our SolarMap which means it is wormhole we have no connections to.
-    if source not in self.systems_list or destination not in self.systems_list:
+    if not self._has_connections(source) or not self._has_connections(destination):
       return []
 
     # Nice.
     if source == destination:
       return [source]
 
-    # Allow source or destination to be from avoidance list.
-    avoidance_list = restrictions["avoidance_list"]
-    try:
-      avoidance_list.remove(source)
-    except ValueError:
-      pass
-    try:
-      avoidance_list.remove(destination)
-    except ValueError:
-      pass
+    source_idx = graph.index_of(source)
+    destination_idx = graph.index_of(destination)
+    weights = self.compile_restrictions(restrictions)
 
-    # Capsuleers will only be able to leave Zarzakh via the gate through which
-    # they arrived until the 6-hour timer runs out.
-    # See: https://www.eveonline.com/news/view/zarzakh-is-under-siege
-    # However, players can always exit Zarzakh via the Deathless Shipcaster,
-    # Clone Jumping, or being pod killed, regardless of the lock.
-    # See: https://wiki.eveuniversity.org/Zarzakh
-    if self.eve_db.ZARZAKH_SYSTEM_ID not in [source, destination]:
-      avoidance_list = avoidance_list + [self.eve_db.ZARZAKH_SYSTEM_ID]
-
-    path = []
-
-    priority_queue: List[Tuple[int, int, SolarSystem]] = []
-    visited = {self.get_system(x) for x in avoidance_list if self.get_system(x)}
-    distance: Dict[SolarSystem, int] = {}
-    parent = {}
-
-    # starting point
-    root = self.get_system(source)
-    distance[root] = 0
-    heapq.heappush(priority_queue, (distance[root], id(root), root))
-
-    while len(priority_queue) > 0:
-      (_, _, current_sys) = heapq.heappop(priority_queue)
-      visited.add(current_sys)
-
-      # Found!
-      if current_sys.get_id() == destination:
-        path.append(destination)
-        while True:
-          parent_id = parent[current_sys].get_id()
-          path.append(parent_id)
-
-          if parent_id != source:
-            current_sys = parent[current_sys]
-          else:
-            path.reverse()
-            return path
-
-      # Keep searching
-      for neighbor in [x for x in current_sys.get_connections()
-                       if x not in visited]:
-        proceed, risk = self._check_neighbor(
-          current_sys, neighbor, restrictions
-        )
+    heuristic = None
+    if mode == SearchMode.ASTAR:
+      heuristic = self._heuristic(
+        destination_idx,
+        self._type_costs(restrictions),
+        weights.wormhole_cost,
+      )
 
-        if not proceed:
-          continue
+    if mode == SearchMode.CONTRACTION:
+      path = self._contraction(restrictions).route(
+        graph,
+        source_idx,
+        destination_idx,
+        weights,
+        self.last_stats,
+      )
+    elif mode == SearchMode.HIERARCHICAL:
+      path = self._region_router(restrictions).route(
+        graph,
+        source_idx,
+        destination_idx,
+        weights,
+        self.last_stats,
+      )
+    elif mode == SearchMode.BIDIRECTIONAL:
+      path = bidirectional_dijkstra(
+        graph,
+        source_idx,
+        destination_idx,
+        weights,
+        stats=self.last_stats,
+      )
+    elif heuristic is None:
+      path = dijkstra(
+        graph,
+        source_idx,
+        destination_idx,
+        weights,
+        stats=self.last_stats,
+      )
+    else:
+      path = astar(
+        graph,
+        source_idx,
+        destination_idx,
+        weights,
+        (),
+        heuristic,
+        self.last_stats,
+      )
+    return [graph.system_id(x) for x in path]
+
+  def k_shortest_paths(
+    self,
+    source: int,
+    destination: int,
+    restrictions: Restrictions,
+    k: int,
+  ) -> List[List[int]]:
+    """
+    Up to `k` loopless routes in order of cost, the first one being a
+    shortest path. Restrictions apply to every route. Results are kept in
+    `route_cache` like those of `shortest_path`.
+    """
+    self._build_graph()
+    self.last_stats = SearchStats()
+    mode = ('k_shortest', k)
+    fingerprint = RouteCache.fingerprint(restrictions)
+    paths = self.route_cache.get_paths(source, destination, mode, fingerprint)
+    if paths is None:
+      paths = self._k_shortest(source, destination, restrictions, k)
+      self.route_cache.put_paths(source, destination, mode, fingerprint, paths)
+    return paths
+
+  def _k_shortest(
+    self,
+    source: int,
+    destination: int,
+    restrictions: Restrictions,
+    k: int,
+  ) -> List[List[int]]:
+    if not self._has_connections(source) or not self._has_connections(destination):
+      return []
 
-        if neighbor not in distance:
-          distance[neighbor] = float('inf')
+    if source == destination:
+      return [[source]]
+
+    graph = self.graph
+    paths = k_shortest_paths(
+      graph,
+      graph.index_of(source),
+      graph.index_of(destination),
+      k,
+      self.compile_restrictions(restrictions),
+      self.last_stats,
+    )
+    return [[graph.system_id(x) for x in path] for path in paths]
 
-        if distance[neighbor] > distance[current_sys] + risk:
-          distance[neighbor] = distance[current_sys] + risk
-          heapq.heappush(
-            priority_queue, (distance[neighbor], id(neighbor), neighbor)
-          )
-          parent[neighbor] = current_sys
+  def shortest_path_tree(
+    self,
+    source: int,
+    restrictions: Restrictions,
+  ) -> ShortestPathTree:
+    """
+    Cheapest routes from `source` to every system in one Dijkstra pass, for
+    "nearest X" and "within N jumps" lookups. Avoided systems and Zarzakh
+    may end a route but are never passed through, as in `shortest_path`.
+    """
+    self._build_graph()
+    self.last_stats = SearchStats()
+    graph = self.graph
+    source_idx = graph.index_of(source)
+    if source_idx is None:
+      # Wormhole we have no connections to, only the source is reachable
+      source_idx = graph.add_node(source, self._space_type(source))
+
+    if resolve_backend(self.backend) == RoutingBackend.SCIPY:
+      distance, parent = self._csgraph_matrix(restrictions).tree(source_idx)
+    else:
+      distance, parent = shortest_path_tree(
+        graph,
+        source_idx,
+        self.compile_restrictions(restrictions),
+        stats=self.last_stats,
+      )
+    return ShortestPathTree(graph, source_idx, distance, parent)
 
-    return path
+  def distance_matrix(
+    self,
+    sources: List[int],
+    destinations: List[int],
+    restrictions: Restrictions,
+  ) -> List[List[float]]:
+    """
+    Route cost from every source to every destination, INFINITY where
+    there is no route. Systems we have no connections to only reach
+    themselves.
+    """
+    self._build_graph()
+    graph = self.graph
+    source_idx = [graph.index_of(x) for x in sources]
+    destination_idx = [graph.index_of(x) for x in destinations]
+    known = [idx for idx in source_idx if idx is not None]
+
+    # Full rows for every known source, indexed by graph index
+    if not known:
+      rows = []
+    elif resolve_backend(self.backend) == RoutingBackend.SCIPY:
+      rows = self._csgraph_matrix(restrictions).distances(known)
+    else:
+      weights = self.compile_restrictions(restrictions)
+      rows = [shortest_path_tree(graph, idx, weights)[0] for idx in known]
+    row_of = dict(zip(known, rows))
+
+    ret = []
+    for source, s_idx in zip(sources, source_idx):
+      row = row_of.get(s_idx)
+      ret.append([
+        row[d_idx] if row is not None and d_idx is not None
+        else (0.0 if source == destination else INFINITY)
+        for destination, d_idx in zip(destinations, destination_idx)
+      ])
+    return ret
 
 
 def main():
@@ -1,9 +1,13 @@
+import asyncio
 import json
-from datetime import datetime
-from typing import List, Dict, Type
+from datetime import datetime, timedelta
+from typing import Callable, List, Dict, Tuple, Type
 
 from PySide6 import QtCore
+from shortcircuit.model.http_cache import ResponseCache
+from shortcircuit.model.http_pool import ClientPool
 from shortcircuit.model.mapsource import MapSource, SourceType
+from shortcircuit.model.refresh_scheduler import RefreshScheduler
 from shortcircuit.model.solarmap import SolarMap
 from shortcircuit.model.utility.configuration import Configuration
 from shortcircuit.model.logger import Logger
@@ -17,6 +21,8 @@ class SingletonQObject(type(QtCore.QObject), Singleton):
 
 class SourceManager(QtCore.QObject, metaclass=SingletonQObject):
     sources_changed = QtCore.Signal()
+    # Source name and connection count, -1 on failure, after a scheduled refresh
+    source_refreshed = QtCore.Signal(str, int)
 
     def __init__(self):
         if hasattr(self, "_initialized"):
@@ -25,6 +31,13 @@ class SourceManager(QtCore.QObject, metaclass=SingletonQObject):
         self._initialized = True
         self.sources = []
         self._registry = {}
+        # HTTP clients kept alive across refreshes, see `shutdown`
+        self.clients = ClientPool(responses=ResponseCache())
+        # Auto refresh, see `start_auto_refresh`
+        self.scheduler = RefreshScheduler()
+        self._scheduled = None
+        # Maps source_id -> [running fetch, number waiting on it]
+        self._inflight: Dict[str, list] = {}
 
     def register_source_class(self, source_type: SourceType, source_class: Type[MapSource]):
         self._registry[source_type] = source_class
@@ -43,53 +56,149 @@ class SourceManager(QtCore.QObject, metaclass=SingletonQObject):
     def get_enabled_sources(self) -> List[MapSource]:
         return [s for s in self.sources if s.enabled]
 
+    # Seconds a single source may take to answer, and a whole refresh
+    SOURCE_TIMEOUT = 20.0
+    FETCH_TIMEOUT = 30.0
+
     def fetch_all(self, solar_map: SolarMap) -> Dict[str, int]:
-        results = {}
-        for source in self.get_enabled_sources():
-            try:
-                # Clear existing data from this source before fetching new
-                solar_map.connection_db.clear_source(source.id)
-                count = source.fetch_data(solar_map)
-                results[source.name] = count
-                if count >= 0:
-                    source.last_updated = datetime.now()
-                    source.status_ok = True
-                else:
-                    source.status_ok = False
-            except Exception as e:
-                Logger.error(f"Error fetching data from source {source.name}: {e}")
-                results[source.name] = -1
-                source.status_ok = False
+        results = self.clients.run(self.fetch_all_async(solar_map))
 
-        # Mark graph as dirty so it gets rebuilt on next query
-        solar_map._graph_dirty = True
+        # ConnectionDB tracks the touched keys, SolarMap patches them on next query
         self.sources_changed.emit()
         return results
 
+    async def fetch_all_async(self, solar_map: SolarMap) -> Dict[str, int]:
+        """
+        Fetch all enabled sources side by side, so a refresh takes as long
+        as the slowest source. Sources still running when FETCH_TIMEOUT is
+        up are cancelled and count as failed.
+        """
+        sources = self.get_enabled_sources()
+        tasks = [asyncio.ensure_future(self._fetch_source(s, solar_map)) for s in sources]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.FETCH_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            # Let cancelled fetches swap in what they got before reporting
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = {}
+        for source, task in zip(sources, tasks):
+            if task.cancelled():
+                Logger.error(f"Timed out fetching data from source {source.name}")
+                source.status_ok = False
+                results[source.name] = -1
+            else:
+                results[source.name] = task.result()
+        return results
+
     def fetch_one(self, source_id: str, solar_map: SolarMap) -> Dict[str, int]:
         """Fetch data from a single specific source."""
         results = {}
         source = next((s for s in self.sources if s.id == source_id), None)
         if source and source.enabled:
-            try:
-                # Clear existing data from this source before fetching new
-                solar_map.connection_db.clear_source(source.id)
-                count = source.fetch_data(solar_map)
-                results[source.name] = count
-                if count >= 0:
-                    source.last_updated = datetime.now()
-                    source.status_ok = True
-                else:
-                    source.status_ok = False
-            except Exception as e:
-                Logger.error(f"Error fetching data from source {source.name}: {e}")
-                results[source.name] = -1
-                source.status_ok = False
+            results[source.name] = self.clients.run(self._fetch_source(source, solar_map))
 
-        solar_map._graph_dirty = True
         self.sources_changed.emit()
         return results
 
+    async def _fetch_source(self, source: MapSource, solar_map: SolarMap) -> int:
+        """
+        Fetch one source within SOURCE_TIMEOUT and update its status. Joins
+        the fetch already running for the source, if any.
+
+        :return: Number of connections, -1 on failure
+        """
+        fetch = self._inflight.get(source.id)
+        if fetch is None or fetch[0].done():
+            fetch = [asyncio.ensure_future(self._fetch_source_now(source, solar_map)), 0]
+            self._inflight[source.id] = fetch
+        task = fetch[0]
+        fetch[1] += 1
+        try:
+            # Leave the fetch running for the others waiting on it
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if fetch[1] == 1:
+                # Nobody else waiting, stop it but let it swap in what it got
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            raise
+        finally:
+            fetch[1] -= 1
+            if not fetch[1] and self._inflight.get(source.id) is fetch:
+                del self._inflight[source.id]
+
+    async def _fetch_source_now(self, source: MapSource, solar_map: SolarMap) -> int:
+        try:
+            # Swap this source's data for the fetched set in one step
+            with solar_map.connection_db.replacing(source.id):
+                count = await asyncio.wait_for(
+                    source.fetch(solar_map, self.clients), self.SOURCE_TIMEOUT
+                )
+        except asyncio.TimeoutError:
+            Logger.error(f"Timed out fetching data from source {source.name}")
+            count = -1
+        except Exception as e:
+            Logger.error(f"Error fetching data from source {source.name}: {e}")
+            count = -1
+
+        if count >= 0:
+            source.last_updated = datetime.now()
+            source.status_ok = True
+        else:
+            source.status_ok = False
+        return count
+
+    def start_auto_refresh(self, get_solar_map: Callable[[], SolarMap], interval: float):
+        """
+        Refresh every enabled source on its own schedule, see RefreshScheduler,
+        until `stop_auto_refresh`. Each refresh emits `source_refreshed`.
+
+        :param get_solar_map: Map to refresh into, looked up on every refresh
+        :param interval: Base interval in seconds
+        """
+        self.scheduler.set_interval(interval)
+        self.scheduler.sync(s.id for s in self.get_enabled_sources())
+        if self._scheduled is None or self._scheduled.done():
+            self._scheduled = self.clients.submit(
+                self.scheduler.run(lambda x: self._refresh_scheduled(x, get_solar_map))
+            )
+
+    def stop_auto_refresh(self):
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+
+    async def _refresh_scheduled(
+        self, source_id: str, get_solar_map: Callable[[], SolarMap]
+    ) -> Tuple[bool, bool]:
+        """
+        :return: Whether the refresh succeeded and whether it changed any of
+          the source's connections
+        """
+        source = next((s for s in self.sources if s.id == source_id), None)
+        if source is None or not source.enabled:
+            return True, False
+        solar_map = get_solar_map()
+        before = solar_map.connection_db.change_count(source_id)
+        count = await self._fetch_source(source, solar_map)
+        self.source_refreshed.emit(source.name, count)
+        return count >= 0, solar_map.connection_db.change_count(source_id) != before
+
+    def next_refresh_times(self) -> Dict[str, datetime]:
+        """Time of the next scheduled refresh per source ID."""
+        now = self.scheduler.clock()
+        return {
+            source_id: datetime.now() + timedelta(seconds=max(0.0, t - now))
+            for source_id, t in self.scheduler.next_runs().items()
+        }
+
+    def shutdown(self):
+        """Stop auto refresh and close the pooled HTTP clients."""
+        self.stop_auto_refresh()
+        self.clients.close()
+
     def load_configuration(self):
         self.sources = []
         settings = Configuration.settings
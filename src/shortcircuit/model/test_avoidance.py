@@ -0,0 +1,38 @@
+import pickle
+
+from shortcircuit.model.avoidance import AvoidanceSet
+from shortcircuit.model.evedb import EveDb
+from shortcircuit.model.route_cache import RouteCache
+from shortcircuit.model.solarmap import SolarMap
+
+
+def test_resolve_expands_regions():
+  eve_db = EveDb()
+  avoidance = AvoidanceSet.resolve(eve_db, ["Tama", "The Citadel", "Nowhere"])
+  citadel = eve_db.get_region_system_ids(eve_db.region_name_to_id("The Citadel"))
+
+  assert avoidance.entries == ("Tama", "The Citadel", "Nowhere")
+  assert eve_db.name2id("Tama") in avoidance
+  assert set(avoidance) == set(citadel) | {eve_db.name2id("Tama")}
+
+
+def test_mask_matches_list(make_restrictions):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  avoidance = AvoidanceSet.resolve(eve_db, ["Tama", "The Citadel"])
+  as_list = make_restrictions(list(avoidance))
+  as_set = make_restrictions(avoidance)
+
+  assert RouteCache.fingerprint(as_list) == RouteCache.fingerprint(as_set)
+  assert map._avoid_mask(as_set) == map._avoid_mask(as_list)
+  jita = eve_db.name2id("Jita")
+  dodixie = eve_db.name2id("Dodixie")
+  assert map.shortest_path(jita, dodixie, as_set) == map.shortest_path(jita, dodixie, as_list)
+
+  # The base layer part is computed once and not pickled
+  mask = avoidance.mask(map.graph)
+  assert avoidance.mask(map.graph) == mask
+  assert avoidance.mask(map.graph) is not mask
+  copy = pickle.loads(pickle.dumps(avoidance))
+  assert copy == avoidance
+  assert copy._base_mask is None
@@ -0,0 +1,66 @@
+from shortcircuit.model import batch_router
+from shortcircuit.model.batch_router import BatchRouter
+from shortcircuit.model.evedb import EveDb
+
+
+def _requests(eve_db, make_restrictions):
+  names = [
+    ("Dodixie", "Ikuchi", make_restrictions()),
+    ("Dodixie", "Jita", make_restrictions()),
+    ("Jita", "Amarr", make_restrictions([eve_db.name2id("Niarja")])),
+    ("Dodixie", "Ikuchi", make_restrictions(WH=20)),
+    ("Amarr", "Amarr", make_restrictions()),
+    ("Rens", "Hek", make_restrictions()),
+    ("Dodixie", "Rens", make_restrictions()),
+    ("Jita", "Tama", make_restrictions([eve_db.name2id("Tama")])),
+  ]
+  return [(eve_db.name2id(a), eve_db.name2id(b), r) for a, b, r in names]
+
+
+def test_batch_matches_shortest_path(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  requests = _requests(eve_db, make_restrictions)
+  expected = [map.shortest_path(*request) for request in requests]
+
+  paths = list(BatchRouter(map, workers=1).route(requests))
+  assert [len(x) for x in paths] == [len(x) for x in expected]
+  for path, request in zip(paths, requests):
+    assert path[0] == request[0] and path[-1] == request[1]
+  assert len(paths[3]) == 12
+
+
+def test_batch_process_pool(monkeypatch, make_restrictions, wormhole_map):
+  monkeypatch.setattr(BatchRouter, "MIN_POOL_GROUPS", 1)
+  eve_db = EveDb()
+  map = wormhole_map
+  requests = _requests(eve_db, make_restrictions)
+  local = list(BatchRouter(map, workers=1).route(requests))
+  try:
+    assert list(BatchRouter(map, workers=2).route(requests)) == local
+    pool = batch_router._pool
+    # Workers are spawned, never forked from the threaded app
+    assert pool._mp_context.get_start_method() == "spawn"
+    overlay = batch_router._last_overlay[1]
+
+    # Same graph version: same pool, same overlay snapshot
+    assert list(BatchRouter(map, workers=2).route(requests)) == local
+    assert batch_router._pool is pool
+    assert batch_router._last_overlay[1] is overlay
+
+    # A new version only re-sends the overlay
+    map.connection_db.clear_source("test")
+    local = list(BatchRouter(map, workers=1).route(requests))
+    assert list(BatchRouter(map, workers=2).route(requests)) == local
+    assert batch_router._pool is pool
+    assert batch_router._last_overlay[1][0] != overlay[0]
+    assert len(local[0]) == 12
+  finally:
+    batch_router.shutdown_pool()
+
+
+def test_small_batches_stay_local(monkeypatch, make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  monkeypatch.setattr(BatchRouter, "_run_pool", None)
+  assert len(list(BatchRouter(map, workers=4).route(_requests(eve_db, make_restrictions)))) == 8
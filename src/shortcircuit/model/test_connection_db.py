@@ -154,3 +154,153 @@ def test_clear_source():
     resolved = db.get_resolved_connections()
     assert len(resolved) == 1
     assert resolved[0].source_id == "source2"
+
+
+def test_changes_are_recorded():
+    db = ConnectionDB()
+
+    db.add_connection(ConnectionData(
+        source_id="source1",
+        source_system=1,
+        dest_system=2,
+        con_type=ConnectionType.WORMHOLE,
+    ))
+    db.add_connection(ConnectionData(
+        source_id="source2",
+        source_system=3,
+        dest_system=4,
+        con_type=ConnectionType.WORMHOLE,
+    ))
+
+    assert db.pop_changes() == {(1, 2), (3, 4)}
+    assert db.pop_changes() == set()
+
+    db.clear_source("source2")
+    assert db.pop_changes() == {(3, 4)}
+
+    db.remove_connection(1, 2, "unknown")
+    assert db.pop_changes() == set()
+
+
+def _wormhole(source_id, source_system, dest_system, time_elapsed=0.0):
+    return ConnectionData(
+        source_id=source_id,
+        source_system=source_system,
+        dest_system=dest_system,
+        con_type=ConnectionType.WORMHOLE,
+        time_elapsed=time_elapsed,
+    )
+
+
+def test_replace_source():
+    db = ConnectionDB()
+    db.add_connection(_wormhole("source1", 1, 2))
+    db.add_connection(_wormhole("source1", 3, 4))
+    db.add_connection(_wormhole("source2", 3, 4, time_elapsed=1.0))
+    db.pop_changes()
+
+    db.replace_source("source1", [_wormhole("source1", 3, 4), _wormhole("source1", 5, 6)])
+
+    assert sorted(db.keys()) == [(3, 4), (5, 6)]
+    assert db.resolve(3, 4).source_id == "source1"
+    assert db.pop_changes() == {(1, 2), (3, 4), (5, 6)}
+    assert db._by_source == {"source1": {(3, 4), (5, 6)}, "source2": {(3, 4)}}
+
+    db.clear_source("source1")
+    assert db.keys() == [(3, 4)]
+    assert db._by_source == {"source2": {(3, 4)}}
+
+    db.remove_connection(3, 4, "source2")
+    assert db.keys() == []
+    assert db._by_source == {}
+
+
+def test_replacing_swaps_on_exit():
+    db = ConnectionDB()
+    db.add_connection(_wormhole("source1", 1, 2))
+    db.pop_changes()
+
+    with db.replacing("source1"):
+        db.add_connection(_wormhole("source1", 3, 4))
+        db.add_connection(_wormhole("source2", 5, 6))
+        # Other sources are not staged, the old data of source1 stays visible
+        assert sorted(db.keys()) == [(1, 2), (5, 6)]
+    assert sorted(db.keys()) == [(3, 4), (5, 6)]
+
+    # A failing fetch still swaps in what it got, as clearing first did
+    try:
+        with db.replacing("source1"):
+            raise ValueError()
+    except ValueError:
+        pass
+    assert db.keys() == [(5, 6)]
+
+
+def test_both_directions_share_a_key():
+    db = ConnectionDB()
+    forward = _wormhole("source1", 1, 2, time_elapsed=2.0)
+    forward.sig_source, forward.sig_dest = "AAA", "BBB"
+    backward = _wormhole("source2", 2, 1, time_elapsed=1.0)
+    backward.sig_source, backward.sig_dest = "BBB", "AAA"
+    db.add_connection(forward)
+    db.add_connection(backward)
+
+    assert db.keys() == [(1, 2)]
+    assert db.pop_changes() == {(1, 2)}
+    resolved = db.get_resolved_connections()
+    assert len(resolved) == 1
+    assert resolved[0].source_id == "source2"
+    assert (resolved[0].source_system, resolved[0].sig_source) == (1, "AAA")
+
+    # Resolved connections are oriented as asked for
+    conn = db.resolve(2, 1)
+    assert (conn.source_system, conn.dest_system) == (2, 1)
+    assert (conn.sig_source, conn.sig_dest) == ("BBB", "AAA")
+    assert db.resolve(1, 2).sig_source == "AAA"
+
+    db.remove_connection(1, 2, "source2")
+    assert db.resolve(2, 1).source_id == "source1"
+    assert db._by_source == {"source1": {(1, 2)}}
+
+
+def test_winners_are_kept_up_to_date():
+    db = ConnectionDB()
+    changes = []
+    db.subscribe(lambda key, winner: changes.append((key, winner and winner.source_id)))
+
+    db.add_connection(_wormhole("source1", 1, 2, time_elapsed=2.0))
+    db.add_connection(_wormhole("source2", 2, 1, time_elapsed=1.0))
+    # Losing and stale connections do not change the winner
+    db.add_connection(_wormhole("source3", 1, 2, time_elapsed=3.0))
+    db.add_connection(_wormhole("source1", 3, 4, time_elapsed=50.0))
+    assert changes == [((1, 2), "source1"), ((1, 2), "source2")]
+    assert db.pop_changes() == {(1, 2)}
+
+    resolved = list(db.resolved())
+    assert [x.source_id for x in resolved] == ["source2"]
+    assert list(db.resolved()) == resolved
+    assert db.get_resolved_connections(max_age_hours=100.0)[1].source_id == "source1"
+
+    del changes[:]
+    db.clear_source("source2")
+    db.remove_connection(2, 1, "source1")
+    db.remove_connection(1, 2, "source3")
+    assert changes == [((1, 2), "source1"), ((1, 2), "source3"), ((1, 2), None)]
+    assert list(db.resolved()) == []
+
+
+def test_change_count_ignores_age():
+    db = ConnectionDB()
+    db.replace_source("source1", [_wormhole("source1", 1, 2), _wormhole("source1", 3, 4)])
+    assert db.change_count("source1") == 2
+
+    # Same connections, only older
+    db.replace_source("source1", [
+        _wormhole("source1", 1, 2, time_elapsed=1.0),
+        _wormhole("source1", 3, 4, time_elapsed=1.0),
+    ])
+    assert db.change_count("source1") == 2
+
+    db.replace_source("source1", [_wormhole("source1", 1, 2), _wormhole("source1", 5, 6)])
+    assert db.change_count("source1") == 4
+    assert db.change_count("source2") == 0
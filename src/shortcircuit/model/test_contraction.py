@@ -0,0 +1,112 @@
+import os
+import random
+
+from shortcircuit.model.contraction import ContractionHierarchy
+from shortcircuit.model.csr_graph import dijkstra, path_cost
+from shortcircuit.model.evedb import EveDb
+from shortcircuit.model.solarmap import SearchMode, SolarMap
+
+SECURITY_PRIO = {"LS": 5, "NS": 10, "WH": 2}
+
+
+def test_contraction_matches_dijkstra(
+  make_restrictions,
+  make_wormhole,
+  check_route,
+  contraction_dir,
+):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  restrictions = make_restrictions([eve_db.name2id("Tama")], **SECURITY_PRIO)
+  pairs = (
+    ("Dodixie", "Ikuchi"),
+    ("Ikuchi", "Dodixie"),
+    ("Amarr", "Dodixie"),
+    ("Jita", "Perimeter"),
+    ("Tama", "Rens"),
+    ("Hek", "1DQ1-A"),
+  )
+
+  before = {}
+  for src, dst in pairs:
+    before[src, dst] = check_route(
+      map, eve_db.name2id(src), eve_db.name2id(dst), restrictions, SearchMode.CONTRACTION
+    )
+  hierarchy = map._contraction(restrictions)
+  assert len(os.listdir(str(contraction_dir))) == 1
+
+  # Chain connections are added per query, the hierarchy is kept
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  map.add_connection(make_wormhole(eve_db, "Amarr", "Rens"))
+  for src, dst in pairs:
+    after = check_route(
+      map, eve_db.name2id(src), eve_db.name2id(dst), restrictions, SearchMode.CONTRACTION
+    )
+    assert len(after) <= len(before[src, dst])
+  assert map._contraction(restrictions) is hierarchy
+
+  # So is any avoidance list, it is applied per query
+  for avoided in (["Niarja"], ["Niarja", "Urlen", "Tama"], []):
+    restrictions = make_restrictions([eve_db.name2id(x) for x in avoided], **SECURITY_PRIO)
+    for src, dst in pairs:
+      check_route(
+        map, eve_db.name2id(src), eve_db.name2id(dst), restrictions, SearchMode.CONTRACTION
+      )
+    assert map._contraction(restrictions) is hierarchy
+  assert len(os.listdir(str(contraction_dir))) == 1
+  assert len(hierarchy._metrics) <= ContractionHierarchy.METRIC_CACHE_SIZE
+
+
+def test_avoided_gate_routes(make_restrictions):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  base = map.graph.base
+  hierarchy = ContractionHierarchy.build(base, map._type_costs(make_restrictions(**SECURITY_PRIO)))
+  rng = random.Random(7)
+  systems = [x for x in range(len(base)) if base.degree(x)]
+  for _ in range(10):
+    avoided = rng.sample(systems, 40)
+    restrictions = make_restrictions([base.ids[x] for x in avoided], **SECURITY_PRIO)
+    weights = map.compile_restrictions(restrictions)
+    source, destination = rng.sample(systems, 2)
+    cost, path = hierarchy.gate_route(source, destination, weights.avoid)
+    expected = dijkstra(map.graph, source, destination, weights)
+    if not expected:
+      assert path == []
+      continue
+    assert cost == path_cost(map.graph, expected, weights)
+    assert path_cost(map.graph, path, weights) == cost
+    assert not any(weights.avoid[x] for x in path[1:-1])
+
+
+def test_save_and_load(tmp_path, make_restrictions):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  base = map.graph.base
+  type_costs = map._type_costs(make_restrictions(**SECURITY_PRIO))
+  hierarchy = ContractionHierarchy.build(base, type_costs)
+  key = ContractionHierarchy.profile_key(base, type_costs)
+  assert hierarchy.key == key
+
+  filename = str(tmp_path / "profile.ch")
+  hierarchy.save(filename)
+  loaded = ContractionHierarchy.load(filename, key)
+  assert loaded is not None
+  assert list(loaded.rank) == list(hierarchy.rank)
+  assert list(loaded.profile.up_costs) == list(hierarchy.profile.up_costs)
+
+  dodixie = base.index_of(eve_db.name2id("Dodixie"))
+  jita = base.index_of(eve_db.name2id("Jita"))
+  tree = map.shortest_path_tree(eve_db.name2id("Dodixie"), make_restrictions(**SECURITY_PRIO))
+  cost, path = loaded.gate_route(dodixie, jita)
+  assert [path[0], path[-1]] == [dodixie, jita]
+  assert cost == tree.cost(eve_db.name2id("Jita"))
+  weights = map.compile_restrictions(make_restrictions(**SECURITY_PRIO))
+  assert path_cost(map.graph, path, weights) == cost
+
+  # Another profile, a damaged or a missing file are rebuilt
+  assert ContractionHierarchy.load(filename, "0" * len(key)) is None
+  with open(filename, "r+b") as f:
+    f.truncate(64)
+  assert ContractionHierarchy.load(filename, key) is None
+  assert ContractionHierarchy.load(str(tmp_path / "missing.ch"), key) is None
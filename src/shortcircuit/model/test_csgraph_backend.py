@@ -0,0 +1,73 @@
+import pytest
+
+from shortcircuit.model.csgraph_backend import RoutingBackend
+from shortcircuit.model.csr_graph import INFINITY
+from shortcircuit.model.evedb import EveDb
+from shortcircuit.model.solarmap import SolarMap
+
+pytest.importorskip("scipy")
+
+
+def _trees(map, source, restrictions):
+  map.backend = RoutingBackend.PYTHON
+  python_tree = map.shortest_path_tree(source, restrictions)
+  map.backend = RoutingBackend.SCIPY
+  scipy_tree = map.shortest_path_tree(source, restrictions)
+  return python_tree, scipy_tree
+
+
+def test_tree_matches_python_backend(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  dodixie = eve_db.name2id("Dodixie")
+  python_tree, scipy_tree = _trees(map, dodixie, make_restrictions(NS=3))
+
+  assert list(scipy_tree.distance) == pytest.approx(list(python_tree.distance))
+  ikuchi = eve_db.name2id("Ikuchi")
+  assert scipy_tree.path(ikuchi)[0] == dodixie
+  assert scipy_tree.path(ikuchi)[-1] == ikuchi
+
+
+def test_avoided_systems_end_routes(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  dodixie = eve_db.name2id("Dodixie")
+  botane = eve_db.name2id("Botane")
+  restrictions = make_restrictions(avoidance_list=[botane])
+  python_tree, scipy_tree = _trees(map, dodixie, restrictions)
+
+  assert list(scipy_tree.distance) == list(python_tree.distance)
+  assert botane in scipy_tree
+  assert scipy_tree.cost(eve_db.name2id("Ikuchi")) > python_tree.cost(botane) + 1
+
+  # An avoided source still routes out of itself
+  python_tree, scipy_tree = _trees(map, botane, restrictions)
+  assert list(scipy_tree.distance) == list(python_tree.distance)
+  assert scipy_tree.jump_count(eve_db.name2id("Ikuchi")) == 1
+
+
+def test_distance_matrix_matches_python_backend(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  names = ("Dodixie", "Ikuchi", "Jita", "Amarr", "Botane")
+  systems = [eve_db.name2id(x) for x in names]
+  restrictions = make_restrictions(avoidance_list=[eve_db.name2id("Botane")])
+
+  map.backend = RoutingBackend.PYTHON
+  expected = map.distance_matrix(systems, systems, restrictions)
+  map.backend = RoutingBackend.SCIPY
+  assert map.distance_matrix(systems, systems, restrictions) == expected
+
+  for i, row in enumerate(expected):
+    assert row[i] == 0
+  assert expected[0][2] == map.shortest_path_tree(systems[0], restrictions).cost(systems[2])
+
+
+def test_distance_matrix_unknown_systems(make_restrictions):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  jita = eve_db.name2id("Jita")
+  unknown = 31000001
+
+  matrix = map.distance_matrix([jita, unknown], [unknown, jita], make_restrictions())
+  assert matrix == [[INFINITY, 0.0], [0.0, INFINITY]]
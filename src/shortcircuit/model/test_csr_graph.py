@@ -0,0 +1,188 @@
+from shortcircuit.model.connection_db import ConnectionData
+from shortcircuit.model.csr_graph import (
+  KIND_GATE,
+  KIND_WORMHOLE,
+  CompiledRestrictions,
+  CsrGraph,
+  EdgeFilter,
+  RoutingGraph,
+  bidirectional_dijkstra,
+  dijkstra,
+  k_shortest_paths,
+  shortest_path_tree,
+)
+from shortcircuit.model.evedb import (
+  EveDb,
+  SpaceType,
+  WormholeMassspan,
+  WormholeSize,
+  WormholeTimespan,
+)
+from shortcircuit.model.solarmap import ConnectionType, SolarMap
+
+GATE = (KIND_GATE, 0, 0, 0, 0.0, None)
+
+
+def _wormhole(size=WormholeSize.LARGE, life=WormholeTimespan.STABLE):
+  return (KIND_WORMHOLE, size, life, WormholeMassspan.STABLE, 1.0, ['ABC-123'])
+
+
+def _line_graph():
+  # 0 - 1 - 2 - 3 via gates, plus a 0 ~ 3 wormhole in the overlay
+  adjacency = {
+    0: {1: GATE},
+    1: {0: GATE, 2: GATE},
+    2: {1: GATE, 3: GATE},
+    3: {2: GATE},
+  }
+  graph = RoutingGraph(
+    CsrGraph.from_adjacency([10, 11, 12, 13], [SpaceType.HS] * 4, adjacency)
+  )
+  graph.set_edge(0, 3, _wormhole())
+  graph.set_edge(3, 0, _wormhole())
+  return graph
+
+
+def _no_filter():
+  return EdgeFilter(set(), False, False, float('inf'), 2, 3)
+
+
+def _weights(graph, costs, wormhole_cost=1.0, edge_filter=None, avoid=(), reuse=None):
+  return CompiledRestrictions.compile(
+    graph,
+    costs,
+    wormhole_cost,
+    edge_filter or _no_filter(),
+    avoid,
+    reuse=reuse,
+  )
+
+
+def test_csr_layout():
+  graph = _line_graph()
+  base = graph.base
+  assert len(base) == 4
+  assert base.edge_count == 6
+  assert list(base.offsets) == [0, 1, 3, 5, 6]
+  assert base.neighbors(2) == [1, 3]
+  assert base.find_edge(2, 3) == 4
+  assert base.find_edge(0, 3) is None
+  assert graph.neighbors(0) == [1, 3]
+  assert graph.get_edge(0, 3)[5] == ['ABC-123']
+
+
+def test_overlay_extra_nodes():
+  graph = _line_graph()
+  idx = graph.add_node(99, SpaceType.WH)
+  assert idx == 4
+  assert graph.add_node(99, SpaceType.WH) == 4
+  assert graph.system_id(idx) == 99
+  assert graph.space_type(idx) == SpaceType.WH
+  graph.set_edge(idx, 0, _wormhole())
+  assert graph.degree(idx) == 1
+  graph.remove_edge(idx, 0)
+  assert graph.degree(idx) == 0
+
+
+def test_compiled_restrictions():
+  graph = _line_graph()
+  graph.base.types[2] = SpaceType.NS
+  weights = _weights(graph, [1.0, 1.0, 1.0, 10.0, 1.0], 3.0, avoid={1})
+  # 1 -> 2 enters null-sec, its reverse 2 -> 1 enters high-sec
+  e = graph.base.find_edge(1, 2)
+  assert (weights.edge_costs[e], weights.reverse_costs[e]) == (10.0, 1.0)
+  assert weights.overlay == {0: [(3, 3.0)], 3: [(0, 3.0)]}
+  assert list(weights.avoid) == [0, 1, 0, 0]
+  assert list(weights.blocked_mask(graph, 1)) == [0, 0, 0, 0]
+
+  small_only = EdgeFilter({WormholeSize.LARGE}, False, False, float('inf'), 2, 3)
+  again = _weights(graph, [1.0] * 5, edge_filter=small_only, reuse=weights)
+  assert again.edge_costs is weights.edge_costs
+  assert again.overlay == {}
+
+
+def test_dijkstra_takes_wormhole():
+  graph = _line_graph()
+  assert dijkstra(graph, 0, 3, _weights(graph, [1.0] * 5)) == [0, 3]
+
+
+def test_dijkstra_respects_filter_and_blocked():
+  graph = _line_graph()
+  small_only = EdgeFilter({WormholeSize.LARGE}, False, False, float('inf'), 2, 3)
+  weights = _weights(graph, [1.0] * 5, edge_filter=small_only)
+  assert dijkstra(graph, 0, 3, weights) == [0, 1, 2, 3]
+  assert dijkstra(graph, 0, 3, weights, {2}) == []
+  avoiding = _weights(graph, [1.0] * 5, edge_filter=small_only, avoid={2, 3})
+  # Avoided systems may still end a route
+  assert dijkstra(graph, 0, 3, avoiding) == []
+  assert dijkstra(graph, 0, 2, avoiding) == [0, 1, 2]
+
+
+def test_bidirectional_asymmetric_costs():
+  # 0 - 1 - 2 - 3 with a 1 ~ 3 wormhole; entering 2 (null) is expensive
+  graph = _line_graph()
+  graph.remove_edge(0, 3)
+  graph.remove_edge(3, 0)
+  graph.set_edge(1, 3, _wormhole())
+  graph.set_edge(3, 1, _wormhole())
+  graph.base.types[2] = SpaceType.NS
+  costs = [1.0, 1.0, 1.0, 10.0, 1.0]
+  cheap = _weights(graph, costs, 3.0)
+  expensive = _weights(graph, costs, 20.0)
+  assert bidirectional_dijkstra(graph, 0, 3, cheap) == [0, 1, 3]
+  assert bidirectional_dijkstra(graph, 3, 0, cheap) == [3, 1, 0]
+  assert bidirectional_dijkstra(graph, 0, 3, expensive) == [0, 1, 2, 3]
+  assert bidirectional_dijkstra(graph, 0, 3, expensive, {2}) == [0, 1, 3]
+  assert bidirectional_dijkstra(graph, 0, 3, cheap, {1}) == []
+
+
+def test_shortest_path_tree_reverse():
+  graph = _line_graph()
+  graph.base.types[0] = SpaceType.NS
+  weights = _weights(graph, [1.0, 1.0, 1.0, 10.0, 1.0], 5.0)
+  distance, parent = shortest_path_tree(graph, 0, weights)
+  assert distance == [0, 1.0, 2.0, 3.0]
+  distance, parent = shortest_path_tree(graph, 0, weights, reverse=True)
+  # Entering the null-sec system by gate costs more than going round
+  assert distance == [0, 7.0, 6.0, 5.0]
+  assert list(parent) == [-1, 2, 3, 0]
+
+
+def test_k_shortest_paths():
+  graph = _line_graph()
+  weights = _weights(graph, [1.0] * 5)
+  assert k_shortest_paths(graph, 0, 3, 5, weights) == [
+    [0, 3],
+    [0, 1, 2, 3],
+  ]
+  assert k_shortest_paths(graph, 0, 3, 1, weights) == [[0, 3]]
+  assert k_shortest_paths(graph, 0, 3, 5, _weights(graph, [1.0] * 5, avoid={1, 2})) == [[0, 3]]
+
+
+def test_gate_layer_is_shared():
+  eve_db = EveDb()
+  assert SolarMap(eve_db).graph.base is SolarMap(eve_db).graph.base
+  assert len(SolarMap(eve_db).connection_db._connections) == 0
+
+
+def test_solarmap_weight_lookup():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  botane = eve_db.name2id("Botane")
+  ikuchi = eve_db.name2id("Ikuchi")
+  map.add_connection(
+    ConnectionData(
+      source_id="test",
+      source_system=botane,
+      dest_system=ikuchi,
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+    )
+  )
+
+  con_type, info = map.get_weight(botane, ikuchi)
+  assert con_type == ConnectionType.WORMHOLE
+  assert info[0] == "ABC-123"
+  assert map.get_weight(ikuchi, botane)[1][0] == "DEF-456"
+  assert map.get_weight(botane, eve_db.name2id("Dodixie")) == (ConnectionType.GATE, None)
@@ -1,4 +1,10 @@
-from shortcircuit.model.evedb import EveDb
+import os
+import shutil
+from os import path
+
+from shortcircuit.model.evedb import EveDb, SpaceType, get_database_path
+from shortcircuit.model.name_index import NameIndex
+from shortcircuit.model.sde_image import SOURCES, SdeImage
 
 
 def test_dodixie():
@@ -19,3 +25,124 @@ def test_tama():
 def test_sentinel():
   eve_db = EveDb()
   assert eve_db.name2id("J055520 [Sentinel]") == 31000001
+
+
+def _copy_sources(directory):
+  source_dir = path.dirname(get_database_path("mapSolarSystems.csv"))
+  for filename in SOURCES:
+    shutil.copy(path.join(source_dir, filename), str(directory))
+
+
+def _image_db(image):
+  eve_db = EveDb.__new__(EveDb)
+  eve_db._init_image(image)
+  return eve_db
+
+
+def test_image_matches_csv(tmp_path):
+  eve_db = EveDb()
+  _copy_sources(tmp_path)
+  filename = str(tmp_path / SdeImage.FILENAME)
+  eve_db.to_image().save(filename, str(tmp_path))
+
+  loaded = _image_db(SdeImage.load(filename, str(tmp_path)))
+  assert loaded.system_desc == eve_db.system_desc
+  assert loaded.region_systems == eve_db.region_systems
+  assert loaded.gates == eve_db.gates
+  assert loaded.wh_codes == eve_db.wh_codes
+  assert list(loaded.regions) == list(eve_db.regions)
+  for region_id, region in eve_db.regions.items():
+    assert vars(loaded.regions[region_id]) == vars(region)
+  assert loaded.get_class(loaded.name2id("J055520 [Sentinel]")) == "drifter"
+
+
+def test_image_rejected_when_stale_or_damaged(tmp_path):
+  _copy_sources(tmp_path)
+  filename = str(tmp_path / SdeImage.FILENAME)
+  EveDb().to_image().save(filename, str(tmp_path))
+
+  # Timestamps alone do not invalidate the image
+  statics = str(tmp_path / "statics.csv")
+  os.utime(statics, ns=(0, 0))
+  assert SdeImage.load(filename, str(tmp_path)) is not None
+
+  with open(statics, "a", encoding="utf-8") as f:
+    f.write("Z999,1\n")
+  assert SdeImage.load(filename, str(tmp_path)) is None
+
+  # Without sources the image is trusted, unless damaged
+  assert SdeImage.load(filename, str(tmp_path / "missing")) is not None
+  with open(filename, "r+b") as f:
+    f.seek(-1, os.SEEK_END)
+    last = f.read(1)
+    f.seek(-1, os.SEEK_END)
+    f.write(bytes([last[0] ^ 1]))
+  assert SdeImage.load(filename, str(tmp_path / "missing")) is None
+
+
+def test_system_table_lookups(tmp_path):
+  _copy_sources(tmp_path)
+  filename = str(tmp_path / SdeImage.FILENAME)
+  EveDb().to_image().save(filename, str(tmp_path))
+  image = SdeImage.load(filename, str(tmp_path))
+  eve_db = _image_db(image)
+
+  # Columns are read-only views into the mapped image
+  assert isinstance(image.system_ids, memoryview)
+  assert image.system_ids.readonly
+  for system_id, description in EveDb().system_desc.items():
+    assert eve_db.systems.row(system_id) >= 0
+    assert eve_db.id2name(system_id) == description["name"]
+    assert eve_db.system_region(system_id) == description["region_id"]
+    assert eve_db.system_description(system_id) == description
+  assert eve_db.system_type(eve_db.name2id("Jita")) == SpaceType.HS
+  assert eve_db.get_class(eve_db.name2id("Thera")) == "C12"
+  for row, system_id in enumerate(eve_db.systems.ids):
+    expected = EveDb.CLASS_SPACE_TYPES.get(eve_db.systems.class_name(row), SpaceType.NS)
+    assert eve_db.system_type(system_id) == expected
+
+  unknown = 30000000
+  assert unknown not in eve_db.systems
+  assert eve_db.id2name(unknown) is None
+  assert eve_db.system_description(unknown) is None
+  assert eve_db.get_class(unknown) == "Unknown"
+
+
+def test_name_lookups():
+  eve_db = EveDb()
+  assert eve_db.name2id("jita") == 30000142
+  assert eve_db.normalize_name("dodix") == "Dodixie"
+  # Ambiguous prefixes and unknown names resolve to nothing
+  assert eve_db.name2id("J") is None
+  assert eve_db.name2id("Nowhere") is None
+  assert eve_db.normalize_name("") is None
+
+  assert eve_db.region_name_to_id("The Forge") == 10000002
+  assert eve_db.region_name_to_id("the forge") is None
+  assert eve_db.normalize_region_name("forge") == "The Forge"
+  assert eve_db.normalize_region_name("Nowhere") is None
+
+  forge = eve_db.get_region_system_ids(10000002)
+  assert eve_db.name2id("Jita") in forge
+  assert sorted(forge) == sorted(x["id"] for x in eve_db.region_systems[10000002])
+  assert eve_db.get_region_system_ids(0) == []
+
+
+def test_name_suggestions():
+  eve_db = EveDb()
+  assert eve_db.suggest_system_names("Dodxie", 3)[0] == "Dodixie"
+  assert eve_db.suggest_system_names("Jita", 3)[0] == "Jita"
+  assert eve_db.suggest_region_names("The Froge", 1) == ["The Forge"]
+  assert eve_db.suggest_system_names("", 3) == []
+
+
+def test_name_index_matches_scan():
+  index = NameIndex(["Alpha", "alphabet", "Beta", "Gamma", "Omega"])
+  assert index.resolve("ALPHA") == 0
+  assert index.resolve("alphab") == 1
+  assert index.resolve("Be") == 2
+  assert index.resolve("a") == -1
+  assert index.prefixed("al") == [0, 1]
+  assert index.containing("ga") == [3, 4]
+  assert index.containing("lphab") == [1]
+  assert index.containing("xyz") == []
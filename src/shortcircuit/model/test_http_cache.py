@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import Mock
+
+import httpx
+
+from shortcircuit.model.evescout import EveScout
+from shortcircuit.model.http_cache import ResponseCache
+from shortcircuit.model.solarmap import SolarMap
+
+_SIGNATURES = [{
+  "in_system_id": 31000005,
+  "in_signature": "ABC-123",
+  "out_system_id": 30000142,
+  "out_signature": "DEF-456",
+  "wh_exits_outward": True,
+  "wh_type": "Q003",
+  "remaining_hours": 10,
+  "updated_at": "2026-01-01T00:00:00.000Z",
+}]
+
+
+class _Server:
+  def __init__(self):
+    self.body = b'{"data": 1}'
+    self.etag = '"v1"'
+    self.conditional = []
+
+  def __call__(self, request):
+    self.conditional.append(request.headers.get("If-None-Match"))
+    if request.headers.get("If-None-Match") == self.etag:
+      return httpx.Response(304)
+    return httpx.Response(200, content=self.body, headers={"ETag": self.etag})
+
+  def client(self):
+    return httpx.AsyncClient(transport=httpx.MockTransport(self))
+
+
+def test_conditional_requests(tmp_path):
+  server = _Server()
+  cache = ResponseCache(str(tmp_path))
+
+  async def get(cache):
+    async with server.client() as client:
+      return await cache.get(client, "https://example.com/x", headers={"Authorization": "a"})
+
+  response, digest = asyncio.run(get(cache))
+  assert response.json() == {"data": 1}
+  response, same = asyncio.run(get(cache))
+  assert server.conditional == [None, '"v1"']
+  assert (response.status_code, response.json(), same) == (200, {"data": 1}, digest)
+
+  # A restart warms from disk
+  response, same = asyncio.run(get(ResponseCache(str(tmp_path))))
+  assert server.conditional[-1] == '"v1"'
+  assert (response.json(), same) == ({"data": 1}, digest)
+
+  server.body, server.etag = b'{"data": 2}', '"v2"'
+  response, changed = asyncio.run(get(cache))
+  assert response.json() == {"data": 2}
+  assert changed != digest
+
+
+def test_unchanged_response_is_not_parsed(tmp_path):
+  server = _Server()
+  server.body = httpx.Response(200, json=_SIGNATURES).content
+  clients = Mock()
+  clients.get.return_value = server.client()
+  clients.responses = ResponseCache(str(tmp_path))
+  evescout = EveScout()
+
+  first = Mock(spec=SolarMap)
+  assert asyncio.run(evescout.augment_map_async(first, clients)) == 1
+  second = Mock(spec=SolarMap)
+  assert asyncio.run(evescout.augment_map_async(second, clients)) == 1
+  assert server.conditional == [None, '"v1"']
+  # The same connection is added again, so ConnectionDB sees no change
+  assert second.add_connection.call_args.args[0] is first.add_connection.call_args.args[0]
@@ -0,0 +1,71 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shortcircuit.model.http_pool import ClientPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  connections = set()
+
+  def do_GET(self):
+    _Handler.connections.add(self.client_address)
+    body = b"[]"
+    self.send_response(200)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+
+@pytest.fixture
+def server():
+  httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+  thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+  thread.start()
+  _Handler.connections = set()
+  yield f"http://127.0.0.1:{httpd.server_address[1]}"
+  httpd.shutdown()
+  httpd.server_close()
+
+
+def test_keys():
+  assert ClientPool.key("https://tw.example.com/refresh.php") == (
+    "https://tw.example.com:443", None, None
+  )
+  assert ClientPool.key("http://tw.example.com:8080/x", "socks5://proxy:1080", "a") == (
+    "http://tw.example.com:8080", "socks5://proxy:1080", "a"
+  )
+  assert ClientPool.key("http://tw.example.com/x", "") == ("http://tw.example.com:80", None, None)
+
+
+def test_clients_are_reused_across_runs(server):
+  pool = ClientPool()
+
+  async def fetch(path, session=None):
+    client = pool.get(server + path, session=session)
+    response = await client.get(server + path)
+    return client, response.status_code
+
+  first, status = pool.run(fetch("/a"))
+  assert status == 200
+  second, _ = pool.run(fetch("/b"))
+  assert second is first
+  assert len(_Handler.connections) == 1
+
+  other, _ = pool.run(fetch("/a", session="other"))
+  assert other is not first
+  assert len(pool) == 2
+
+  pool.close()
+  assert first.is_closed and other.is_closed
+  assert len(pool) == 0
+
+  # Closing only ends the current loop, the pool can be used again
+  third, status = pool.run(fetch("/a"))
+  assert third is not first and status == 200
+  pool.close()
@@ -0,0 +1,54 @@
+from shortcircuit.model.evedb import EveDb
+
+
+def test_tree_matches_shortest_path(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  dodixie = eve_db.name2id("Dodixie")
+  tree = map.shortest_path_tree(dodixie, make_restrictions())
+
+  for name in ("Ikuchi", "Jita", "Amarr", "Rens"):
+    target = eve_db.name2id(name)
+    path = map.shortest_path(dodixie, target, make_restrictions())
+    assert tree.jump_count(target) == len(path) - 1
+    assert tree.cost(target) == len(path) - 1
+    assert tree.path(target)[0] == dodixie
+    assert tree.path(target)[-1] == target
+
+  assert tree.jump_count(dodixie) == 0
+  assert tree.path(dodixie) == [dodixie]
+
+
+def test_nearest_and_within(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  dodixie = eve_db.name2id("Dodixie")
+  tree = map.shortest_path_tree(dodixie, make_restrictions())
+
+  ikuchi = eve_db.name2id("Ikuchi")
+  assert tree.nearest(lambda x: x == ikuchi) == ikuchi
+  assert tree.nearest(lambda x: False) is None
+  assert tree.nearest(lambda x: True) == dodixie
+
+  nearby = tree.within(3)
+  assert nearby[0] == dodixie
+  assert ikuchi in nearby
+  assert eve_db.name2id("Jita") in nearby
+  assert all(tree.jump_count(x) <= 3 for x in nearby)
+  assert eve_db.name2id("Amarr") not in nearby
+
+
+def test_avoided_systems_are_terminal(make_restrictions, wormhole_map):
+  eve_db = EveDb()
+  map = wormhole_map
+  dodixie = eve_db.name2id("Dodixie")
+  ikuchi = eve_db.name2id("Ikuchi")
+  botane = eve_db.name2id("Botane")
+  tree = map.shortest_path_tree(dodixie, make_restrictions([botane]))
+
+  # Botane itself can still be reached, but not passed through
+  assert tree.jump_count(botane) == 1
+  assert tree.jump_count(ikuchi) == len(
+    map.shortest_path(dodixie, ikuchi, make_restrictions([botane]))
+  ) - 1
+  assert botane not in tree.path(ikuchi)
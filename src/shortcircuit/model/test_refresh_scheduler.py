@@ -0,0 +1,110 @@
+import asyncio
+
+from shortcircuit.model.refresh_scheduler import RefreshScheduler
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+
+def _scheduler(clock, interval=30.0):
+  # No jitter, delays are exact
+  return RefreshScheduler(interval, clock=clock, rng=lambda: 0.5)
+
+
+def test_sources_run_on_their_own_schedule():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+  scheduler.set_interval(60.0, "slow")
+  scheduler.sync(["fast", "slow"])
+  assert scheduler.next_runs() == {"fast": 1030.0, "slow": 1060.0}
+
+  assert scheduler.due() == []
+  clock.now = 1030.0
+  assert scheduler.due() == ["fast"]
+  # Running sources are not handed out twice
+  assert scheduler.due() == []
+  assert "fast" not in scheduler.next_runs()
+
+  scheduler.sync(["slow"])
+  assert list(scheduler.next_runs()) == ["slow"]
+
+
+def test_interval_adapts_to_change_rate():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+  scheduler.sync(["a"])
+
+  scheduler.record("a", ok=True, changed=True)
+  assert scheduler.next_runs()["a"] == clock.now + 15.0
+  scheduler.record("a", ok=True, changed=True)
+  assert scheduler.next_runs()["a"] == clock.now + 15.0
+
+  delays = []
+  for _ in range(6):
+    scheduler.record("a", ok=True, changed=False)
+    delays.append(scheduler.next_runs()["a"] - clock.now)
+  assert delays == sorted(delays)
+  assert delays[-1] == 120.0
+
+
+def test_failures_back_off_and_open_the_circuit():
+  clock = _Clock()
+  scheduler = _scheduler(clock)
+  scheduler.sync(["a"])
+
+  delays = []
+  for _ in range(RefreshScheduler.FAILURE_THRESHOLD - 1):
+    scheduler.record("a", ok=False)
+    delays.append(scheduler.next_runs()["a"] - clock.now)
+  assert delays == [60.0, 120.0, 240.0, 480.0]
+  assert not scheduler.is_open("a")
+
+  scheduler.record("a", ok=False)
+  assert scheduler.is_open("a")
+  assert scheduler.next_runs()["a"] == clock.now + RefreshScheduler.OPEN_SECONDS
+
+  # A successful probe closes it again
+  scheduler.record("a", ok=True, changed=True)
+  assert not scheduler.is_open("a")
+  assert scheduler.next_runs()["a"] == clock.now + 15.0
+
+
+def test_jitter_spreads_delays():
+  clock = _Clock()
+  low = RefreshScheduler(100.0, clock=clock, rng=lambda: 0.0)
+  high = RefreshScheduler(100.0, clock=clock, rng=lambda: 0.999999)
+  low.sync(["a"])
+  high.sync(["a"])
+  assert low.next_runs()["a"] == clock.now + 90.0
+  assert 1109.9 < high.next_runs()["a"] < 1110.0
+
+
+def test_run_refreshes_due_sources_independently():
+  clock = _Clock()
+  scheduler = _scheduler(clock, interval=0.0)
+  scheduler.MIN_INTERVAL = 0.0
+  scheduler.sync(["a", "b"])
+  calls = []
+
+  async def refresh(source_id):
+    calls.append(source_id)
+    if source_id == "b":
+      raise RuntimeError("unreachable")
+    # "a" is still running when "b" fails
+    await asyncio.sleep(0.01)
+    return True, False
+
+  async def main():
+    task = asyncio.ensure_future(scheduler.run(refresh))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+  asyncio.run(main())
+  assert sorted(set(calls)) == ["a", "b"]
+  assert scheduler.next_runs().keys() == {"a", "b"}
@@ -0,0 +1,69 @@
+import pytest
+
+from shortcircuit.model.evedb import EveDb
+from shortcircuit.model.solarmap import SearchMode, SolarMap
+
+SECURITY_PRIO = {"LS": 5, "NS": 10, "WH": 2}
+
+
+def test_partition_borders():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  regions = map._regions(map.graph.base, eve_db)
+  base = map.graph.base
+
+  jita = base.index_of(eve_db.name2id("Jita"))
+  kisogo = base.index_of(eve_db.name2id("Kisogo"))
+  assert regions.region_of[jita] == regions.region_of[kisogo]
+  # Jita has gates into Lonetrek and The Citadel, Kisogo stays in The Forge
+  assert regions.is_border[jita]
+  assert not regions.is_border[kisogo]
+  for r, borders in enumerate(regions.borders):
+    for u in borders:
+      assert regions.region_of[u] == r
+      assert any(regions.region_of[v] != r for v in base.neighbors(u))
+  assert map._regions(base, eve_db) is regions
+
+
+@pytest.mark.parametrize("mode", [SearchMode.HIERARCHICAL, SearchMode.CONTRACTION])
+def test_overlay_modes_match_dijkstra(
+  mode,
+  make_restrictions,
+  make_wormhole,
+  check_route,
+  contraction_dir,
+):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  map.add_connection(make_wormhole(eve_db, "Amarr", "Rens"))
+  restrictions = make_restrictions([eve_db.name2id("Tama")], **SECURITY_PRIO)
+
+  for src, dst in (
+    ("Dodixie", "Ikuchi"),
+    ("Ikuchi", "Dodixie"),
+    ("Amarr", "Dodixie"),
+    ("Jita", "Perimeter"),
+    ("Tama", "Rens"),
+    ("Hek", "1DQ1-A"),
+  ):
+    check_route(map, eve_db.name2id(src), eve_db.name2id(dst), restrictions, mode)
+
+
+def test_chain_changes_reuse_region_trees(make_restrictions, make_wormhole, check_route):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  restrictions = make_restrictions(**SECURITY_PRIO)
+  dodixie = eve_db.name2id("Dodixie")
+  ikuchi = eve_db.name2id("Ikuchi")
+
+  before = check_route(map, dodixie, ikuchi, restrictions, SearchMode.HIERARCHICAL)
+  router = map._region_router(restrictions)
+  trees = len(router._trees)
+  assert trees > 0
+
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  after = check_route(map, dodixie, ikuchi, restrictions, SearchMode.HIERARCHICAL)
+  assert len(after) < len(before)
+  assert map._region_router(restrictions) is router
+  assert len(router._trees) >= trees
@@ -0,0 +1,104 @@
+from shortcircuit.model.evedb import EveDb, WormholeSize
+from shortcircuit.model.route_cache import RouteCache
+from shortcircuit.model.solarmap import SolarMap
+
+SIZE_RESTRICTION = {
+  WormholeSize.SMALL: False,
+  WormholeSize.MEDIUM: True,
+}
+
+
+def test_fingerprint_is_canonical(make_restrictions):
+  first = make_restrictions([3, 1, 2], SIZE_RESTRICTION)
+  second = make_restrictions([2, 3, 1], SIZE_RESTRICTION)
+  second["security_prio"] = dict(reversed(list(second["security_prio"].items())))
+  second["size_restriction"][WormholeSize.LARGE] = False
+  assert RouteCache.fingerprint(first) == RouteCache.fingerprint(second)
+  second["avoidance_list"].append(4)
+  assert RouteCache.fingerprint(first) != RouteCache.fingerprint(second)
+
+
+def test_lru_eviction_and_counters():
+  cache = RouteCache(max_size=2)
+  cache.put(1, 2, "m", "f", [1, 2])
+  cache.put(1, 3, "m", "f", [1, 3])
+  assert cache.get(1, 2, "m", "f") == [1, 2]
+  cache.put(1, 4, "m", "f", [1, 4])
+  assert cache.get(1, 3, "m", "f") is None
+  assert cache.get(1, 4, "m", "f") == [1, 4]
+  assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_advance_is_selective():
+  cache = RouteCache()
+  cache.put(1, 3, "m", "f", [1, 2, 3])
+  cache.put(4, 6, "m", "f", [4, 5, 6])
+  cache.advance(1, [(2, 3)], widened=False)
+  assert cache.get(1, 3, "m", "f") is None
+  assert cache.get(4, 6, "m", "f") == [4, 5, 6]
+  cache.advance(2, [(7, 8)], widened=True)
+  assert len(cache) == 0
+
+
+def test_solarmap_route_cache(make_restrictions, make_wormhole):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  restrictions = make_restrictions(size_restriction=SIZE_RESTRICTION)
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  map.add_connection(make_wormhole(eve_db, "Amarr", "Rens"))
+  dodixie = eve_db.name2id("Dodixie")
+  ikuchi = eve_db.name2id("Ikuchi")
+
+  path = map.shortest_path(dodixie, ikuchi, restrictions)
+  assert len(path) == 3
+  assert map.shortest_path(dodixie, ikuchi, restrictions) == path
+  assert (map.route_cache.hits, map.route_cache.misses) == (1, 1)
+
+  # Same connections again: no version bump
+  version = map.graph_version
+  map.add_connection(make_wormhole(eve_db, "Amarr", "Rens"))
+  map.shortest_path(dodixie, ikuchi, restrictions)
+  assert map.graph_version == version
+  assert map.route_cache.hits == 2
+
+  # Aging a connection off the path keeps the entry
+  map.add_connection(make_wormhole(eve_db, "Amarr", "Rens", time_elapsed=2.0))
+  map.shortest_path(dodixie, ikuchi, restrictions)
+  assert map.graph_version == version + 1
+  assert map.route_cache.hits == 3
+
+  # Removing a connection on the path drops it
+  map.connection_db.clear_source("test")
+  assert len(map.shortest_path(dodixie, ikuchi, restrictions)) == 12
+  assert map.route_cache.misses == 2
+
+
+def test_alternatives_are_cached(make_restrictions, make_wormhole):
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  restrictions = make_restrictions(size_restriction=SIZE_RESTRICTION)
+  map.add_connection(make_wormhole(eve_db, "Botane", "Ikuchi"))
+  dodixie = eve_db.name2id("Dodixie")
+  ikuchi = eve_db.name2id("Ikuchi")
+
+  paths = map.k_shortest_paths(dodixie, ikuchi, restrictions, 3)
+  assert len(paths) == 3
+  assert map.k_shortest_paths(dodixie, ikuchi, restrictions, 3) == paths
+  assert (map.route_cache.hits, map.route_cache.misses) == (1, 1)
+  # Different K, different entry
+  assert map.k_shortest_paths(dodixie, ikuchi, restrictions, 2) == paths[:2]
+  assert map.route_cache.misses == 2
+
+  # Removing a connection any of them uses drops the entry
+  map.connection_db.clear_source("test")
+  assert map.k_shortest_paths(dodixie, ikuchi, restrictions, 3) != paths
+  assert map.route_cache.misses == 3
+
+
+def test_advance_checks_every_alternative():
+  cache = RouteCache()
+  cache.put_paths(1, 3, "k", "f", [[1, 3], [1, 2, 3]])
+  cache.advance(1, [(4, 5)], widened=False)
+  assert cache.get_paths(1, 3, "k", "f") == [[1, 3], [1, 2, 3]]
+  cache.advance(2, [(2, 3)], widened=False)
+  assert cache.get_paths(1, 3, "k", "f") is None
@@ -1,5 +1,7 @@
+from unittest.mock import patch
+
 from shortcircuit.model.evedb import EveDb, SpaceType, WormholeSize, WormholeMassspan, WormholeTimespan
-from shortcircuit.model.solarmap import ConnectionType, SolarMap
+from shortcircuit.model.solarmap import ConnectionType, SearchMode, SolarMap
 from shortcircuit.model.connection_db import ConnectionData
 
 # FIXME(secondfry): why is `shortest_path` unstable?
@@ -594,3 +596,183 @@ def test_zarzakh_as_source():
   named_path = [eve_db.id2name(x) for x in path]
   # Verify the exact path: Zarzakh -> Turnur -> Perimeter
   assert named_path == ["Zarzakh", "Turnur", "Perimeter"]
+
+
+def test_incremental_patch_only_touches_changed_pairs():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  botane = eve_db.name2id("Botane")
+  ikuchi = eve_db.name2id("Ikuchi")
+  restrictions = {
+    "size_restriction": {},
+    "avoidance_list": [],
+    "security_prio": {
+      SpaceType.HS: 1,
+      SpaceType.LS: 1,
+      SpaceType.NS: 1,
+      SpaceType.WH: 1,
+    },
+    "ignore_eol": False,
+    "ignore_masscrit": False,
+    "age_threshold": float('inf'),
+  }
+  map.add_connection(
+    ConnectionData(
+      source_id="test",
+      source_system=botane,
+      dest_system=ikuchi,
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+    )
+  )
+  assert len(map.shortest_path(botane, ikuchi, restrictions)) == 2
+  base = map.graph.base
+
+  with patch.object(map, '_patch_pair', wraps=map._patch_pair) as patch_pair:
+    map.connection_db.clear_source("test")
+    path = map.shortest_path(botane, ikuchi, restrictions)
+
+  patch_pair.assert_called_once_with(min(botane, ikuchi), max(botane, ikuchi))
+  assert map.graph.base is base
+  assert len(path) > 2
+  assert map.get_weight(botane, ikuchi) is None
+
+
+def test_astar_matches_dijkstra():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  map.add_connection(
+    ConnectionData(
+      source_id="test",
+      source_system=eve_db.name2id("Botane"),
+      dest_system=eve_db.name2id("Ikuchi"),
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+    )
+  )
+  restrictions = {
+    "avoidance_list": [],
+    "security_prio": {
+      SpaceType.HS: 1,
+      SpaceType.LS: 1,
+      SpaceType.NS: 1,
+      SpaceType.WH: 1,
+    }
+  }
+
+  for src, dst in (("Dodixie", "Ikuchi"), ("Dodixie", "Amarr"), ("Jita", "Rens")):
+    expected = map.shortest_path(
+      eve_db.name2id(src),
+      eve_db.name2id(dst),
+      restrictions,
+      SearchMode.DIJKSTRA,
+    )
+    dijkstra_settled = map.last_stats.settled
+    path = map.shortest_path(
+      eve_db.name2id(src),
+      eve_db.name2id(dst),
+      restrictions,
+      SearchMode.ASTAR,
+    )
+    assert len(path) == len(expected)
+    assert path[0] == expected[0] and path[-1] == expected[-1]
+    assert map.last_stats.settled < dijkstra_settled
+
+
+def test_bidirectional_matches_dijkstra():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  map.add_connection(
+    ConnectionData(
+      source_id="test",
+      source_system=eve_db.name2id("Botane"),
+      dest_system=eve_db.name2id("Ikuchi"),
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+      wh_size=WormholeSize.SMALL,
+    )
+  )
+  security_prio = {
+    SpaceType.HS: 1,
+    SpaceType.LS: 5,
+    SpaceType.NS: 10,
+    SpaceType.WH: 2,
+  }
+
+  def cost(path):
+    total = 0
+    for u, v in zip(path, path[1:]):
+      con_type, _ = map.get_weight(u, v)
+      if con_type == ConnectionType.WORMHOLE:
+        total += security_prio[SpaceType.WH]
+      else:
+        total += security_prio[eve_db.system_type(v)]
+    return total
+
+  for small in (False, True):
+    restrictions = {
+      "size_restriction": {WormholeSize.SMALL: small},
+      "avoidance_list": [eve_db.name2id("Tama")],
+      "security_prio": security_prio,
+    }
+    for src, dst in (
+      ("Dodixie", "Ikuchi"),
+      ("Ikuchi", "Dodixie"),
+      ("Jita", "Rens"),
+      ("Amarr", "Tama"),
+    ):
+      expected = map.shortest_path(
+        eve_db.name2id(src),
+        eve_db.name2id(dst),
+        restrictions,
+        SearchMode.DIJKSTRA,
+      )
+      dijkstra_settled = map.last_stats.settled
+      path = map.shortest_path(
+        eve_db.name2id(src),
+        eve_db.name2id(dst),
+        restrictions,
+        SearchMode.BIDIRECTIONAL,
+      )
+      assert cost(path) == cost(expected)
+      assert path[0] == expected[0] and path[-1] == expected[-1]
+      assert map.last_stats.settled < dijkstra_settled
+
+
+def test_k_shortest_paths():
+  eve_db = EveDb()
+  map = SolarMap(eve_db)
+  map.add_connection(
+    ConnectionData(
+      source_id="test",
+      source_system=eve_db.name2id("Botane"),
+      dest_system=eve_db.name2id("Ikuchi"),
+      con_type=ConnectionType.WORMHOLE,
+      sig_source="ABC-123",
+      sig_dest="DEF-456",
+    )
+  )
+  restrictions = {
+    "avoidance_list": [],
+    "security_prio": {
+      SpaceType.HS: 1,
+      SpaceType.LS: 1,
+      SpaceType.NS: 1,
+      SpaceType.WH: 1,
+    }
+  }
+  dodixie = eve_db.name2id("Dodixie")
+  ikuchi = eve_db.name2id("Ikuchi")
+
+  paths = map.k_shortest_paths(dodixie, ikuchi, restrictions, 5)
+  assert len(paths) == 5
+  assert paths[0] == map.shortest_path(dodixie, ikuchi, restrictions)
+  assert [eve_db.id2name(x) for x in paths[0]] == ['Dodixie', 'Botane', 'Ikuchi']
+  assert [len(x) for x in paths] == sorted(len(x) for x in paths)
+  assert len({tuple(x) for x in paths}) == 5
+  for path in paths:
+    assert path[0] == dodixie and path[-1] == ikuchi
+    assert len(set(path)) == len(path)
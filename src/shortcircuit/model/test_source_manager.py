@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+from PySide6 import QtCore
+
+from shortcircuit.model.connection_db import ConnectionData
+from shortcircuit.model.mapsource import MapSource, SourceType
+from shortcircuit.model.solarmap import ConnectionType, SolarMap
+from shortcircuit.model.source_manager import SourceManager
+
+
+class _SlowSource(MapSource):
+    def __init__(self, name, delay, systems=(1, 2)):
+        super().__init__(name=name)
+        self.delay = delay
+        self.systems = systems
+
+    @property
+    def type(self):
+        return SourceType.EVESCOUT
+
+    def fetch_data(self, solar_map):
+        return asyncio.run(self.fetch(solar_map))
+
+    async def fetch(self, solar_map, clients=None):
+        solar_map.add_connection(ConnectionData(
+            source_id=self.id,
+            source_system=self.systems[0],
+            dest_system=self.systems[1],
+            con_type=ConnectionType.WORMHOLE,
+        ))
+        await asyncio.sleep(self.delay)
+        return 1
+
+    def connect(self):
+        return True, ""
+
+    def get_status(self):
+        return ""
+
+    def to_json(self):
+        return {}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["name"], 0)
+
+
+@pytest.fixture
+def source_manager():
+    SourceManager._instance = None
+    sm = SourceManager()
+    yield sm
+    sm.shutdown()
+
+
+def test_sources_are_fetched_concurrently(source_manager):
+    solar_map = SolarMap(None)
+    source_manager.sources = [_SlowSource("source{}".format(x), 0.2, (x, x + 1)) for x in range(5)]
+
+    start = time.perf_counter()
+    results = source_manager.fetch_all(solar_map)
+    assert time.perf_counter() - start < 0.6
+    assert results == {"source{}".format(x): 1 for x in range(5)}
+    assert len(solar_map.connection_db.get_resolved_connections()) == 5
+    assert all(s.status_ok and s.last_updated for s in source_manager.sources)
+
+
+def test_deadlines(source_manager, monkeypatch):
+    monkeypatch.setattr(SourceManager, "SOURCE_TIMEOUT", 0.1)
+    solar_map = SolarMap(None)
+    fast = _SlowSource("fast", 0.0, (1, 2))
+    slow = _SlowSource("slow", 1.0, (3, 4))
+    source_manager.sources = [fast, slow]
+
+    assert source_manager.fetch_all(solar_map) == {"fast": 1, "slow": -1}
+    assert fast.status_ok and not slow.status_ok
+
+    monkeypatch.setattr(SourceManager, "SOURCE_TIMEOUT", 10.0)
+    monkeypatch.setattr(SourceManager, "FETCH_TIMEOUT", 0.1)
+    slow.status_ok = True
+    assert source_manager.fetch_all(solar_map) == {"fast": 1, "slow": -1}
+    assert not slow.status_ok
+    # A cancelled fetch still swaps in what it got so far
+    assert sorted(solar_map.connection_db.keys()) == [(1, 2), (3, 4)]
+
+
+def test_scheduled_refresh_reports_changes(source_manager):
+    solar_map = SolarMap(None)
+    source = _SlowSource("source", 0.0)
+    source_manager.sources = [source]
+    refreshed = []
+    # Emitted on the pool's thread, no event loop here to queue it
+    source_manager.source_refreshed.connect(
+        lambda *x: refreshed.append(x), QtCore.Qt.DirectConnection
+    )
+
+    refresh = source_manager._refresh_scheduled
+    assert source_manager.clients.run(refresh(source.id, lambda: solar_map)) == (True, True)
+    assert source_manager.clients.run(refresh(source.id, lambda: solar_map)) == (True, False)
+    source.systems = (2, 3)
+    assert source_manager.clients.run(refresh(source.id, lambda: solar_map)) == (True, True)
+    assert refreshed == [("source", 1)] * 3
+
+
+def test_overlapping_fetches_are_shared(source_manager):
+    solar_map = SolarMap(None)
+    source = _SlowSource("source", 0.1)
+    source_manager.sources = [source]
+
+    async def both():
+        return await asyncio.gather(
+            source_manager._fetch_source(source, solar_map),
+            source_manager._fetch_source(source, solar_map),
+        )
+
+    assert source_manager.clients.run(both()) == [1, 1]
+    assert source_manager._inflight == {}
+    assert solar_map.connection_db.change_count(source.id) == 1
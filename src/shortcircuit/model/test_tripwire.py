@@ -8,8 +8,10 @@ Tests the core functionality of Tripwire integration including:
 - Edge cases and validation
 """
 
+import asyncio
 from datetime import datetime, timezone
 from unittest.mock import Mock, patch, AsyncMock
+import httpx
 import pytest
 
 from shortcircuit.model.tripwire import (
@@ -457,3 +459,83 @@ class TestEmptyChainHandling:
             result = self.tripwire.augment_map(solar_map)
 
         assert result == 0
+
+
+class TestDeltaRefresh:
+    """Test refreshing a chain that is held already"""
+
+    def setup_method(self):
+        self.tripwire = Tripwire("test", "test", "http://test.url")
+        self.requests = []
+        self.responses = []
+
+        def handler(request):
+            self.requests.append(request.url.params.get('mode'))
+            return httpx.Response(200, json=self.responses.pop(0))
+
+        self.clients = Mock()
+        self.clients.get.return_value = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def _refresh(self, *responses):
+        self.requests = []
+        self.responses = list(responses)
+        with patch('shortcircuit.model.tripwire.Configuration'):
+            assert asyncio.run(self.tripwire._get_chain_task("30000142", self.clients))
+        solar_map = Mock(spec=SolarMap)
+        assert self.tripwire._add_chain(solar_map) == solar_map.add_connection.call_count
+        return {x.args[0].sig_source: x.args[0] for x in solar_map.add_connection.call_args_list}
+
+    @staticmethod
+    def _chain(sync, signatures, wormholes):
+        return {
+            'esi': {},
+            'sync': sync,
+            'signatures': signatures,
+            'wormholes': wormholes,
+            'flares': {'flares': [], 'last_modified': ''},
+            'proccessTime': '0.1',
+            'discord_integration': False,
+        }
+
+    def test_delta_refresh(self):
+        modified = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        signatures = {
+            str(x): {'id': str(x), 'systemID': system, 'signatureID': sig, 'modifiedTime': modified}
+            for x, system, sig in (
+                (100, '30000142', 'aaa123'),
+                (200, '30002187', 'bbb234'),
+                (300, '30000144', 'ccc345'),
+                (400, '30002659', 'ddd456'),
+            )
+        }
+        wormholes = {
+            '1': {'id': '1', 'initialID': '100', 'secondaryID': '200', 'type': 'K162',
+                  'parent': 'initial', 'life': 'stable', 'mass': 'stable'},
+            '2': {'id': '2', 'initialID': '300', 'secondaryID': '400', 'type': 'K162',
+                  'parent': 'initial', 'life': 'stable', 'mass': 'stable'},
+        }
+
+        first = self._refresh(self._chain('t1', signatures, wormholes))
+        assert self.requests == ['init']
+        assert sorted(first) == ['AAA-123', 'CCC-345']
+
+        # Unchanged: Tripwire leaves out signatures and wormholes
+        unchanged = self._chain('t2', {}, {})
+        del unchanged['signatures'], unchanged['wormholes']
+        second = self._refresh(unchanged)
+        assert self.requests == ['refresh']
+        assert all(second[x] is first[x] for x in first)
+        assert self.tripwire.chain['sync'] == 't2'
+
+        # Changed: only the changed wormhole gets a new connection
+        changed = {k: dict(v) for k, v in wormholes.items() if k == '1'}
+        changed['1']['life'] = 'critical'
+        third = self._refresh(self._chain('t3', signatures, changed))
+        assert sorted(third) == ['AAA-123']
+        assert third['AAA-123'] is not first['AAA-123']
+        assert third['AAA-123'].wh_life == WormholeTimespan.CRITICAL
+
+        # A rejected delta falls back to the whole chain
+        fourth = self._refresh({'error': 'unknown mode'}, self._chain('t4', signatures, wormholes))
+        assert self.requests == ['refresh', 'init']
+        assert sorted(fourth) == ['AAA-123', 'CCC-345']
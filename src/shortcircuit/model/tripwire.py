@@ -2,17 +2,22 @@
 
 import asyncio
 import json
+from dataclasses import replace
 from datetime import datetime, timezone
-from typing import Dict, List, Literal, Optional, Tuple, TypedDict, Union
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Tuple, TypedDict, Union
 
 import httpx
 from shortcircuit import USER_AGENT
 
 from .evedb import EveDb, WormholeSize, WormholeMassspan, WormholeTimespan
+from .http_pool import ClientPool, pooled_client
 from .logger import Logger
 from .solarmap import ConnectionType, SolarMap
 from .utility.configuration import Configuration
 
+if TYPE_CHECKING:
+  from .connection_db import ConnectionData
+
 
 class TripwireESIToken(TypedDict):
   """
@@ -119,6 +124,16 @@ class TripwireChain(TypedDict):
 
 SignatureKey = Literal['initialID', 'secondaryID']
 
+# Wormhole and its (initial, secondary) signatures a connection was made
+# from, the modification time of its in signature and the connection
+ProcessedWormhole = Tuple[
+  TripwireWormhole,
+  TripwireSignature,
+  TripwireSignature,
+  datetime,
+  'ConnectionData',
+]
+
 
 class Tripwire:
   """
@@ -139,6 +154,8 @@ class Tripwire:
     self.source_id = name
     self.chain: TripwireChain = self._empty_chain()
     self.cookies: Optional[httpx.Cookies] = None
+    # Wormhole ID -> what its connection was last made from, see `_add_chain`
+    self._processed: Dict[str, ProcessedWormhole] = {}
 
   def get_name(self) -> str:
     return self.name
@@ -265,13 +282,26 @@ class Tripwire:
     except Exception as e:
       return False, 'Error: {}'.format(e)
 
-  async def _fetch_api_refresh_async(self, client: httpx.AsyncClient, system_id="30000142") -> Optional[RawTripwireChain]:
+  async def _fetch_api_refresh_async(
+    self, client: httpx.AsyncClient, system_id="30000142", delta: bool = False
+  ) -> Optional[RawTripwireChain]:
+    """
+    :param delta: Ask for the chain only if it changed since `self.chain`
+      was fetched. Tripwire tells by the signature count and the newest
+      signature modification time; unchanged responses carry neither
+      signatures nor wormholes.
+    """
     Logger.debug('Getting {}...'.format(system_id))
     refresh_url = '{}/refresh.php'.format(self.url)
     payload = {
       'mode': 'init',
       'systemID': system_id,
     }
+    if delta:
+      signatures = self.chain['signatures'].values()
+      payload['mode'] = 'refresh'
+      payload['signatureCount'] = len(signatures)
+      payload['signatureTime'] = max((x['modifiedTime'] for x in signatures), default='')
     headers = {
       'Referer': refresh_url,
       'User-Agent': USER_AGENT,
@@ -318,22 +348,53 @@ class Tripwire:
       'discord_integration': raw_chain['discord_integration'],
     }
 
-  async def _get_chain_task(self, system_id: str) -> bool:
+  def _apply_delta(self, raw_chain: RawTripwireChain) -> Optional[TripwireChain]:
+    """
+    Bring a copy of `self.chain` up to date with a delta refresh response.
+
+    :return: None if the response is not a refresh of this chain
+    """
+    if not isinstance(raw_chain, dict) or not raw_chain.get('sync'):
+      return None
+
+    chain: TripwireChain = dict(self.chain)
+    for key in ('esi', 'sync', 'flares', 'proccessTime', 'discord_integration'):
+      if key in raw_chain:
+        chain[key] = raw_chain[key]
+    if 'signatures' in raw_chain:
+      # Changed chains come whole, `_add_chain` only redoes what differs
+      normalized = self._normalize_chain({**chain, **raw_chain})
+      chain['signatures'] = normalized['signatures']
+      chain['wormholes'] = normalized['wormholes']
+    return chain
+
+  async def _get_chain_task(self, system_id: str, clients: Optional[ClientPool] = None) -> bool:
     proxy_setting = Configuration.settings.value('proxy')
-    client_kwargs = {'verify': True}
-    if proxy_setting:
-      client_kwargs['proxy'] = str(proxy_setting)
+    proxy = str(proxy_setting) if proxy_setting else None
 
-    async with httpx.AsyncClient(**client_kwargs) as client:
+    # Pooled clients are per source, the session cookies belong to one account
+    async with pooled_client(clients, self.url, proxy, session=self.source_id) as client:
       # Restore cookies if we have them
       if self.cookies:
         Logger.debug("Restoring Tripwire cookies")
         client.cookies = self.cookies
       else:
         Logger.debug("No Tripwire cookies to restore")
-
-      # Try to fetch
-      raw_chain = await self._fetch_api_refresh_async(client, system_id)
+        client.cookies = httpx.Cookies()
+
+      # Try to fetch, only what changed if we hold a chain already
+      if self.chain['sync']:
+        raw_chain = await self._fetch_api_refresh_async(client, system_id, delta=True)
+        if raw_chain is not None:
+          chain = self._apply_delta(raw_chain)
+          if chain is not None:
+            Logger.debug("Tripwire delta refresh successful")
+            self.chain = chain
+            return True
+          Logger.info("Tripwire rejected the delta refresh, fetching the whole chain")
+          raw_chain = await self._fetch_api_refresh_async(client, system_id)
+      else:
+        raw_chain = await self._fetch_api_refresh_async(client, system_id)
 
       # If fetch failed (likely not logged in or session expired), try login
       if raw_chain is None:
@@ -448,20 +509,38 @@ class Tripwire:
     """
     Process a single wormhole connection from Tripwire and add it to the solar map.
     
+    :param wormhole: TripwireWormhole from Tripwire API
+    :param solar_map: SolarMap to add the connection to
+    :return: True if connection was added, False otherwise
+    """
+    made = self._wormhole_connection(wormhole, datetime.now(timezone.utc))
+    if made is None:
+      return False
+
+    solar_map.add_connection(made[1])
+    return True
+
+  def _wormhole_connection(
+    self, wormhole: TripwireWormhole, now: datetime
+  ) -> Optional[Tuple[datetime, 'ConnectionData']]:
+    """
+    Connection for a single wormhole from Tripwire.
+    
     The wormhole contains initialID and secondaryID fields which reference
     signature IDs in self.chain['signatures']. These TripwireSignature objects
     contain the actual system IDs and signature codes for both ends of the connection.
     
     :param wormhole: TripwireWormhole from Tripwire API
-    :param solar_map: SolarMap to add the connection to
-    :return: True if connection was added, False otherwise
+    :param now: Time to compute the age of the connection at
+    :return: Modification time of the in signature and the connection, None
+      if the wormhole is not a valid connection
     """
     # Validate that both signatures exist in the chain
     if str(wormhole['initialID']) not in self.chain['signatures']:
-      return False
+      return None
 
     if str(wormhole['secondaryID']) not in self.chain['signatures']:
-      return False
+      return None
 
     signature_in, signature_out = self._get_wormhole_signatures(wormhole)
 
@@ -469,7 +548,7 @@ class Tripwire:
     system_to = convert_to_int(signature_out['systemID'])
 
     if system_from == 0 or system_from < 10000 or system_to == 0 or system_to < 10000:
-      return False
+      return None
 
     sig_id_in = self.format_tripwire_signature(signature_in['signatureID'])
     sig_id_out = self.format_tripwire_signature(
@@ -485,29 +564,24 @@ class Tripwire:
     last_modified = datetime.strptime(
       signature_in['modifiedTime'], "%Y-%m-%d %H:%M:%S"
     ).replace(tzinfo=timezone.utc)
-    delta = datetime.now(timezone.utc) - last_modified
-    time_elapsed = round(delta.total_seconds() / 3600.0, 1)
+    time_elapsed = round((now - last_modified).total_seconds() / 3600.0, 1)
 
     from shortcircuit.model.connection_db import ConnectionData
-    # Add wormhole connection to solar system
-    solar_map.add_connection(
-      ConnectionData(
-        source_id=self.source_id,
-        source_system=system_from,
-        dest_system=system_to,
-        con_type=ConnectionType.WORMHOLE,
-        sig_source=sig_id_in,
-        code_source=wh_type_in,
-        sig_dest=sig_id_out,
-        code_dest=wh_type_out,
-        wh_size=wh_size,
-        wh_life=wh_life,
-        wh_mass=wh_mass,
-        time_elapsed=time_elapsed,
-        source_name=self.name
-      )
+    return last_modified, ConnectionData(
+      source_id=self.source_id,
+      source_system=system_from,
+      dest_system=system_to,
+      con_type=ConnectionType.WORMHOLE,
+      sig_source=sig_id_in,
+      code_source=wh_type_in,
+      sig_dest=sig_id_out,
+      code_dest=wh_type_out,
+      wh_size=wh_size,
+      wh_life=wh_life,
+      wh_mass=wh_mass,
+      time_elapsed=time_elapsed,
+      source_name=self.name
     )
-    return True
 
   def augment_map(self, solar_map: SolarMap):
     """
@@ -520,21 +594,70 @@ class Tripwire:
     
     if not success:
       return -1
-    
+
+    return self._add_chain(solar_map)
+
+  async def augment_map_async(
+    self, solar_map: SolarMap, clients: Optional[ClientPool] = None
+  ) -> int:
+    """
+    `augment_map` on the running event loop.
+
+    :param clients: Pool to take the HTTP client from, a new one if None
+    """
+    if not await self._get_chain_task("30000142", clients):
+      return -1
+
+    return self._add_chain(solar_map)
+
+  def _add_chain(self, solar_map: SolarMap) -> int:
+    """
+    Add the wormholes of the current chain to the solar map.
+
+    Wormholes whose record and signatures are unchanged since the previous
+    call re-add the connection made then, only with its age brought up to
+    date, so `ConnectionDB` sees no change for them.
+
+    :return: Number of connections added
+    """
     if len(self.chain['wormholes']) == 0:
+      self._processed = {}
       return 0
 
     # We got some sort of response so at least we're logged in
     connections = 0
+    now = datetime.now(timezone.utc)
+    signatures = self.chain['signatures']
+    processed: Dict[str, ProcessedWormhole] = {}
 
     # Process wormholes
-    for _, wormhole in self.chain['wormholes'].items():
+    for wormhole_id, wormhole in self.chain['wormholes'].items():
       try:
-        if self._process_wormhole(wormhole, solar_map):
-          connections += 1
+        initial = signatures.get(str(wormhole['initialID']))
+        secondary = signatures.get(str(wormhole['secondaryID']))
+        previous = self._processed.get(wormhole_id)
+        if (
+          previous is not None
+          and previous[:3] == (wormhole, initial, secondary)
+          and previous[4].source_id == self.source_id
+          and previous[4].source_name == self.name
+        ):
+          last_modified, connection = previous[3], previous[4]
+          time_elapsed = round((now - last_modified).total_seconds() / 3600.0, 1)
+          if connection.time_elapsed != time_elapsed:
+            connection = replace(connection, time_elapsed=time_elapsed)
+        else:
+          made = self._wormhole_connection(wormhole, now)
+          if made is None:
+            continue
+          last_modified, connection = made
+        processed[wormhole_id] = (wormhole, initial, secondary, last_modified, connection)
+        solar_map.add_connection(connection)
+        connections += 1
       except Exception as e:
         Logger.error(f'Error processing wormhole {wormhole.get("id", "unknown")}', exc_info=e)
 
+    self._processed = processed
     return connections
 
   @staticmethod
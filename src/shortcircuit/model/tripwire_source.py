@@ -1,4 +1,5 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+from shortcircuit.model.http_pool import ClientPool
 from shortcircuit.model.mapsource import MapSource, SourceType
 from shortcircuit.model.tripwire import Tripwire
 from shortcircuit.model.solarmap import SolarMap
@@ -55,6 +56,13 @@ class TripwireSource(MapSource):
             
         return self._tripwire.augment_map(solar_map)
 
+    async def fetch(self, solar_map: SolarMap, clients: Optional[ClientPool] = None) -> int:
+        """Fetch data and augment the provided solar map on the running event loop."""
+        if not self.enabled:
+            return 0
+
+        return await self._tripwire.augment_map_async(solar_map, clients)
+
     def connect(self) -> Tuple[bool, str]:
         """Test connection or authenticate."""
         return self._tripwire.test_credentials()
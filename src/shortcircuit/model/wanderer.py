@@ -3,10 +3,12 @@
 import asyncio
 import json
 from datetime import datetime, timezone
-from typing import Tuple, Optional, Dict, List, TYPE_CHECKING
+from typing import Tuple, Optional, TYPE_CHECKING
 
 import httpx
 from .evedb import EveDb, WormholeSize, WormholeMassspan, WormholeTimespan
+from .http_cache import ParsedBody, RecordingMap, cached_get
+from .http_pool import ClientPool, pooled_client
 from .logger import Logger
 from .solarmap import ConnectionType, SolarMap
 
@@ -27,6 +29,7 @@ class Wanderer:
       "Accept": "application/json"
     }
     self.eve_db = EveDb()
+    self._parsed = ParsedBody()
 
   def get_name(self) -> str:
     return self.name
@@ -57,17 +60,29 @@ class Wanderer:
     except Exception as e:
       return False, f"Error: {e}"
 
-  async def _get_signatures_async(self) -> Optional[List[Dict]]:
+  async def _get_signatures_async(
+    self, clients: Optional[ClientPool] = None
+  ) -> Optional[Tuple[httpx.Response, Optional[str]]]:
+    """
+    :return: Signatures response and the digest of its body, see
+      `ResponseCache`, or None on failure
+    """
     if not self.url or not self.map_id or not self.token:
       return None
 
     try:
       api_url = f"{self.url}/api/maps/{self.map_id}/signatures"
-      async with httpx.AsyncClient(verify=True) as client:
-        response = await client.get(api_url, headers=self.headers, timeout=10, follow_redirects=True)
+      async with pooled_client(clients, api_url) as client:
+        response, digest = await cached_get(
+          client,
+          clients.responses if clients else None,
+          api_url,
+          headers=self.headers,
+          timeout=10,
+          follow_redirects=True,
+        )
         if response.status_code == 200:
-          data = response.json()
-          return data.get('data', [])
+          return response, digest
         else:
           Logger.error(f"Wanderer API error: {response.status_code}")
           return None
@@ -76,13 +91,28 @@ class Wanderer:
       return None
 
   def augment_map(self, solar_map: SolarMap) -> int:
-    return asyncio.run(self._augment_map_async(solar_map))
+    return asyncio.run(self.augment_map_async(solar_map))
+
+  async def augment_map_async(
+    self, solar_map: SolarMap, clients: Optional[ClientPool] = None
+  ) -> int:
+    fetched = await self._get_signatures_async(clients)
+    if fetched is None:
+      return -1
+    response, digest = fetched
+
+    # Unchanged since the last parse
+    replayed = self._parsed.replay(digest, solar_map)
+    if replayed is not None:
+      return replayed
 
-  async def _augment_map_async(self, solar_map: SolarMap) -> int:
-    signatures = await self._get_signatures_async()
-    if signatures is None:
+    try:
+      signatures = response.json().get('data', [])
+    except Exception as e:
+      Logger.error(f"Wanderer response error: {e}")
       return -1
 
+    recording = RecordingMap(solar_map)
     connections_added = 0
 
     for sig in signatures:
@@ -162,7 +192,7 @@ class Wanderer:
       wh_type_out = 'K162' if wh_type != '????' and wh_type != 'K162' else '????'
       
       from shortcircuit.model.connection_db import ConnectionData
-      solar_map.add_connection(
+      recording.add_connection(
         ConnectionData(
           source_id=self.source_id,
           source_system=system_id,
@@ -181,4 +211,5 @@ class Wanderer:
       )
       connections_added += 1
 
+    self._parsed.store(digest, connections_added, recording.added)
     return connections_added
\ No newline at end of file
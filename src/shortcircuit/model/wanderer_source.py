@@ -1,4 +1,5 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+from shortcircuit.model.http_pool import ClientPool
 from shortcircuit.model.mapsource import MapSource, SourceType
 from shortcircuit.model.wanderer import Wanderer
 from shortcircuit.model.solarmap import SolarMap
@@ -57,6 +58,13 @@ class WandererSource(MapSource):
             
         return self._wanderer.augment_map(solar_map)
 
+    async def fetch(self, solar_map: SolarMap, clients: Optional[ClientPool] = None) -> int:
+        """Fetch data and augment the provided solar map on the running event loop."""
+        if not self.enabled:
+            return 0
+
+        return await self._wanderer.augment_map_async(solar_map, clients)
+
     def fetch_test_data(self) -> int:
         """Fetch data for testing purposes, without modifying the SolarMap."""
         return self._wanderer.augment_map(SolarMap(None))